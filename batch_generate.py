@@ -0,0 +1,111 @@
+"""
+Command-line batch generation for the Bedtime Story Generator.
+
+Reads ChildPreferences records as JSONL (one JSON object per line, with an
+optional "id") and writes one JSON result per line as stories complete.
+
+Usage:
+    python batch_generate.py children.jsonl -o stories.jsonl --workers 8
+    cat children.jsonl | python batch_generate.py - --fallback-only > stories.jsonl
+
+Re-running the same command after an interruption skips records that were
+already written (tracked in the checkpoint file, by default <output>.ckpt);
+records that failed are retried.
+"""
+
+import argparse
+import sys
+
+from config import Config
+from src.services import BatchRunner, RequestDispatcher
+
+def main():
+    """Parse arguments, run the batch and print a throughput summary."""
+    parser = argparse.ArgumentParser(description="Generate bedtime stories for a JSONL file of preferences.")
+    parser.add_argument('input', help="JSONL input file, or - for stdin")
+    parser.add_argument('-o', '--output', help="JSONL output file (appended to; default: stdout)")
+    parser.add_argument('--checkpoint', help="file of completed record IDs (default: <output>.ckpt)")
+    parser.add_argument('--workers', type=int, default=4, help="stories generated in parallel")
+    parser.add_argument('--archive', metavar='DB',
+                        help="also record stories in this SQLite story archive")
+    parser.add_argument('--owner', default=Config.get_story_owner(),
+                        help="archive owner the stories can be found by in the app "
+                             "(default: STORY_OWNER, else the owner of the API token)")
+    parser.add_argument('--cache', metavar='DB',
+                        help="share fetched weather through this SQLite cache (e.g. the app's cache.db)")
+    parser.add_argument('--city', default=Config.get_story_city(),
+                        help="city whose weather appears in the stories (default: STORY_CITY or Bengaluru)")
+    parser.add_argument('--timezone', default=Config.get_story_timezone(),
+                        help="IANA timezone for the time of day in the stories (default: STORY_TIMEZONE or local)")
+    parser.add_argument('--llm-rate', type=float, default=RequestDispatcher.DEFAULT_RATE_PER_SECOND,
+                        help="LLM requests per second this run may send (its share of the provider's limit)")
+    parser.add_argument('--fallback-only', action='store_true',
+                        help="use the template generator only (no LLM or API token needed)")
+    args = parser.parse_args()
+
+    token = Config.get_huggingface_token()
+    if not token and not args.fallback_only:
+        print("Please set HUGGINGFACE_API_TOKEN, or pass --fallback-only.", file=sys.stderr)
+        sys.exit(1)
+
+    checkpoint = args.checkpoint or (args.output + '.ckpt' if args.output else None)
+
+    # Stories are buffered and archived in bulk, compressed with the app's dictionary
+    archive_writer = None
+    if args.archive:
+        from src.storage import StoryArchive, StoryCodec
+        StoryCodec.configure_default(Config.get_story_dictionary_path(), args.archive)
+        archive_writer = StoryArchive(args.archive).batch_writer()
+        # The same owner as the app's sessions for this token, so the stories can be searched there
+        if args.owner is None:
+            args.owner = StoryArchive.owner_for_token(token) if token else 'batch'
+
+    # Weather is fetched once per city for all workers (and any other process using the file)
+    cache = None
+    if args.cache:
+        from src.storage import SQLiteCache
+        cache = SQLiteCache(args.cache)
+
+    # One weather and time snapshot for every record instead of a lookup per story
+    # (fallback-only runs use fixed offline weather and never call the API)
+    context_provider = None
+    if not args.fallback_only:
+        from src.services import ContextProvider
+        from src.tools import WeatherTool
+        context_provider = ContextProvider(WeatherTool(cache=cache,
+                                                       unlisted_cities=Config.is_unlisted_city_lookup_enabled()))
+
+    # This process has its own dispatcher (the app's is in another process), so it only paces
+    # this run's workers to --llm-rate; lower it when the app shares the same API token
+    dispatcher = RequestDispatcher(rate_per_second=args.llm_rate, max_concurrency=args.workers)
+
+    def create_generator():
+        from src import StoryGenerator
+        return StoryGenerator(token or "", dispatcher=dispatcher,
+                              tenant='batch', owner=args.owner, priority=RequestDispatcher.BATCH,
+                              archive=archive_writer, cache=cache, story_cache_ttl=0,
+                              context_provider=context_provider,
+                              city=args.city, timezone=args.timezone)
+
+    runner = BatchRunner(create_generator, workers=args.workers,
+                         fallback_only=args.fallback_only, checkpoint_path=checkpoint)
+
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    output = open(args.output, 'a', encoding='utf-8') if args.output else sys.stdout
+    try:
+        summary = runner.run(source, output, output_path=args.output)
+    except KeyboardInterrupt:
+        print("Interrupted; re-run the same command to resume.", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+        if archive_writer is not None:
+            archive_writer.close()
+
+    print(summary.format(), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
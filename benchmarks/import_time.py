@@ -0,0 +1,99 @@
+"""
+Import-time benchmark for the Bedtime Story Generator.
+
+Runs `python -X importtime -c "import src"` in a fresh interpreter and checks
+that the package imports within a time budget and without loading heavy
+dependencies (LangChain, Streamlit, requests, the Hugging Face client).
+
+Usage:
+    python benchmarks/import_time.py [--budget-ms 150] [--runs 5] [--module src]
+Exits with status 1 if the budget is exceeded or a heavy module was imported.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Project root (the directory that contains the src package)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be loaded just by importing the package
+HEAVY_MODULES = ['langchain', 'langchain_community', 'streamlit', 'requests', 'huggingface_hub']
+
+DEFAULT_BUDGET_MS = 150.0
+
+# Lines look like: "import time:       412 |       1650 |   src.models"
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+def measure_import(module: str) -> Tuple[float, Dict[str, int]]:
+    """
+    Import a module in a fresh interpreter with -X importtime.
+    Args:
+        module (str): The module to import.
+    Returns:
+        Tuple[float, Dict[str, int]]: Cumulative import time of the module in milliseconds,
+            and the cumulative microseconds of every top-level package that was imported.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    module_us = None
+    packages: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative = int(match.group(2))
+        name = match.group(4)
+        if name == module:
+            module_us = cumulative
+        top_level = name.split('.')[0]
+        packages[top_level] = max(packages.get(top_level, 0), cumulative)
+
+    if module_us is None:
+        raise RuntimeError(f"No import timing found for {module}")
+    return module_us / 1000.0, packages
+
+def main(argv: List[str] = None) -> int:
+    """Run the benchmark and report whether it stays within budget."""
+    parser = argparse.ArgumentParser(description="Check the cold-start import time of the story generator.")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f"maximum cumulative import time in ms (default {DEFAULT_BUDGET_MS:g})")
+    parser.add_argument('--runs', type=int, default=5, help="number of fresh interpreters to time (best run counts)")
+    parser.add_argument('--module', default='src', help="module to import (default: src)")
+    args = parser.parse_args(argv)
+
+    timings = []
+    packages: Dict[str, int] = {}
+    for _ in range(max(args.runs, 1)):
+        elapsed_ms, packages = measure_import(args.module)
+        timings.append(elapsed_ms)
+
+    best = min(timings)
+    print(f"import {args.module}: best {best:.1f} ms, worst {max(timings):.1f} ms over {len(timings)} runs "
+          f"(budget {args.budget_ms:g} ms)")
+
+    slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:5]
+    print("slowest top-level imports: " + ", ".join(f"{name} {us / 1000:.1f} ms" for name, us in slowest))
+
+    heavy = [name for name in HEAVY_MODULES if name in packages]
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported at startup: {', '.join(heavy)}")
+        failed = True
+    if best > args.budget_ms:
+        print(f"FAIL: import time {best:.1f} ms exceeds budget of {args.budget_ms:g} ms")
+        failed = True
+    if not failed:
+        print("OK")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,347 @@
+"""
+Concurrent-session load test for the Bedtime Story Generator.
+
+Simulates N families using the app at once. Each simulated session follows the
+same path as a browser session: BedtimeStoryApp.run creates a StoryGenerator,
+UIComponents.display_story_section submits generate_story to the shared
+GenerationJobExecutor and polls the job, and the finished story is rendered
+and added to the session's StoryHistory. The LLM is a stub local backend and
+the weather API is a local HTTP stand-in, both with configurable latency and
+error rates, so no API token or network access is needed.
+
+For each concurrency level it reports throughput, latency percentiles (as seen
+by the user, including polling), process memory growth and the fallback rate.
+
+Usage:
+    python benchmarks/load_test.py [--users 1,4,16,64] [--stories-per-user 3]
+        [--llm-latency-ms 300] [--llm-error-rate 0.05]
+        [--weather-latency-ms 50] [--weather-error-rate 0.05]
+        [--job-workers 4] [--poll-ms 50] [--reuse] [--json results.json]
+        [--replay calls.jsonl [--replay-latency]]
+
+With --replay, LLM and weather calls are served from a cassette recorded by
+server.py --record-cassette, in recorded order, instead of the stubs. (This
+script cannot record one: it only ever calls the stubs.)
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+# Project root (the directory that contains the src package)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.models import ChildPreferences
+from src.services import Cassette, GenerationJobExecutor
+from src.storage import StoryHistory, StoryTemplateCache
+from src.utils import StoryRenderer
+
+# Sample families; each simulated session picks one
+NAMES = ['Mia', 'Leo', 'Ava', 'Noah', 'Zoe', 'Omar', 'Lily', 'Kai', 'Emma', 'Ravi']
+INTERESTS = ['animals', 'space', 'dragons', 'ocean', 'castles', 'stars', 'nature', 'fairies']
+ANIMALS = ['cat', 'dog', 'owl', 'bunny', 'fox', 'turtle', 'unicorn']
+COLORS = ['pink', 'blue', 'purple', 'green', 'yellow', 'rainbow']
+MOODS = ['happy and cheerful', 'sleepy and calm', 'curious and thoughtful']
+LENGTHS = ['short', 'medium', 'long']
+
+# Sentence parts the stub LLM combines, so its stories do not look like repetition loops
+STORY_OPENING = "Once upon a time {name} found a glowing path behind the garden."
+STORY_CONNECTORS = ['Then', 'Soon', 'Next', 'Later', 'Meanwhile', 'Suddenly', 'Afterwards', 'Nearby']
+STORY_SUBJECTS = ['a gentle friend', 'the sleepy moon', 'a tiny firefly', 'the old oak tree', 'a silver cloud',
+                  'the quiet river', 'a friendly breeze', 'the smallest star']
+STORY_ADVERBS = ['gently', 'quietly', 'happily', 'slowly', 'softly', 'proudly', 'sleepily', 'kindly']
+STORY_VERBS = ['hummed a soft tune', 'shared a secret', 'painted the sky', 'counted the sheep', 'told a riddle',
+               'lit the way', 'sang a lullaby', 'waved goodnight']
+STORY_PLACES = ['over the meadow', 'beside the pond', 'under the bridge', 'near the window', 'across the hills',
+                'inside a teacup', 'on a lily pad', 'behind the clouds']
+STORY_ENDING = "{name} yawned, snuggled in, and drifted into the sweetest dreams."
+
+class StubLLMBackend:
+    """
+    Local backend (see PrefixCache) that sleeps instead of running a model.
+    Latency is jittered by +/-25%, and a fraction of calls raise to exercise the fallback path.
+    """
+
+    def __init__(self, latency_ms: float, error_rate: float, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        with self._lock:
+            return self._random.uniform(0.75, 1.25), self._random.random()
+
+    def encode_prefix(self, prefix: str):
+        return len(prefix)
+
+    def generate_from_prefix(self, state, suffix: str, max_new_tokens: int = 360, **kwargs) -> str:
+        jitter, roll = self._draw()
+        time.sleep(self.latency_ms * jitter / 1000)
+        if roll < self.error_rate:
+            raise RuntimeError("stub LLM error")
+
+        match = re.search(r'Child: ([^,]+),', suffix)
+        name = match.group(1) if match else 'the child'
+        with self._lock:
+            rng = random.Random(self._random.random())
+        sentences = [STORY_OPENING.format(name=name)]
+        words = len(sentences[0].split())
+        while words < max_new_tokens * 0.7:
+            sentence = (f"{rng.choice(STORY_CONNECTORS)} {rng.choice(STORY_SUBJECTS)} {rng.choice(STORY_ADVERBS)} "
+                        f"{rng.choice(STORY_VERBS)} {rng.choice(STORY_PLACES)}.")
+            sentences.append(sentence)
+            words += len(sentence.split())
+        sentences.append(STORY_ENDING.format(name=name))
+        return ' '.join(sentences)
+
+class StubWeatherServer:
+    """Local stand-in for the OpenWeatherMap API with configurable latency and error rate."""
+
+    def __init__(self, latency_ms: float, error_rate: float):
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                time.sleep(server.latency_ms / 1000)
+                if random.random() < server.error_rate:
+                    self.send_response(500)
+                    self.end_headers()
+                    return
+                body = json.dumps({
+                    'weather': [{'main': 'Clouds', 'description': 'scattered clouds'}],
+                    'main': {'temp': 14.5}
+                }).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="stub-weather", daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}/data/2.5/weather"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+# Results for one concurrency level.
+@dataclass
+class LevelResult:
+    """Data class to store the measurements of one concurrency level."""
+    users: int
+    stories: int = 0
+    failed: int = 0
+    fallbacks: int = 0
+    elapsed_seconds: float = 0.0
+    rss_growth_bytes: int = 0
+    history_bytes: int = 0
+    latencies: List[float] = field(default_factory=list, repr=False)
+
+    @property
+    def stories_per_second(self) -> float:
+        return self.stories / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    @property
+    def fallback_rate(self) -> float:
+        return self.fallbacks / self.stories if self.stories else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """Latency percentile in seconds (e.g. 0.95 for p95)."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def to_dict(self) -> Dict:
+        report = asdict(self)
+        del report['latencies']
+        report.update({
+            'stories_per_second': round(self.stories_per_second, 3),
+            'fallback_rate': round(self.fallback_rate, 4),
+            'p50_ms': round(self.percentile(0.5) * 1000, 1),
+            'p95_ms': round(self.percentile(0.95) * 1000, 1),
+            'p99_ms': round(self.percentile(0.99) * 1000, 1)
+        })
+        return report
+
+def rss_bytes() -> int:
+    """Resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == 'darwin' else usage * 1024
+
+def random_preferences(rng: random.Random) -> ChildPreferences:
+    return ChildPreferences(
+        name=rng.choice(NAMES),
+        age=rng.randint(3, 10),
+        mood=rng.choice(MOODS),
+        interests=rng.sample(INTERESTS, 2),
+        story_length=rng.choice(LENGTHS),
+        favorite_animal=rng.choice(ANIMALS),
+        favorite_color=rng.choice(COLORS)
+    )
+
+def run_session(args, backend: StubLLMBackend, weather_url: str, executor: GenerationJobExecutor,
+                template_cache: Optional[StoryTemplateCache], result: LevelResult,
+                lock: threading.Lock, seed: int, cassette: Optional[Cassette] = None) -> StoryHistory:
+    """One simulated browser session generating stories_per_user stories."""
+    from src import StoryGenerator
+
+    rng = random.Random(seed)
+    history = StoryHistory()
+    for _ in range(args.stories_per_user):
+        preferences = random_preferences(rng)
+
+        # BedtimeStoryApp.run: a new script run creates the generator
+        generator = StoryGenerator("load-test", local_backend=backend, template_cache=template_cache,
+                                   cassette=cassette)
+        generator.weather_tool.base_url = weather_url
+
+        # display_story_section: submit the job, then poll it like the status fragment
+        started = time.perf_counter()
+        job_id = executor.submit(generator.generate_story, preferences)
+        job = executor.get(job_id)
+        while not job.finished:
+            time.sleep(args.poll_ms / 1000)
+        executor.pop(job_id)
+        latency = time.perf_counter() - started
+
+        if job.status == "done":
+            # store_story: render for display and keep it in the session history
+            renderer = StoryRenderer.from_html(job.result, metadata={'title': f"A Bedtime Story for {preferences.name}"})
+            renderer.render('html')
+            history.add(job.result, renderer.document.metadata['title'])
+
+        with lock:
+            if job.status == "done":
+                result.stories += 1
+                result.latencies.append(latency)
+                if job.stage == StoryGenerator.FALLBACK_STAGE:
+                    result.fallbacks += 1
+            else:
+                result.failed += 1
+
+        if args.think_ms:
+            time.sleep(rng.uniform(0.5, 1.5) * args.think_ms / 1000)
+    return history
+
+def run_level(args, users: int, backend: StubLLMBackend, weather_url: str,
+              cassette: Optional[Cassette] = None) -> LevelResult:
+    """Run `users` concurrent sessions and measure them."""
+    result = LevelResult(users=users)
+    executor = GenerationJobExecutor(max_workers=args.job_workers)
+    template_cache = StoryTemplateCache() if args.reuse else None
+    lock = threading.Lock()
+    histories: List[StoryHistory] = []
+
+    def session(index: int):
+        histories.append(run_session(args, backend, weather_url, executor, template_cache,
+                                     result, lock, seed=args.seed * 10007 + users * 101 + index,
+                                     cassette=cassette))
+
+    gc.collect()
+    rss_before = rss_bytes()
+    sink = sys.stdout if args.verbose else io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        threads = [threading.Thread(target=session, args=(i,), name=f"session-{i}") for i in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    result.elapsed_seconds = time.perf_counter() - started
+    executor.shutdown()
+
+    # Memory still held with every session's history alive
+    gc.collect()
+    result.rss_growth_bytes = rss_bytes() - rss_before
+    result.history_bytes = sum(history.stored_bytes() for history in histories)
+    return result
+
+def main(argv: List[str] = None) -> int:
+    """Run the load test at each concurrency level and print a summary table."""
+    parser = argparse.ArgumentParser(description="Load-test story generation with concurrent simulated sessions.")
+    parser.add_argument('--users', default='1,4,16,64', help="comma-separated concurrency levels")
+    parser.add_argument('--stories-per-user', type=int, default=3, help="stories each session generates")
+    parser.add_argument('--llm-latency-ms', type=float, default=300, help="stub LLM latency per story")
+    parser.add_argument('--llm-error-rate', type=float, default=0.05, help="fraction of LLM calls that fail")
+    parser.add_argument('--weather-latency-ms', type=float, default=50, help="stub weather API latency")
+    parser.add_argument('--weather-error-rate', type=float, default=0.05, help="fraction of weather calls that fail")
+    parser.add_argument('--job-workers', type=int, default=GenerationJobExecutor.DEFAULT_MAX_WORKERS,
+                        help="background job workers (the app's shared executor size)")
+    parser.add_argument('--poll-ms', type=float, default=50, help="how often a session polls its job")
+    parser.add_argument('--think-ms', type=float, default=0, help="average pause between a session's stories")
+    parser.add_argument('--reuse', action='store_true', help="share a StoryTemplateCache between sessions")
+    parser.add_argument('--seed', type=int, default=1, help="random seed for preferences and stub errors")
+    parser.add_argument('--json', metavar='PATH', help="also write the results as JSON")
+    parser.add_argument('--verbose', action='store_true', help="show the app's own log output")
+    parser.add_argument('--replay', metavar='PATH', help="serve LLM and weather calls from a recorded cassette")
+    parser.add_argument('--replay-latency', action='store_true', help="replay each call's recorded duration")
+    args = parser.parse_args(argv)
+
+    # Prompts differ from run to run, so replayed calls are matched by order
+    cassette = Cassette.from_options(replay=args.replay, match='sequence', replay_latency=args.replay_latency)
+
+    try:
+        import requests  # noqa: F401  (the weather tool needs it to reach the stand-in server)
+    except ImportError:
+        print("Note: requests is not installed, so every weather lookup uses the tool's fallback.")
+
+    levels = [int(level) for level in args.users.split(',') if level.strip()]
+    backend = StubLLMBackend(args.llm_latency_ms, args.llm_error_rate, seed=args.seed)
+    weather = StubWeatherServer(args.weather_latency_ms, args.weather_error_rate)
+    weather.start()
+
+    print(f"{'users':>5} {'stories':>7} {'failed':>6} {'stories/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'fallback':>8} {'RSS +MB':>8} {'history KB':>10}")
+    results = []
+    try:
+        for users in levels:
+            result = run_level(args, users, backend, weather.url, cassette)
+            results.append(result)
+            print(f"{users:>5} {result.stories:>7} {result.failed:>6} {result.stories_per_second:>9.2f} "
+                  f"{result.percentile(0.5) * 1000:>8.0f} {result.percentile(0.95) * 1000:>8.0f} "
+                  f"{result.percentile(0.99) * 1000:>8.0f} {result.fallback_rate:>8.1%} "
+                  f"{result.rss_growth_bytes / 2 ** 20:>8.1f} {result.history_bytes / 1024:>10.1f}")
+    finally:
+        weather.stop()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump({'settings': vars(args), 'levels': [result.to_dict() for result in results]}, output, indent=2)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Compression benchmark for the Bedtime Story Generator's StoryCodec.
+
+Trains a dictionary on stories from the story archive (the app's stories.db
+by default, or the built-in sample corpus when there is no archive), then
+reports the compression ratio and decode throughput on held-out stories, next
+to plain per-story zlib and, for an archive, the sample-corpus dictionary.
+Saving the dictionary as story.dict makes the app and server use it.
+
+Usage:
+    python benchmarks/story_codec.py [--archive stories.db | --samples] [--limit 2000]
+        [--dictionary-kb 16] [--backend zstd|zlib] [--save-dictionary story.dict]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List
+
+# Project root (the directory that contains the src package)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from config import Config
+from src.storage import CodecReport, StoryArchive, StoryCodec
+
+# Share of the stories used for training; the rest are measured
+TRAIN_FRACTION = 0.8
+
+def load_stories(archive_path: str, limit: int) -> List[str]:
+    """Read the most recent stories from an archive, or build the sample corpus."""
+    if archive_path:
+        archive = StoryArchive(archive_path)
+        try:
+            return [entry.story for entry in archive.recent(limit=limit)]
+        finally:
+            archive.close()
+    return StoryCodec.sample_corpus(count=limit)
+
+def print_report(label: str, report: CodecReport):
+    """Print one codec's size and ratio on the held-out stories."""
+    print(f"  {label:<19}{report.compressed_bytes / 1024:.1f} KB ({report.ratio:.2f}x), "
+          f"{report.compressed_bytes / report.stories:.0f} bytes per story")
+
+def main(argv: List[str] = None) -> int:
+    """Train a codec, measure it and print the results."""
+    parser = argparse.ArgumentParser(description="Measure dictionary compression of stories.")
+    default_archive = Config.get_story_archive_path()
+    parser.add_argument('--archive', metavar='DB',
+                        default=default_archive if os.path.exists(default_archive) else None,
+                        help=f"train and measure on this story archive (default: {default_archive} if it exists)")
+    parser.add_argument('--samples', action='store_true', help="use the built-in sample corpus even if there is an archive")
+    parser.add_argument('--limit', type=int, default=2000, help="stories to read (default 2000)")
+    parser.add_argument('--dictionary-kb', type=int, default=StoryCodec.DEFAULT_DICTIONARY_SIZE // 1024,
+                        help="dictionary size in KB")
+    parser.add_argument('--backend', choices=('zstd', 'zlib'),
+                        help="codec backend (default: zstd when installed, else zlib)")
+    parser.add_argument('--save-dictionary', metavar='FILE', help="write the trained dictionary to FILE")
+    args = parser.parse_args(argv)
+
+    archive_path = None if args.samples else args.archive
+    stories = load_stories(archive_path, args.limit)
+    if len(stories) < 10:
+        print(f"Need at least 10 stories, found {len(stories)}.")
+        return 1
+    split = int(len(stories) * TRAIN_FRACTION)
+    training, held_out = stories[:split], stories[split:]
+
+    started = time.perf_counter()
+    codec = StoryCodec.train(training, dictionary_size=args.dictionary_kb * 1024, backend=args.backend)
+    training_ms = (time.perf_counter() - started) * 1000
+
+    report = codec.measure(held_out)
+    source = archive_path or "sample corpus"
+    print(f"backend {report.backend}, dictionary {report.dictionary_bytes / 1024:.1f} KB "
+          f"trained on {len(training)} stories from {source} in {training_ms:.0f} ms")
+    print(f"{report.stories} held-out stories: {report.raw_bytes / 1024:.1f} KB raw")
+    print_report("dictionary codec:", report)
+    if archive_path:
+        # What the app would use without an archive-trained dictionary
+        samples_codec = StoryCodec.train(StoryCodec.sample_corpus(), backend=codec.backend)
+        print_report("sample dictionary:", samples_codec.measure(held_out, rounds=1))
+    print(f"  plain zlib:        {report.baseline_bytes / 1024:.1f} KB ({report.baseline_ratio:.2f}x), "
+          f"{report.baseline_bytes / report.stories:.0f} bytes per story")
+    print(f"  decode: {report.decode_mb_per_second:.0f} MB/s "
+          f"({report.decode_mb_per_second * 1e6 / (report.raw_bytes / report.stories):,.0f} stories/s)")
+
+    if args.save_dictionary:
+        with open(args.save_dictionary, 'wb') as output:
+            output.write(codec.dictionary)
+        print(f"dictionary written to {args.save_dictionary}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,7 +3,7 @@ Configuration settings for the Bedtime Story Generator.
 """
 
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 class Config:
     """Configuration class for the application."""
@@ -29,6 +29,29 @@ class Config:
     WEATHER_BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
     DEFAULT_CITY = "London"
     
+    # Story archive (SQLite database of every generated story)
+    STORY_ARCHIVE_PATH = "stories.db"
+    
+    # Compression dictionary shared by every process, trained on the archive (see StoryCodec.default)
+    STORY_DICTIONARY_PATH = "story.dict"
+    
+    # How many other children one LLM story may be re-personalized for (0 disables reuse)
+    STORY_TEMPLATE_MAX_REUSES = 3
+    
+    # Ask the weather API about places the bundled gazetteer does not list (else they get the fallback)
+    WEATHER_UNLISTED_CITIES = False
+    
+    # Weather and story cache shared by worker processes ('sqlite') or private to each ('memory')
+    CACHE_BACKEND = "sqlite"
+    CACHE_PATH = "cache.db"
+    STORY_CACHE_TTL_SECONDS = 900  # 0 caches weather only
+    
+    # Opt-in memory instrumentation (tracemalloc snapshots and growth alerts)
+    MEMORY_MONITOR = False
+    MEMORY_MONITOR_INTERVAL_SECONDS = 300
+    MEMORY_ALERT_GROWTH_MB = 50
+    MEMORY_ALERT_PATH = "memory_alerts.jsonl"
+    
     # Age settings
     MIN_AGE = 2
     MAX_AGE = 12
@@ -102,6 +125,12 @@ class Config:
     SESSION_KEYS = {
         'story_generated': 'story_generated',
         'current_story': 'current_story',
+        'story_renderer': 'story_renderer',
+        'story_job_id': 'story_job_id',
+        'story_error': 'story_error',
+        'speculative_job': 'speculative_job',
+        'story_history': 'story_history',
+        'session_id': 'session_id',
         'child_preferences': 'child_preferences'
     }
     
@@ -118,4 +147,55 @@ class Config:
     @classmethod
     def get_weather_api_key(cls) -> str:
         """Get weather API key from environment or use demo key."""
-        return cls.get_environment_variable('WEATHER_API_KEY', cls.WEATHER_API_KEY) 
\ No newline at end of file
+        return cls.get_environment_variable('WEATHER_API_KEY', cls.WEATHER_API_KEY) 
+    
+    @classmethod
+    def get_story_archive_path(cls) -> str:
+        """Get the story archive database path from environment or use the default."""
+        return cls.get_environment_variable('STORY_ARCHIVE_PATH', cls.STORY_ARCHIVE_PATH)
+    
+    @classmethod
+    def get_story_dictionary_path(cls) -> str:
+        """Get the story compression dictionary path from environment or use the default."""
+        return cls.get_environment_variable('STORY_DICTIONARY_PATH', cls.STORY_DICTIONARY_PATH)
+    
+    @classmethod
+    def get_story_owner(cls) -> Optional[str]:
+        """Get the archive owner (family or user ID) stories are saved for (STORY_OWNER; None: derived from the API token)."""
+        return cls.get_environment_variable('STORY_OWNER')
+    
+    @classmethod
+    def get_story_city(cls) -> Optional[str]:
+        """Get the city stories take their weather from (STORY_CITY; None: the weather tool's default)."""
+        return cls.get_environment_variable('STORY_CITY')
+    
+    @classmethod
+    def get_story_timezone(cls) -> Optional[str]:
+        """Get the IANA timezone stories take their time of day from (STORY_TIMEZONE; None: server local time)."""
+        return cls.get_environment_variable('STORY_TIMEZONE')
+    
+    @classmethod
+    def get_cache_backend(cls) -> str:
+        """Get the cache backend kind ('sqlite' or 'memory') from environment or use the default."""
+        return cls.get_environment_variable('CACHE_BACKEND', cls.CACHE_BACKEND)
+    
+    @classmethod
+    def get_cache_path(cls) -> str:
+        """Get the shared cache database path from environment or use the default."""
+        return cls.get_environment_variable('CACHE_PATH', cls.CACHE_PATH)
+    
+    @classmethod
+    def is_unlisted_city_lookup_enabled(cls) -> bool:
+        """Whether WEATHER_UNLISTED_CITIES is switched on in the environment (or by default)."""
+        value = cls.get_environment_variable('WEATHER_UNLISTED_CITIES')
+        if value is None:
+            return cls.WEATHER_UNLISTED_CITIES
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    
+    @classmethod
+    def is_memory_monitor_enabled(cls) -> bool:
+        """Whether MEMORY_MONITOR is switched on in the environment (or by default)."""
+        value = cls.get_environment_variable('MEMORY_MONITOR')
+        if value is None:
+            return cls.MEMORY_MONITOR
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
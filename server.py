@@ -0,0 +1,121 @@
+"""
+Headless HTTP entry point for the Bedtime Story Generator.
+
+Usage:
+    python server.py [--host 127.0.0.1] [--port 8080] [--workers 8] [--queue 32]
+        [--record-cassette calls.jsonl | --replay-cassette calls.jsonl [--replay-latency]]
+
+Requires HUGGINGFACE_API_TOKEN in the environment.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from config import Config
+from src.services import Cassette, MemoryMonitor, StoryHTTPServer
+
+def main():
+    """Parse arguments and run the story service until interrupted."""
+    parser = argparse.ArgumentParser(description="Serve bedtime story generation over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1', help="interface to listen on")
+    parser.add_argument('--port', type=int, default=8080, help="port to listen on")
+    parser.add_argument('--workers', type=int, default=StoryHTTPServer.DEFAULT_MAX_WORKERS,
+                        help="stories generated concurrently")
+    parser.add_argument('--queue', type=int, default=StoryHTTPServer.DEFAULT_MAX_QUEUE,
+                        help="requests allowed to wait before answering 429")
+    parser.add_argument('--max-story-reuses', type=int, default=Config.STORY_TEMPLATE_MAX_REUSES,
+                        help="re-personalize each LLM story for up to this many similar requests (0 disables)")
+    parser.add_argument('--cache', choices=('sqlite', 'memory', 'none'), default=Config.get_cache_backend(),
+                        help="weather and story cache: shared by processes on this host, per process, or off")
+    parser.add_argument('--cache-path', default=Config.get_cache_path(),
+                        help="database file of the sqlite cache")
+    parser.add_argument('--city', default=Config.get_story_city(),
+                        help="city whose weather appears in the stories (default: STORY_CITY or Bengaluru)")
+    parser.add_argument('--timezone', default=Config.get_story_timezone(),
+                        help="IANA timezone for the time of day in the stories (default: STORY_TIMEZONE or local)")
+    parser.add_argument('--record-cassette', metavar='FILE',
+                        help="record every LLM call and weather API exchange to FILE")
+    parser.add_argument('--replay-cassette', metavar='FILE',
+                        help="serve LLM and weather calls from a recorded FILE, in recorded order, instead of the network")
+    parser.add_argument('--replay-latency', action='store_true',
+                        help="when replaying, wait as long as each recorded call took")
+    parser.add_argument('--memory-monitor', action='store_true', default=Config.is_memory_monitor_enabled(),
+                        help="trace allocations, report memory in /healthz and log growth alerts")
+    parser.add_argument('--memory-interval', type=float, default=Config.MEMORY_MONITOR_INTERVAL_SECONDS,
+                        help="seconds between memory snapshots")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    # Record real calls, or replay recorded ones to reproduce a run offline. Prompts include the
+    # time of day and a random fact, so replayed calls are matched by order, not by prompt
+    cassette = Cassette.from_options(record=args.record_cassette, replay=args.replay_cassette, match='sequence',
+                                     replay_latency=args.replay_latency)
+
+    token = Config.get_huggingface_token()
+    if not token and args.replay_cassette:
+        # Replayed calls never reach the Hugging Face API
+        token = "replay"
+    if not token:
+        print("Please set HUGGINGFACE_API_TOKEN to use the story service.")
+        sys.exit(1)
+
+    from src import StoryGenerator
+
+    # The Hugging Face Hub answers one prompt per request, so prompts are not micro-batched here
+    # (MicroBatchScheduler.for_batch_backend is for backends that generate a batch in one call)
+    # Stories are shared between workers and re-personalized for similar requests
+    template_cache = None
+    if args.max_story_reuses > 0:
+        from src.storage import StoryTemplateCache
+        template_cache = StoryTemplateCache(max_reuses=args.max_story_reuses)
+
+    # Several server processes on one host share weather and stories through the cache file,
+    # compressed with the app's dictionary (trained on its story archive)
+    from src.storage import StoryCodec
+    StoryCodec.configure_default(Config.get_story_dictionary_path(), Config.get_story_archive_path())
+    cache = None
+    if args.cache != 'none':
+        from src.storage import CacheBackend
+        cache = CacheBackend.create(args.cache, args.cache_path)
+
+    # Weather and time are refreshed in the background instead of fetched per request
+    from src.services import ContextProvider
+    from src.tools import WeatherTool
+    context_provider = ContextProvider(WeatherTool(cache=cache, cassette=cassette,
+                                                   unlisted_cities=Config.is_unlisted_city_lookup_enabled()))
+
+    def create_generator():
+        return StoryGenerator(token, template_cache=template_cache,
+                              cache=cache, story_cache_ttl=Config.STORY_CACHE_TTL_SECONDS,
+                              context_provider=context_provider, cassette=cassette,
+                              city=args.city, timezone=args.timezone)
+
+    # Opt-in: tracemalloc snapshots, top allocation sites and growth alerts
+    memory_monitor = None
+    if args.memory_monitor:
+        memory_monitor = MemoryMonitor(
+            interval_seconds=args.memory_interval,
+            alert_growth_bytes=Config.MEMORY_ALERT_GROWTH_MB * 2 ** 20,
+            alert_path=Config.MEMORY_ALERT_PATH
+        )
+        memory_monitor.mark_shared(template_cache, cache, context_provider, cassette)
+        memory_monitor.start()
+
+    server = StoryHTTPServer(
+        create_generator,
+        host=args.host,
+        port=args.port,
+        max_workers=args.workers,
+        max_queue=args.queue,
+        memory_monitor=memory_monitor
+    )
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
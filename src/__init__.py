@@ -2,9 +2,27 @@
 Bedtime Story Generator - A magical AI-powered story generator for children.
 """
 
-from .models import ChildPreferences, WeatherInfo, TimeInfo, StoryContext
-from .story_generator import StoryGenerator
-from .components import UIComponents
+from .models import ChildPreferences, WeatherInfo, TimeInfo, StoryContext, StoryDocument
+from .models import FrozenChildPreferences, FrozenWeatherInfo, FrozenTimeInfo, FrozenStoryContext
+from .codec import ModelCodec
 
 __version__ = "1.0.0"
-__all__ = ['ChildPreferences', 'WeatherInfo', 'TimeInfo', 'StoryContext', 'StoryGenerator', 'UIComponents'] 
\ No newline at end of file
+__all__ = ['ChildPreferences', 'WeatherInfo', 'TimeInfo', 'StoryContext', 'StoryDocument',
+           'FrozenChildPreferences', 'FrozenWeatherInfo', 'FrozenTimeInfo', 'FrozenStoryContext', 'ModelCodec',
+           'StoryGenerator', 'UIComponents']
+
+# StoryGenerator (LangChain) and UIComponents (Streamlit) are heavy to import,
+# so they are loaded on first attribute access instead of with the package.
+_LAZY_ATTRIBUTES = {
+    'StoryGenerator': '.story_generator',
+    'UIComponents': '.components'
+}
+
+def __getattr__(name):
+    if name in _LAZY_ATTRIBUTES:
+        import importlib
+        module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,258 @@
+"""
+Compact binary serialization for the frozen model types.
+"""
+
+import hashlib
+import struct
+from typing import Iterable, List, Tuple
+
+from .models import FrozenChildPreferences, FrozenWeatherInfo, FrozenTimeInfo, FrozenStoryContext
+
+class ModelCodec:
+    """
+    Encode and decode frozen models in a small, versioned binary format.
+
+    Layout: MAGIC (2 bytes) + VERSION (1 byte), then for each record a type tag
+    (1 byte) and its fields in declaration order. Strings are a varint length
+    followed by UTF-8 bytes, integers are zigzag varints, floats are 8-byte
+    little-endian doubles and booleans a single byte. A bulk blob stores the
+    header once, followed by a varint record count.
+    """
+
+    MAGIC = b'BS'
+    VERSION = 1
+
+    # Type tags for each encodable model
+    TAG_PREFERENCES = 1
+    TAG_WEATHER = 2
+    TAG_TIME = 3
+    TAG_CONTEXT = 4
+
+    _DOUBLE = struct.Struct('<d')
+
+    @classmethod
+    def encode(cls, obj) -> bytes:
+        """
+        Encode a single frozen model.
+        Args:
+            obj: A FrozenChildPreferences, FrozenWeatherInfo, FrozenTimeInfo or FrozenStoryContext.
+        Returns:
+            bytes: The encoded record with header.
+        """
+        out = bytearray(cls.MAGIC)
+        out.append(cls.VERSION)
+        cls._write_record(out, obj)
+        return bytes(out)
+
+    @classmethod
+    def decode(cls, data: bytes):
+        """
+        Decode a single frozen model produced by encode().
+        Args:
+            data (bytes): The encoded record.
+        Returns:
+            The decoded frozen model.
+        Raises:
+            ValueError: If the data is not in this format or has trailing bytes.
+        """
+        view = memoryview(data)
+        pos = cls._read_header(view)
+        obj, pos = cls._read_record(view, pos)
+        if pos != len(view):
+            raise ValueError("Trailing bytes after encoded model")
+        return obj
+
+    @classmethod
+    def encode_many(cls, objs: Iterable) -> bytes:
+        """Encode many frozen models into one blob with a single header."""
+        records = bytearray()
+        count = 0
+        for obj in objs:
+            cls._write_record(records, obj)
+            count += 1
+
+        out = bytearray(cls.MAGIC)
+        out.append(cls.VERSION)
+        cls._write_varint(out, count)
+        out += records
+        return bytes(out)
+
+    @classmethod
+    def decode_many(cls, data: bytes) -> List:
+        """Decode a blob produced by encode_many()."""
+        view = memoryview(data)
+        pos = cls._read_header(view)
+        count, pos = cls._read_varint(view, pos)
+        objs = []
+        for _ in range(count):
+            obj, pos = cls._read_record(view, pos)
+            objs.append(obj)
+        if pos != len(view):
+            raise ValueError("Trailing bytes after encoded models")
+        return objs
+
+    @classmethod
+    def stable_hash(cls, obj) -> str:
+        """
+        Hash a frozen model from its binary form.
+        Unlike hash(), the result is the same in every process and run.
+        Returns:
+            str: 32-character hex digest.
+        """
+        return hashlib.blake2b(cls.encode(obj), digest_size=16).hexdigest()
+
+    @classmethod
+    def _write_record(cls, out: bytearray, obj):
+        """Append a type tag and the fields of a frozen model."""
+        if isinstance(obj, FrozenChildPreferences):
+            out.append(cls.TAG_PREFERENCES)
+            cls._write_str(out, obj.name)
+            cls._write_int(out, obj.age)
+            cls._write_str(out, obj.mood)
+            cls._write_varint(out, len(obj.interests))
+            for interest in obj.interests:
+                cls._write_str(out, interest)
+            cls._write_str(out, obj.story_length)
+            cls._write_str(out, obj.favorite_animal)
+            cls._write_str(out, obj.favorite_color)
+        elif isinstance(obj, FrozenWeatherInfo):
+            out.append(cls.TAG_WEATHER)
+            cls._write_str(out, obj.description)
+            out += cls._DOUBLE.pack(obj.temperature)
+            cls._write_str(out, obj.condition)
+        elif isinstance(obj, FrozenTimeInfo):
+            out.append(cls.TAG_TIME)
+            cls._write_str(out, obj.time)
+            cls._write_str(out, obj.date)
+            cls._write_str(out, obj.season)
+            cls._write_str(out, obj.time_of_day)
+            out.append(1 if obj.is_bedtime else 0)
+        elif isinstance(obj, FrozenStoryContext):
+            out.append(cls.TAG_CONTEXT)
+            cls._write_record(out, obj.preferences)
+            cls._write_record(out, obj.weather)
+            cls._write_record(out, obj.time_info)
+            cls._write_str(out, obj.educational_fact)
+        else:
+            raise TypeError(f"Cannot encode {type(obj).__name__}; use a Frozen* model")
+
+    @classmethod
+    def _read_record(cls, view: memoryview, pos: int) -> Tuple[object, int]:
+        """Read one tagged record starting at pos."""
+        if pos >= len(view):
+            raise ValueError("Truncated model data")
+        tag = view[pos]
+        pos += 1
+
+        if tag == cls.TAG_PREFERENCES:
+            name, pos = cls._read_str(view, pos)
+            age, pos = cls._read_int(view, pos)
+            mood, pos = cls._read_str(view, pos)
+            count, pos = cls._read_varint(view, pos)
+            interests = []
+            for _ in range(count):
+                interest, pos = cls._read_str(view, pos)
+                interests.append(interest)
+            story_length, pos = cls._read_str(view, pos)
+            favorite_animal, pos = cls._read_str(view, pos)
+            favorite_color, pos = cls._read_str(view, pos)
+            return FrozenChildPreferences(
+                name=name,
+                age=age,
+                mood=mood,
+                interests=tuple(interests),
+                story_length=story_length,
+                favorite_animal=favorite_animal,
+                favorite_color=favorite_color
+            ), pos
+
+        if tag == cls.TAG_WEATHER:
+            description, pos = cls._read_str(view, pos)
+            (temperature,) = cls._DOUBLE.unpack_from(view, pos)
+            pos += cls._DOUBLE.size
+            condition, pos = cls._read_str(view, pos)
+            return FrozenWeatherInfo(description=description, temperature=temperature, condition=condition), pos
+
+        if tag == cls.TAG_TIME:
+            time, pos = cls._read_str(view, pos)
+            date, pos = cls._read_str(view, pos)
+            season, pos = cls._read_str(view, pos)
+            time_of_day, pos = cls._read_str(view, pos)
+            is_bedtime = bool(view[pos])
+            pos += 1
+            return FrozenTimeInfo(
+                time=time, date=date, season=season, time_of_day=time_of_day, is_bedtime=is_bedtime
+            ), pos
+
+        if tag == cls.TAG_CONTEXT:
+            preferences, pos = cls._read_record(view, pos)
+            weather, pos = cls._read_record(view, pos)
+            time_info, pos = cls._read_record(view, pos)
+            educational_fact, pos = cls._read_str(view, pos)
+            return FrozenStoryContext(
+                preferences=preferences,
+                weather=weather,
+                time_info=time_info,
+                educational_fact=educational_fact
+            ), pos
+
+        raise ValueError(f"Unknown model tag: {tag}")
+
+    @classmethod
+    def _read_header(cls, view: memoryview) -> int:
+        """Check the magic bytes and version; return the position after the header."""
+        if bytes(view[:2]) != cls.MAGIC:
+            raise ValueError("Not an encoded story model")
+        if len(view) < 3 or view[2] != cls.VERSION:
+            raise ValueError("Unsupported story model encoding version")
+        return 3
+
+    @staticmethod
+    def _write_varint(out: bytearray, value: int):
+        """Append an unsigned LEB128 varint."""
+        while value > 0x7F:
+            out.append((value & 0x7F) | 0x80)
+            value >>= 7
+        out.append(value)
+
+    @staticmethod
+    def _read_varint(view: memoryview, pos: int) -> Tuple[int, int]:
+        """Read an unsigned LEB128 varint."""
+        result = 0
+        shift = 0
+        while True:
+            if pos >= len(view):
+                raise ValueError("Truncated model data")
+            byte = view[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result, pos
+            shift += 7
+
+    @classmethod
+    def _write_int(cls, out: bytearray, value: int):
+        """Append a signed integer as a zigzag varint."""
+        cls._write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+
+    @classmethod
+    def _read_int(cls, view: memoryview, pos: int) -> Tuple[int, int]:
+        """Read a zigzag varint."""
+        raw, pos = cls._read_varint(view, pos)
+        return (raw >> 1) if not raw & 1 else -((raw + 1) >> 1), pos
+
+    @classmethod
+    def _write_str(cls, out: bytearray, value: str):
+        """Append a length-prefixed UTF-8 string."""
+        encoded = value.encode('utf-8')
+        cls._write_varint(out, len(encoded))
+        out += encoded
+
+    @classmethod
+    def _read_str(cls, view: memoryview, pos: int) -> Tuple[str, int]:
+        """Read a length-prefixed UTF-8 string."""
+        length, pos = cls._read_varint(view, pos)
+        end = pos + length
+        if end > len(view):
+            raise ValueError("Truncated model data")
+        return str(view[pos:end], 'utf-8'), end
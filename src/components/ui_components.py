@@ -4,13 +4,20 @@ UI components for the Bedtime Story Generator Streamlit interface.
 
 import streamlit as st
 import datetime
+import time
 from typing import List, Dict
 
 from ..models import ChildPreferences
+from ..utils import StoryRenderer
+from ..services import GenerationJobExecutor, SpeculativeGeneration
+from ..storage import StoryHistory
 
 class UIComponents:
     """Class to manage UI components for the application."""
     
+    # How often the story status is refreshed while a story is being written
+    JOB_POLL_SECONDS = 1.0
+    
     @staticmethod
     def setup_page_config():
         """
@@ -199,27 +206,38 @@ class UIComponents:
             preferences (ChildPreferences): The child's preferences.
         """
         
+        # A story is being written in the background: show its progress
+        if st.session_state.get('story_job_id'):
+            UIComponents.display_story_job(preferences)
         # If a story hasn't been generated yet, show the button to generate one
-        if not st.session_state.get('story_generated', False):
+        elif not st.session_state.get('story_generated', False):
             st.markdown("### 🎭 Ready to Create Magic?")
             
+            if st.session_state.get('story_error'):
+                st.error(st.session_state.story_error)
+                st.session_state.story_error = None
+            
             col1, col2, col3 = st.columns([1, 2, 1])
             with col2:
                 if st.button("🌟 Generate Story for " + preferences.name + " 🌟", type="primary"):
-                    with st.spinner("✨ Creating your magical story..."):
-                        # Add some delay for effect
-                        import time
-                        time.sleep(2)
-                        
-                        # Generate the story using the story generator
-                        story = story_generator.generate_story(preferences)
-                        st.session_state.current_story = story
-                        st.session_state.story_generated = True
-                        st.experimental_rerun()
+                    # Use the story started speculatively when the preferences were submitted
+                    job_id = SpeculativeGeneration.shared().claim(st.session_state.get('speculative_job'), preferences)
+                    st.session_state.speculative_job = None
+                    if job_id is None:
+                        # Generate the story in the background so this script run is not blocked
+                        job_id = GenerationJobExecutor.shared().submit(story_generator.generate_story, preferences)
+                    st.session_state.story_job_id = job_id
+                    st.rerun()
         else:
+            renderer = st.session_state.get('story_renderer')
+            
             # If a story has been generated, display it in a styled box
             st.markdown('<div class="story-box">' + st.session_state.current_story + '</div>', unsafe_allow_html=True)
             
+            # Offer the story in other formats (each rendered once, then reused)
+            if renderer is not None:
+                UIComponents.display_story_downloads(renderer)
+            
             # Show story details in an expandable section
             with st.expander("📋 Story Details"):
                 st.write(f"**Child:** {preferences.name} (Age: {preferences.age})")
@@ -228,4 +246,164 @@ class UIComponents:
                 st.write(f"**Favorite Animal:** {preferences.favorite_animal}")
                 st.write(f"**Favorite Color:** {preferences.favorite_color}")
                 st.write(f"**Story Length:** {preferences.story_length}")
-                st.write(f"**Generated:** {datetime.datetime.now().strftime('%B %d, %Y at %I:%M %p')}") 
+                generated = renderer.document.metadata.get('generated') if renderer is not None else None
+                st.write(f"**Generated:** {generated or datetime.datetime.now().strftime('%B %d, %Y at %I:%M %p')}")
+    
+    @staticmethod
+    def display_story_job(preferences: ChildPreferences):
+        """
+        Show the status of the background story job, polling until it finishes.
+        Uses a fragment that reruns on its own when Streamlit supports it, so only
+        the status area refreshes while the story is being written.
+        Args:
+            preferences (ChildPreferences): The child's preferences.
+        """
+        fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+        if fragment is not None:
+            fragment(run_every=UIComponents.JOB_POLL_SECONDS)(UIComponents._display_job_status)(preferences)
+        else:
+            # Older Streamlit: show the status, then rerun the script after a short pause
+            if not UIComponents._display_job_status(preferences):
+                time.sleep(UIComponents.JOB_POLL_SECONDS)
+                st.rerun()
+    
+    @staticmethod
+    def _display_job_status(preferences: ChildPreferences) -> bool:
+        """
+        Render the current job status, or store the story once the job is done.
+        Args:
+            preferences (ChildPreferences): The child's preferences.
+        Returns:
+            bool: True if the job has finished.
+        """
+        executor = GenerationJobExecutor.shared()
+        job = executor.get(st.session_state.get('story_job_id'))
+        
+        if job is None:
+            # Job expired or the server restarted: allow generating again
+            st.session_state.story_job_id = None
+            st.rerun()
+            return True
+        
+        if not job.finished:
+            st.markdown(f'<p class="loading-animation">✨ {job.stage}...</p>', unsafe_allow_html=True)
+            if job.partial:
+                # The latest lines of the story as the model writes it
+                st.caption(("…" if len(job.partial) > 300 else "") + job.partial[-300:])
+            return False
+        
+        executor.pop(job.job_id)
+        st.session_state.story_job_id = None
+        if job.status == "done":
+            UIComponents.store_story(job.result, preferences)
+        else:
+            st.session_state.story_error = job.error or "The story could not be created."
+        st.rerun()
+        return True
+    
+    @staticmethod
+    def store_story(story: str, preferences: ChildPreferences):
+        """
+        Store a finished story in session state.
+        Args:
+            story (str): The story HTML from the story generator.
+            preferences (ChildPreferences): The child's preferences.
+        """
+        # Keep the structured story; other formats are rendered on demand
+        renderer = StoryRenderer.from_html(story, metadata={
+            'title': f"A Bedtime Story for {preferences.name}",
+            'child': preferences.name,
+            'generated': datetime.datetime.now().strftime('%B %d, %Y at %I:%M %p')
+        })
+        st.session_state.story_renderer = renderer
+        st.session_state.current_story = renderer.render('html')
+        st.session_state.story_generated = True
+        
+        # Remember the story so it can be re-read later in this session
+        history = st.session_state.get('story_history')
+        if history is not None:
+            title = f"{preferences.name} · {renderer.document.metadata['generated']}"
+            history.add(story, title)
+    
+    @staticmethod
+    def display_story_history():
+        """
+        Display the session's story history in the sidebar.
+        Older stories are stored compressed and only decompressed when opened.
+        """
+        history = st.session_state.get('story_history')
+        if not history:
+            return
+        
+        with st.expander(f"📚 Story History ({len(history)})"):
+            for entry in history.entries():
+                if st.button(entry.title, key=f"history_{entry.entry_id}"):
+                    story = history.open(entry.entry_id)
+                    if story is not None:
+                        renderer = StoryRenderer.from_html(story, metadata={'title': entry.title})
+                        st.session_state.story_renderer = renderer
+                        st.session_state.current_story = renderer.render('html')
+                        st.session_state.story_generated = True
+                        st.rerun()
+            
+            # Memory gauge across all sessions on this server
+            report = StoryHistory.memory_report()
+            st.caption(
+                f"Stored {history.stored_bytes():,} bytes here; "
+                f"{report['stored_bytes']:,} bytes across {report['sessions']} sessions "
+                f"({report['raw_bytes']:,} bytes uncompressed)"
+            )
+    
+    @staticmethod
+    def display_story_search(archive, owner: str):
+        """
+        Display a search box over this user's archived stories in the sidebar.
+        Args:
+            archive (StoryArchive): The persistent story archive.
+            owner (str): The user or family whose stories may be found (stories are archived with it).
+        """
+        with st.expander("🔎 Find a Past Story"):
+            query = st.text_input("Search stories", placeholder="e.g. the dragon one from last week",
+                                  key="story_search_query")
+            if not query:
+                return
+            
+            results = archive.search(query, owner=owner, limit=10)
+            if not results:
+                st.caption("No stories found.")
+            for result in results:
+                created = datetime.datetime.fromtimestamp(result.created_at).strftime('%b %d')
+                if st.button(f"{result.title} · {created}", key=f"archive_{result.story_id}"):
+                    renderer = StoryRenderer.from_html(result.story, metadata={'title': result.title})
+                    st.session_state.story_renderer = renderer
+                    st.session_state.current_story = renderer.render('html')
+                    st.session_state.story_generated = True
+                    st.rerun()
+                if result.snippet:
+                    st.caption(result.snippet)
+    
+    @staticmethod
+    def display_story_downloads(renderer: StoryRenderer):
+        """
+        Display a format picker and download button for the current story.
+        Args:
+            renderer (StoryRenderer): The renderer holding the current story.
+        """
+        download_formats = {
+            "📄 Plain Text": ("text", "txt", "text/plain"),
+            "📝 Markdown": ("markdown", "md", "text/markdown"),
+            "🔊 Read-Aloud (SSML)": ("ssml", "ssml", "application/ssml+xml"),
+            "🌐 HTML": ("html", "html", "text/html")
+        }
+        
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            choice = st.selectbox("Save story as:", list(download_formats.keys()))
+        output_format, extension, mime = download_formats[choice]
+        with col2:
+            st.download_button(
+                "💾 Download",
+                data=renderer.render(output_format),
+                file_name=f"bedtime_story.{extension}",
+                mime=mime
+            )
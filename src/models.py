@@ -2,8 +2,8 @@
 Data models for the Bedtime Story Generator application.
 """
 
-from dataclasses import dataclass
-from typing import List, Dict, Optional
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Tuple
 
 # This dataclass stores all the preferences and information about the child
 # that are needed to generate a personalized story.
@@ -18,6 +18,47 @@ class ChildPreferences:
     favorite_animal: str     # Favorite animal
     favorite_color: str      # Favorite color
 
+    @classmethod
+    def from_dict(cls, data: dict) -> 'ChildPreferences':
+        """
+        Build preferences from a JSON-style dict (API requests, batch files), applying the UI's defaults.
+        Args:
+            data (dict): Must contain name, interests (non-empty list) and favorite_animal.
+        Returns:
+            ChildPreferences: The validated preferences.
+        Raises:
+            ValueError: If required fields are missing or invalid.
+        """
+        if not isinstance(data, dict):
+            raise ValueError("Preferences must be a JSON object")
+
+        name = str(data.get('name', '')).strip()
+        interests = data.get('interests') or []
+        favorite_animal = str(data.get('favorite_animal', '')).strip()
+        if not name or not favorite_animal or not isinstance(interests, list) or not interests:
+            raise ValueError("name, interests (non-empty list) and favorite_animal are required")
+
+        try:
+            age = int(data.get('age', 6))
+        except (TypeError, ValueError):
+            raise ValueError("age must be a number")
+        if not 2 <= age <= 12:
+            raise ValueError("age must be between 2 and 12")
+
+        story_length = data.get('story_length', 'medium')
+        if story_length not in ('short', 'medium', 'long'):
+            raise ValueError("story_length must be short, medium or long")
+
+        return cls(
+            name=name,
+            age=age,
+            mood=str(data.get('mood', 'happy and cheerful')),
+            interests=[str(interest) for interest in interests],
+            story_length=story_length,
+            favorite_animal=favorite_animal,
+            favorite_color=str(data.get('favorite_color', 'Blue'))
+        )
+
 # This dataclass holds weather information to add real-world context to stories.
 @dataclass
 class WeatherInfo:
@@ -44,4 +85,194 @@ class StoryContext:
     preferences: ChildPreferences   # Child's preferences
     weather: WeatherInfo           # Weather context
     time_info: TimeInfo            # Time/date context
-    educational_fact: str          # Educational fact to include in the story 
\ No newline at end of file
+    educational_fact: str          # Educational fact to include in the story
+
+# This dataclass is the canonical, format-independent form of a finished story.
+# Renderers turn it into HTML, plain text, Markdown or SSML on demand.
+@dataclass
+class StoryDocument:
+    """Data class to store a generated story as structured paragraphs."""
+    paragraphs: List[str]                   # Plain-text paragraphs, without markup
+    illustrations: List[Optional[str]]      # Illustration (emoji) for each paragraph, or None
+    metadata: Dict[str, str] = field(default_factory=dict)  # e.g. title, child name, generated time
+
+
+# ---------------------------------------------------------------------------
+# Frozen variants
+# Immutable, slotted versions of the models above. Values are normalized on
+# construction (casing, whitespace, interest order), so equal preferences give
+# equal objects and equal hashes. They can be used as cache keys and converted
+# to a compact binary form with to_bytes()/from_bytes() (see src/codec.py).
+# ---------------------------------------------------------------------------
+
+def _normalize_text(value: str) -> str:
+    """Collapse whitespace and lowercase a value for canonical comparison."""
+    return ' '.join(str(value).split()).casefold()
+
+class _FrozenModel:
+    """Shared helpers for the frozen model variants."""
+    __slots__ = ()
+
+    def to_bytes(self) -> bytes:
+        """Encode this object in the compact binary format."""
+        from .codec import ModelCodec
+        return ModelCodec.encode(self)
+
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """Decode an object previously encoded with to_bytes()."""
+        from .codec import ModelCodec
+        obj = ModelCodec.decode(data)
+        if not isinstance(obj, cls):
+            raise TypeError(f"Encoded data holds {type(obj).__name__}, not {cls.__name__}")
+        return obj
+
+    def stable_hash(self) -> str:
+        """Hash that is identical across processes and runs (unlike hash())."""
+        from .codec import ModelCodec
+        return ModelCodec.stable_hash(self)
+
+    def __reduce__(self):
+        # Pickle via the binary format; the default slot-by-slot restore would trip over frozen=True
+        return (self.__class__.from_bytes, (self.to_bytes(),))
+
+# Frozen, hashable version of ChildPreferences.
+@dataclass(frozen=True)
+class FrozenChildPreferences(_FrozenModel):
+    """Immutable, normalized child preferences usable as a cache key."""
+    __slots__ = ('name', 'age', 'mood', 'interests', 'story_length', 'favorite_animal', 'favorite_color')
+    name: str                  # Whitespace-collapsed, original casing kept for the story
+    age: int
+    mood: str                  # Lowercased
+    interests: Tuple[str, ...] # Lowercased, de-duplicated and sorted
+    story_length: str          # Lowercased
+    favorite_animal: str       # Lowercased
+    favorite_color: str        # Lowercased
+
+    def __post_init__(self):
+        object.__setattr__(self, 'name', ' '.join(str(self.name).split()))
+        object.__setattr__(self, 'age', int(self.age))
+        object.__setattr__(self, 'mood', _normalize_text(self.mood))
+        object.__setattr__(self, 'interests', tuple(sorted({_normalize_text(i) for i in self.interests if str(i).strip()})))
+        object.__setattr__(self, 'story_length', _normalize_text(self.story_length))
+        object.__setattr__(self, 'favorite_animal', _normalize_text(self.favorite_animal))
+        object.__setattr__(self, 'favorite_color', _normalize_text(self.favorite_color))
+
+    @classmethod
+    def from_mutable(cls, preferences: ChildPreferences) -> 'FrozenChildPreferences':
+        """Create a frozen copy of a ChildPreferences object."""
+        return cls(
+            name=preferences.name,
+            age=preferences.age,
+            mood=preferences.mood,
+            interests=tuple(preferences.interests),
+            story_length=preferences.story_length,
+            favorite_animal=preferences.favorite_animal,
+            favorite_color=preferences.favorite_color
+        )
+
+    def to_mutable(self) -> ChildPreferences:
+        """Create a regular ChildPreferences object with the normalized values."""
+        return ChildPreferences(
+            name=self.name,
+            age=self.age,
+            mood=self.mood,
+            interests=list(self.interests),
+            story_length=self.story_length,
+            favorite_animal=self.favorite_animal,
+            favorite_color=self.favorite_color
+        )
+
+# Frozen, hashable version of WeatherInfo.
+@dataclass(frozen=True)
+class FrozenWeatherInfo(_FrozenModel):
+    """Immutable, normalized weather information."""
+    __slots__ = ('description', 'temperature', 'condition')
+    description: str           # Lowercased
+    temperature: float         # Rounded to 0.1°C
+    condition: str             # Lowercased
+
+    def __post_init__(self):
+        object.__setattr__(self, 'description', _normalize_text(self.description))
+        object.__setattr__(self, 'temperature', round(float(self.temperature), 1))
+        object.__setattr__(self, 'condition', _normalize_text(self.condition))
+
+    @classmethod
+    def from_mutable(cls, weather: WeatherInfo) -> 'FrozenWeatherInfo':
+        """Create a frozen copy of a WeatherInfo object."""
+        return cls(description=weather.description, temperature=weather.temperature, condition=weather.condition)
+
+    def to_mutable(self) -> WeatherInfo:
+        """Create a regular WeatherInfo object with the normalized values."""
+        return WeatherInfo(description=self.description, temperature=self.temperature, condition=self.condition)
+
+# Frozen, hashable version of TimeInfo.
+@dataclass(frozen=True)
+class FrozenTimeInfo(_FrozenModel):
+    """Immutable, normalized time and date information."""
+    __slots__ = ('time', 'date', 'season', 'time_of_day', 'is_bedtime')
+    time: str
+    date: str
+    season: str                # Lowercased
+    time_of_day: str           # Lowercased
+    is_bedtime: bool
+
+    def __post_init__(self):
+        object.__setattr__(self, 'time', str(self.time).strip())
+        object.__setattr__(self, 'date', str(self.date).strip())
+        object.__setattr__(self, 'season', _normalize_text(self.season))
+        object.__setattr__(self, 'time_of_day', _normalize_text(self.time_of_day))
+        object.__setattr__(self, 'is_bedtime', bool(self.is_bedtime))
+
+    @classmethod
+    def from_mutable(cls, time_info: TimeInfo) -> 'FrozenTimeInfo':
+        """Create a frozen copy of a TimeInfo object."""
+        return cls(
+            time=time_info.time,
+            date=time_info.date,
+            season=time_info.season,
+            time_of_day=time_info.time_of_day,
+            is_bedtime=time_info.is_bedtime
+        )
+
+    def to_mutable(self) -> TimeInfo:
+        """Create a regular TimeInfo object with the normalized values."""
+        return TimeInfo(
+            time=self.time,
+            date=self.date,
+            season=self.season,
+            time_of_day=self.time_of_day,
+            is_bedtime=self.is_bedtime
+        )
+
+# Frozen, hashable version of StoryContext.
+@dataclass(frozen=True)
+class FrozenStoryContext(_FrozenModel):
+    """Immutable story context built from the frozen model variants."""
+    __slots__ = ('preferences', 'weather', 'time_info', 'educational_fact')
+    preferences: FrozenChildPreferences
+    weather: FrozenWeatherInfo
+    time_info: FrozenTimeInfo
+    educational_fact: str
+
+    def __post_init__(self):
+        object.__setattr__(self, 'educational_fact', ' '.join(str(self.educational_fact).split()))
+
+    @classmethod
+    def from_mutable(cls, context: StoryContext) -> 'FrozenStoryContext':
+        """Create a frozen copy of a StoryContext object."""
+        return cls(
+            preferences=FrozenChildPreferences.from_mutable(context.preferences),
+            weather=FrozenWeatherInfo.from_mutable(context.weather),
+            time_info=FrozenTimeInfo.from_mutable(context.time_info),
+            educational_fact=context.educational_fact
+        )
+
+    def to_mutable(self) -> StoryContext:
+        """Create a regular StoryContext object with the normalized values."""
+        return StoryContext(
+            preferences=self.preferences.to_mutable(),
+            weather=self.weather.to_mutable(),
+            time_info=self.time_info.to_mutable(),
+            educational_fact=self.educational_fact
+        )
@@ -3,5 +3,7 @@ Prompts package for the Bedtime Story Generator.
 """
 
 from .story_prompts import StoryPrompts
+from .prompt_builder import PromptBuilder, BuiltPrompt
+from .prefix_cache import PrefixCache
 
-__all__ = ['StoryPrompts'] 
\ No newline at end of file
+__all__ = ['StoryPrompts', 'PromptBuilder', 'BuiltPrompt', 'PrefixCache'] 
\ No newline at end of file
@@ -0,0 +1,131 @@
+"""
+Prompt prefix cache for local inference backends.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Iterator
+
+class PrefixCache:
+    """
+    Keep the encoded state of static prompt prefixes and reuse it across requests.
+    Story prompts start with fixed instructions (see PromptBuilder.INSTRUCTION_PREFIX),
+    so a local backend only has to process the short per-child suffix once the
+    prefix state (e.g. the transformer KV cache) has been computed.
+
+    The backend must provide two methods:
+        encode_prefix(prefix: str) -> Any
+            Run the model over the prefix and return its reusable state.
+        generate_from_prefix(state: Any, suffix: str, **kwargs) -> str
+            Continue from the state with the suffix and return the generated text.
+            The state is shared between requests and must not be modified in place.
+
+    It may also provide stream_from_prefix(state, suffix, **kwargs), yielding text
+    as it is generated; generation should stop when the iterator is closed.
+    """
+
+    def __init__(self, backend, max_entries: int = 4):
+        """
+        Args:
+            backend: Local inference backend implementing encode_prefix and generate_from_prefix.
+            max_entries (int): Number of encoded prefixes to keep (least recently used are evicted).
+        """
+        self.backend = backend
+        self.max_entries = max_entries
+        self._states: "OrderedDict[str, Any]" = OrderedDict()
+        # Prefixes being encoded right now; later requests for the same prefix wait for that result
+        self._encoding: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(prefix: str) -> str:
+        """Hash a prefix so long instruction blocks are not kept twice as dict keys."""
+        return hashlib.sha256(prefix.encode('utf-8')).hexdigest()
+
+    def get_state(self, prefix: str) -> Any:
+        """
+        Get the encoded state for a prefix, encoding it on first use.
+        Args:
+            prefix (str): The static prompt prefix.
+        Returns:
+            Any: The backend's encoded prefix state.
+        """
+        key = self._key(prefix)
+        with self._lock:
+            if key in self._states:
+                self.hits += 1
+                self._states.move_to_end(key)
+                return self._states[key]
+            pending = self._encoding.get(key)
+            encoding_here = pending is None
+            if encoding_here:
+                self.misses += 1
+                pending = self._encoding[key] = Future()
+            else:
+                self.hits += 1
+
+        if not encoding_here:
+            # Another request is encoding this prefix: wait for it instead of encoding twice
+            return pending.result()
+
+        # Encode outside the lock, so a slow encode never holds up hits on other prefixes
+        try:
+            state = self.backend.encode_prefix(prefix)
+        except BaseException as e:
+            with self._lock:
+                del self._encoding[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            self._states[key] = state
+            del self._encoding[key]
+            while len(self._states) > self.max_entries:
+                self._states.popitem(last=False)
+                self.evictions += 1
+        pending.set_result(state)
+        return state
+
+    def generate(self, prefix: str, suffix: str, **kwargs) -> str:
+        """
+        Generate text for prefix + suffix, reusing the cached prefix state.
+        Args:
+            prefix (str): The static prompt prefix.
+            suffix (str): The per-request part of the prompt.
+            **kwargs: Generation options passed to the backend (e.g. max_new_tokens).
+        Returns:
+            str: The generated text.
+        """
+        state = self.get_state(prefix)
+        return self.backend.generate_from_prefix(state, suffix, **kwargs)
+
+    def stream(self, prefix: str, suffix: str, **kwargs) -> Iterator[str]:
+        """
+        Like generate(), but yield text as it is produced. Backends without
+        stream_from_prefix yield the whole completion at once.
+        """
+        state = self.get_state(prefix)
+        stream_from_prefix = getattr(self.backend, 'stream_from_prefix', None)
+        if stream_from_prefix is None:
+            yield self.backend.generate_from_prefix(state, suffix, **kwargs)
+        else:
+            yield from stream_from_prefix(state, suffix, **kwargs)
+
+    def clear(self):
+        """Drop all cached prefix states."""
+        with self._lock:
+            self._states.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """Get cache hit/miss counters."""
+        with self._lock:
+            return {
+                'entries': len(self._states),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
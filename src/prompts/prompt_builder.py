@@ -0,0 +1,335 @@
+"""
+Compact, token-budgeted prompt construction for the Bedtime Story Generator.
+"""
+
+import logging
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Tuple
+
+from ..models import ChildPreferences, WeatherInfo, TimeInfo
+
+logger = logging.getLogger(__name__)
+
+# The result of building a prompt: the text to send plus its token accounting.
+@dataclass
+class BuiltPrompt:
+    """Data class to store a built prompt and its token budget."""
+    text: str                      # Prompt text sent to the model (prefix + suffix)
+    prefix: str                    # Static instructions, identical for every request
+    suffix: str                    # Per-child details that follow the prefix
+    input_tokens: int              # Token count of the prompt text
+    max_output_tokens: int         # Output token limit derived from the story length
+    dropped_sections: List[str] = field(default_factory=list)  # Optional sections removed to fit the budget
+    stop: Tuple[str, ...] = ()     # Stop sequences that end the completion
+    max_paragraphs: Optional[int] = None  # Paragraphs after which reading stops
+    min_words: int = 0             # Fewer usable words than this means the output is unusable
+
+class PromptBuilder:
+    """
+    Build compact story prompts that fit an input token budget.
+    The prompt has no indentation, mentions each preference once, and drops
+    optional sections (lowest priority first) when it would exceed the
+    configured input budget.
+    The prompt starts with a fixed instruction prefix followed by a per-child
+    suffix, so a local backend can reuse the encoded prefix across requests.
+    """
+
+    # Static instructions (the original ten story requirements, condensed). The trailing
+    # newline keeps the prefix/suffix boundary on a token boundary.
+    INSTRUCTION_PREFIX = (
+        "Write a magical, child-friendly bedtime story starring the child below. "
+        "Use their favorite animal and color, match their mood and interests, "
+        "weave in the weather and season, teach the fact playfully, "
+        "keep the language simple and end calmly for sleep.\n"
+    )
+
+    # Paragraph guidance for each story length (built once, not per call)
+    LENGTH_GUIDE = {
+        "short": "3-4 paragraphs",
+        "medium": "5-6 paragraphs",
+        "long": "7-8 paragraphs"
+    }
+
+    # Output token limit for each story length; replaces a fixed max_length of 500
+    OUTPUT_TOKEN_LIMITS = {
+        "short": 220,
+        "medium": 360,
+        "long": 500
+    }
+
+    # Chat artifacts that mean the model has left the story (DialoGPT often continues the "dialogue")
+    STOP_SEQUENCES = ("\nHuman:", "\nUser:", "\nAssistant:", "\nChild:", "<|endoftext|>", "The End", "THE END")
+
+    # Paragraph cap and minimum usable words for each story length
+    MAX_PARAGRAPHS = {
+        "short": 4,
+        "medium": 6,
+        "long": 8
+    }
+    MIN_WORDS = {
+        "short": 60,
+        "medium": 100,
+        "long": 160
+    }
+
+    DEFAULT_INPUT_TOKEN_BUDGET = 160
+
+    # Long stories can be written as an outline plus this many sections generated in parallel
+    SECTION_COUNTS = {
+        "long": 4
+    }
+    SECTION_LENGTH = "about 2 paragraphs"
+    OUTLINE_TOKENS_PER_SECTION = 24
+    # Each section may use a little more than its even share of the story's output tokens
+    SECTION_TOKEN_MARGIN = 1.15
+
+    # Static instructions for the outline and section prompts (kept separate so each prefix stays cacheable)
+    OUTLINE_PREFIX = (
+        "Outline a magical, child-friendly bedtime story starring the child below. "
+        "Reply with one short numbered line per part, from the opening to a calm, sleepy ending.\n"
+    )
+    SECTION_PREFIX = (
+        "Write one part of a magical, child-friendly bedtime story starring the child below. "
+        "Follow the outline, write only the requested part, use their favorite animal and color, "
+        "and keep the language simple.\n"
+    )
+
+    # Used for outline lines the model did not provide
+    DEFAULT_OUTLINE = (
+        "The child meets their favorite animal as the evening begins",
+        "They set off on a gentle adventure through the child's interests",
+        "They discover something wonderful and learn the fact together",
+        "They float home and drift off to sleep"
+    )
+
+    _OUTLINE_LINE = re.compile(r'^\s*(?:\d+\s*[.):-]|[-*\u2022])\s*(.+?)\s*$', re.MULTILINE)
+
+    # Words, numbers and individual punctuation marks each count as one token
+    _TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+    def __init__(self, input_token_budget: int = DEFAULT_INPUT_TOKEN_BUDGET,
+                 token_counter: Optional[Callable[[str], int]] = None):
+        """
+        Args:
+            input_token_budget (int): Maximum number of prompt tokens to send.
+            token_counter (Optional[Callable[[str], int]]): Counts tokens in a string. Pass the
+                model tokenizer for exact counts; defaults to a word/punctuation estimate.
+        """
+        self.input_token_budget = input_token_budget
+        self.token_counter = token_counter or self.estimate_tokens
+        # The prefixes never change, so count them once
+        self.prefix_tokens = self.token_counter(self.INSTRUCTION_PREFIX)
+        self._prefix_token_counts = {
+            prefix: self.token_counter(prefix)
+            for prefix in (self.INSTRUCTION_PREFIX, self.OUTLINE_PREFIX, self.SECTION_PREFIX)
+        }
+
+    @classmethod
+    def estimate_tokens(cls, text: str) -> int:
+        """
+        Estimate the number of tokens in a string without loading a tokenizer.
+        Args:
+            text (str): The text to measure.
+        Returns:
+            int: Approximate token count.
+        """
+        return len(cls._TOKEN_PATTERN.findall(text))
+
+    @staticmethod
+    def compact(text: str) -> str:
+        """Strip indentation, trailing spaces and blank lines from prompt text."""
+        lines = (' '.join(line.split()) for line in text.splitlines())
+        return '\n'.join(line for line in lines if line)
+
+    @classmethod
+    def max_output_tokens(cls, story_length: str) -> int:
+        """Get the output token limit for a story length (defaults to medium)."""
+        return cls.OUTPUT_TOKEN_LIMITS.get(story_length, cls.OUTPUT_TOKEN_LIMITS["medium"])
+
+    @classmethod
+    def section_count(cls, story_length: str) -> int:
+        """Number of parallel sections for a story length (1 means a single completion)."""
+        return cls.SECTION_COUNTS.get(story_length, 1)
+
+    def _sections(self, preferences: ChildPreferences, weather: WeatherInfo,
+                  time_info: TimeInfo, educational_fact: str,
+                  length: Optional[str] = None) -> List[Tuple[str, str, bool]]:
+        """
+        Build the per-child prompt sections in output order.
+        Args:
+            length (Optional[str]): Length guidance; defaults to the guide for the story length.
+        Returns:
+            List[Tuple[str, str, bool]]: (section name, text, required) for each section.
+        """
+        length = length or self.LENGTH_GUIDE.get(preferences.story_length, self.LENGTH_GUIDE["medium"])
+        interests = ', '.join(preferences.interests)
+
+        return [
+            ("child", f"Child: {preferences.name}, age {preferences.age}. Length: {length}.", True),
+            ("preferences", f"Mood: {preferences.mood}. Interests: {interests}. "
+                            f"Favorite: {preferences.favorite_color} {preferences.favorite_animal}.", True),
+            ("setting", f"Setting: {weather.description}, {weather.temperature}°C, "
+                        f"{time_info.season} {time_info.time_of_day}.", False),
+            ("fact", f"Fact: {educational_fact}", False)
+        ]
+
+    def build(self, preferences: ChildPreferences, weather: WeatherInfo,
+              time_info: TimeInfo, educational_fact: str) -> BuiltPrompt:
+        """
+        Build a compact prompt that fits the input token budget.
+        Optional suffix sections are dropped from the end (fact, then setting)
+        until the prompt fits. The prefix and required sections are never dropped.
+        Args:
+            preferences (ChildPreferences): The child's preferences and story settings.
+            weather (WeatherInfo): Weather context.
+            time_info (TimeInfo): Time/date context.
+            educational_fact (str): Educational fact to include.
+        Returns:
+            BuiltPrompt: The prompt text and its token accounting.
+        """
+        return self._assemble(
+            "story",
+            self.INSTRUCTION_PREFIX,
+            self._sections(preferences, weather, time_info, educational_fact),
+            self.max_output_tokens(preferences.story_length),
+            max_paragraphs=self.MAX_PARAGRAPHS.get(preferences.story_length, self.MAX_PARAGRAPHS["medium"]),
+            min_words=self.MIN_WORDS.get(preferences.story_length, self.MIN_WORDS["medium"])
+        )
+
+    def _assemble(self, kind: str, prefix: str, sections: List[Tuple[str, str, bool]],
+                  max_output_tokens: int, max_paragraphs: Optional[int] = None,
+                  min_words: int = 0) -> BuiltPrompt:
+        """
+        Join a static prefix and suffix sections, dropping optional sections
+        from the end until the prompt fits the input token budget.
+        Args:
+            kind (str): Prompt kind, for logging.
+            prefix (str): Static instructions.
+            sections (List[Tuple[str, str, bool]]): (name, text, required) in output order.
+            max_output_tokens (int): Output token limit for the completion.
+            max_paragraphs (Optional[int]): Paragraph cap for the completion.
+            min_words (int): Minimum usable words in the completion.
+        Returns:
+            BuiltPrompt: The prompt text and its token accounting.
+        """
+        sections = [(name, self.compact(text), required) for name, text, required in sections]
+        token_counts = {name: self.token_counter(text) for name, text, _ in sections}
+
+        dropped = []
+        prefix_tokens = self._prefix_token_counts.get(prefix)
+        if prefix_tokens is None:
+            prefix_tokens = self.token_counter(prefix)
+        total = prefix_tokens + sum(token_counts.values())
+        for name, _, required in reversed(sections):
+            if total <= self.input_token_budget:
+                break
+            if not required:
+                dropped.append(name)
+                total -= token_counts[name]
+
+        suffix = '\n'.join(text for name, text, _ in sections if name not in dropped)
+        text = prefix + suffix
+        input_tokens = self.token_counter(text)
+        if input_tokens > self.input_token_budget:
+            logger.warning("Prompt uses %d tokens, over the %d token budget even with optional sections dropped",
+                           input_tokens, self.input_token_budget)
+
+        prompt = BuiltPrompt(
+            text=text,
+            prefix=prefix,
+            suffix=suffix,
+            input_tokens=input_tokens,
+            max_output_tokens=max_output_tokens,
+            dropped_sections=dropped,
+            stop=self.STOP_SEQUENCES,
+            max_paragraphs=max_paragraphs,
+            min_words=min_words
+        )
+        logger.info("Built %s prompt: %d input tokens (budget %d), max %d output tokens, dropped %s",
+                    kind, prompt.input_tokens, self.input_token_budget, prompt.max_output_tokens,
+                    dropped or "nothing")
+        return prompt
+
+    def build_outline(self, preferences: ChildPreferences, weather: WeatherInfo,
+                      time_info: TimeInfo, educational_fact: str) -> BuiltPrompt:
+        """
+        Build the prompt asking for a short outline, one line per section.
+        Args:
+            preferences (ChildPreferences): The child's preferences and story settings.
+            weather (WeatherInfo): Weather context.
+            time_info (TimeInfo): Time/date context.
+            educational_fact (str): Educational fact to include.
+        Returns:
+            BuiltPrompt: The outline prompt.
+        """
+        count = self.section_count(preferences.story_length)
+        sections = self._sections(preferences, weather, time_info, educational_fact,
+                                  length=f"{count} parts")
+        return self._assemble("outline", self.OUTLINE_PREFIX, sections, self.OUTLINE_TOKENS_PER_SECTION * count)
+
+    def build_section(self, preferences: ChildPreferences, weather: WeatherInfo, time_info: TimeInfo,
+                      educational_fact: str, outline: List[str], index: int) -> BuiltPrompt:
+        """
+        Build the prompt for one section of an outlined story.
+        Every section sees the whole outline; the setting goes to the first section
+        and the fact to the second, so they are not repeated in every part.
+        Args:
+            preferences (ChildPreferences): The child's preferences and story settings.
+            weather (WeatherInfo): Weather context.
+            time_info (TimeInfo): Time/date context.
+            educational_fact (str): Educational fact to include.
+            outline (List[str]): One line per section, from parse_outline().
+            index (int): Which section to write (0-based).
+        Returns:
+            BuiltPrompt: The section prompt.
+        """
+        count = len(outline)
+        sections = [section for section in self._sections(preferences, weather, time_info, educational_fact,
+                                                          length=self.SECTION_LENGTH)
+                    if section[0] in ("child", "preferences")
+                    or (section[0] == "setting" and index == 0)
+                    or (section[0] == "fact" and index == min(1, count - 1))]
+
+        part = f"Write part {index + 1} of {count}: {outline[index]}."
+        if index == 0:
+            part += " Start with 'Once upon a time'."
+        elif index == count - 1:
+            part += " End gently, ready for sleep."
+        sections[2:2] = [
+            ("outline", "Outline: " + ' '.join(f"{i + 1}. {line}." for i, line in enumerate(outline)), True),
+            ("part", part, True)
+        ]
+
+        total = self.max_output_tokens(preferences.story_length)
+        max_output_tokens = int(total / count * self.SECTION_TOKEN_MARGIN)
+        max_paragraphs = math.ceil(self.MAX_PARAGRAPHS.get(preferences.story_length, self.MAX_PARAGRAPHS["medium"]) / count)
+        min_words = self.MIN_WORDS.get(preferences.story_length, self.MIN_WORDS["medium"]) // count
+        return self._assemble(f"section {index + 1}/{count}", self.SECTION_PREFIX, sections, max_output_tokens,
+                              max_paragraphs=max_paragraphs, min_words=min_words)
+
+    @classmethod
+    def parse_outline(cls, text: str, count: int) -> List[str]:
+        """
+        Extract outline lines from the model's reply.
+        Numbered or bulleted lines are used if there are any, otherwise plain lines; missing
+        lines are filled from DEFAULT_OUTLINE so there are always `count` of them.
+        Args:
+            text (str): The outline completion.
+            count (int): Number of sections.
+        Returns:
+            List[str]: Exactly `count` outline lines.
+        """
+        lines = cls._OUTLINE_LINE.findall(text)
+        if not lines:
+            # No numbering: use the non-empty lines, skipping headings such as "Outline:"
+            lines = [line.strip(' -*.') for line in text.splitlines()
+                     if line.strip(' -*.') and not line.rstrip().endswith(':')]
+        lines = [line.rstrip('.') for line in lines[:count]]
+
+        defaults = cls.DEFAULT_OUTLINE
+        for index in range(len(lines), count):
+            position = round(index * (len(defaults) - 1) / max(count - 1, 1))
+            lines.append(defaults[position])
+        return lines
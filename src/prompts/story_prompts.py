@@ -2,55 +2,11 @@
 Story generation prompts for the Bedtime Story Generator.
 """
 
-from typing import Dict
-from ..models import ChildPreferences, WeatherInfo, TimeInfo
-
 class StoryPrompts:
-    """Class to manage story generation prompts."""
-    
-    @staticmethod
-    def create_story_prompt(preferences: ChildPreferences, weather: WeatherInfo, 
-                           time_info: TimeInfo, educational_fact: str) -> str:
-        """Create a detailed prompt for story generation."""
-        
-        length_guide = {
-            "short": "about 3-4 paragraphs",
-            "medium": "about 5-6 paragraphs", 
-            "long": "about 7-8 paragraphs"
-        }
-        
-        prompt = f"""
-        Create a magical bedtime story for {preferences.name}, who is {preferences.age} years old.
-        
-        Child's Preferences:
-        - Current mood: {preferences.mood}
-        - Interests: {', '.join(preferences.interests)}
-        - Favorite animal: {preferences.favorite_animal}
-        - Favorite color: {preferences.favorite_color}
-        - Story length: {length_guide.get(preferences.story_length, 'medium')}
-        
-        Context:
-        - Current weather: {weather.description} ({weather.temperature}°C)
-        - Time of day: {time_info.time_of_day}
-        - Season: {time_info.season}
-        - Educational fact to include: {educational_fact}
-        
-        Story Requirements:
-        1. Make it age-appropriate and child-friendly
-        2. Include {preferences.name} as the main character
-        3. Incorporate the {preferences.favorite_animal} and {preferences.favorite_color} color
-        4. Match the {preferences.mood} mood
-        5. Include elements from their interests: {', '.join(preferences.interests)}
-        6. Weave in the weather and seasonal context naturally
-        7. Include the educational fact in a fun way
-        8. End with a gentle, calming message perfect for bedtime
-        9. Use simple, engaging language
-        10. Make it magical and imaginative
-        
-        Create a heartwarming story that will help {preferences.name} drift off to sleep with beautiful dreams.
-        """
-        
-        return prompt
+    """
+    Class to manage story generation prompts.
+    Story prompts are built by PromptBuilder; this class keeps the fallback templates.
+    """
     
     @staticmethod
     def get_fallback_story_templates() -> list:
@@ -0,0 +1,19 @@
+"""
+Services package for the Bedtime Story Generator.
+"""
+
+from .job_executor import GenerationJob, GenerationJobExecutor, JobCancelledError
+from .http_server import StoryHTTPServer
+from .batch_runner import BatchRunner, BatchSummary
+from .micro_batcher import Histogram, MicroBatchScheduler
+from .request_dispatcher import DispatchTicket, RequestDispatcher, TokenBucket
+from .speculation import SpeculativeGeneration, SpeculativeJob
+from .context_provider import ContextProvider, ContextSnapshot
+from .cassette import Cassette, CassetteMissError
+from .memory_monitor import MemoryMonitor, MemorySnapshot
+
+__all__ = ['GenerationJob', 'GenerationJobExecutor', 'JobCancelledError', 'StoryHTTPServer',
+           'BatchRunner', 'BatchSummary', 'Histogram', 'MicroBatchScheduler', 'DispatchTicket',
+           'RequestDispatcher', 'TokenBucket', 'SpeculativeGeneration', 'SpeculativeJob',
+           'ContextProvider', 'ContextSnapshot', 'Cassette', 'CassetteMissError',
+           'MemoryMonitor', 'MemorySnapshot']
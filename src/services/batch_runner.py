@@ -0,0 +1,230 @@
+"""
+Resumable JSONL batch story generation for the Bedtime Story Generator.
+"""
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, IO, Iterable, Iterator, List, Optional, Set, Tuple
+
+from ..models import ChildPreferences, StoryContext
+from ..tools import WeatherTool
+
+# Summary of a batch run, printed at the end.
+@dataclass
+class BatchSummary:
+    """Data class to store the results of a batch run."""
+    generated: int = 0               # Stories written in this run
+    failed: int = 0                  # Records that could not be generated
+    skipped: int = 0                 # Records already completed by an earlier run
+    elapsed_seconds: float = 0.0     # Wall-clock time of this run
+    latencies: List[float] = field(default_factory=list, repr=False)  # Seconds per generated story
+
+    @property
+    def stories_per_second(self) -> float:
+        return self.generated / self.elapsed_seconds if self.elapsed_seconds else 0.0
+
+    def percentile(self, fraction: float) -> float:
+        """Latency percentile in seconds (e.g. 0.95 for p95)."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+    def format(self) -> str:
+        """Human-readable throughput summary."""
+        return (f"Generated {self.generated} stories ({self.failed} failed, {self.skipped} already done) "
+                f"in {self.elapsed_seconds:.1f}s: {self.stories_per_second:.2f} stories/s, "
+                f"latency p50 {self.percentile(0.5) * 1000:.0f} ms, p95 {self.percentile(0.95) * 1000:.0f} ms")
+
+class BatchRunner:
+    """
+    Generate stories for a stream of JSONL preference records.
+
+    Each input line is a JSON object with ChildPreferences fields and an optional
+    "id" (defaults to the line number). Results are written to the output as JSONL
+    as soon as each story completes. Completed IDs are appended to a checkpoint
+    file, so an interrupted run can be restarted with the same arguments and only
+    the unfinished records are generated. Failed records are written to the output
+    with an "error" but not checkpointed, so the next run retries them.
+    """
+
+    def __init__(self, generator_factory: Callable[[], object], workers: int = 4,
+                 fallback_only: bool = False, checkpoint_path: Optional[str] = None):
+        """
+        Args:
+            generator_factory (Callable[[], object]): Creates a StoryGenerator; each worker thread gets one.
+            workers (int): Number of stories generated in parallel.
+            fallback_only (bool): Use the template (fallback) generator instead of the LLM, with fixed
+                offline weather (no network access at all).
+            checkpoint_path (Optional[str]): File recording completed record IDs.
+        """
+        self.generator_factory = generator_factory
+        self.workers = max(workers, 1)
+        self.fallback_only = fallback_only
+        self.checkpoint_path = checkpoint_path
+        self._local = threading.local()
+
+    def _generator(self):
+        """Get this worker thread's StoryGenerator, creating it on first use."""
+        generator = getattr(self._local, 'generator', None)
+        if generator is None:
+            generator = self.generator_factory()
+            self._local.generator = generator
+        return generator
+
+    @staticmethod
+    def read_records(lines: Iterable[str]) -> Iterator[Tuple[str, Optional[dict], Optional[str]]]:
+        """
+        Parse JSONL input lazily.
+        Yields:
+            Tuple[str, Optional[dict], Optional[str]]: (record ID, record or None, parse error or None).
+        """
+        for line_number, line in enumerate(lines, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield f"line-{line_number}", None, f"Invalid JSON: {e}"
+                continue
+            record_id = str(record.get('id', f"line-{line_number}")) if isinstance(record, dict) else f"line-{line_number}"
+            yield record_id, record, None
+
+    def load_completed_ids(self, output_path: Optional[str] = None) -> Set[str]:
+        """
+        Collect IDs finished by earlier runs from the checkpoint and output files.
+        Records that failed are not included, so they are retried.
+        Args:
+            output_path (Optional[str]): Output file of an earlier run, if writing to a file.
+        Returns:
+            Set[str]: IDs that must not be generated again.
+        """
+        completed: Set[str] = set()
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, encoding='utf-8') as checkpoint:
+                completed.update(line.strip() for line in checkpoint if line.strip())
+
+        # A story may have been written just before an interruption, ahead of its checkpoint entry
+        if output_path and os.path.exists(output_path):
+            with open(output_path, encoding='utf-8') as output:
+                for line in output:
+                    try:
+                        result = json.loads(line)
+                        if 'error' not in result:
+                            completed.add(str(result['id']))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        return completed
+
+    @staticmethod
+    def offline_context(generator, preferences: ChildPreferences) -> StoryContext:
+        """
+        Build a story context without the weather API (for fallback-only runs).
+        Args:
+            generator: The worker's StoryGenerator (its time and search tools are used).
+            preferences (ChildPreferences): The child's preferences.
+        Returns:
+            StoryContext: Context with the fixed fallback weather.
+        """
+        return StoryContext(
+            preferences=preferences,
+            weather=WeatherTool.fallback_weather(),
+            time_info=generator.time_tool.get_time_info(generator.timezone),
+            educational_fact=generator.search_tool.search_facts(random.choice(preferences.interests))
+        )
+
+    def _generate(self, record_id: str, record: dict) -> Dict:
+        """Generate one story; runs on a worker thread."""
+        started = time.perf_counter()
+        preferences = ChildPreferences.from_dict(record)
+        generator = self._generator()
+        if self.fallback_only:
+            context = self.offline_context(generator, preferences)
+            story = generator._generate_fallback_story(context)
+            generator._archive_story(story, context)
+        else:
+            story = generator.generate_story(preferences)
+        return {
+            'id': record_id,
+            'name': preferences.name,
+            'story': story,
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+
+    def run(self, lines: Iterable[str], output: IO[str], output_path: Optional[str] = None,
+            on_result: Optional[Callable[[Dict], None]] = None) -> BatchSummary:
+        """
+        Generate stories for all unfinished records.
+        Args:
+            lines (Iterable[str]): JSONL input lines.
+            output (IO[str]): Where result lines are written.
+            output_path (Optional[str]): Path of the output file, used to resume from it.
+            on_result (Optional[Callable[[Dict], None]]): Called with each written result.
+        Returns:
+            BatchSummary: Counts, timing and throughput of this run.
+        """
+        summary = BatchSummary()
+        completed = self.load_completed_ids(output_path)
+        checkpoint = open(self.checkpoint_path, 'a', encoding='utf-8') if self.checkpoint_path else None
+        started = time.perf_counter()
+
+        def write(result: Dict):
+            output.write(json.dumps(result, ensure_ascii=False) + '\n')
+            output.flush()
+            # Failures stay out of the checkpoint so a resumed run retries them
+            if checkpoint is not None and 'error' not in result:
+                checkpoint.write(result['id'] + '\n')
+                checkpoint.flush()
+            if on_result is not None:
+                on_result(result)
+
+        # Bound the number of records held in memory to a few per worker
+        max_in_flight = self.workers * 2
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="story-batch") as pool:
+                in_flight = {}
+
+                def collect(block: bool):
+                    done, _ = wait(in_flight, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record_id = in_flight.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            summary.failed += 1
+                            write({'id': record_id, 'error': str(e)})
+                            continue
+                        summary.generated += 1
+                        summary.latencies.append(result['elapsed_ms'] / 1000)
+                        write(result)
+
+                for record_id, record, error in self.read_records(lines):
+                    if record_id in completed:
+                        summary.skipped += 1
+                        continue
+                    completed.add(record_id)
+                    if error is not None:
+                        summary.failed += 1
+                        write({'id': record_id, 'error': error})
+                        continue
+
+                    in_flight[pool.submit(self._generate, record_id, record)] = record_id
+                    if len(in_flight) >= max_in_flight:
+                        collect(block=True)
+                    else:
+                        collect(block=False)
+
+                while in_flight:
+                    collect(block=True)
+        finally:
+            if checkpoint is not None:
+                checkpoint.close()
+            summary.elapsed_seconds = time.perf_counter() - started
+
+        return summary
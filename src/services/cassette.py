@@ -0,0 +1,189 @@
+"""
+Record/replay of LLM and weather API calls for the Bedtime Story Generator.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+class CassetteMissError(Exception):
+    """Raised in replay mode when the cassette has no recording for a request."""
+
+class Cassette:
+    """
+    Record external calls to a JSONL file and serve them back later.
+
+    In record mode every call runs for real; its request, response (or error) and
+    duration are appended to the file as one JSON line. In replay mode nothing
+    leaves the process: each call returns the recorded response, or raises the
+    recorded error, optionally after sleeping for the recorded duration.
+
+    Replay matches calls to recordings by request ('exact', the default; repeated
+    requests get their recordings in order) or simply by order per kind of call
+    ('sequence'), for runs whose prompts differ (prompts include the time and a
+    random fact). Secrets such as API keys are never part of a request.
+    """
+
+    RECORD = 'record'
+    REPLAY = 'replay'
+
+    def __init__(self, path: str, mode: str = REPLAY, match: str = 'exact',
+                 replay_latency: bool = False, latency_scale: float = 1.0):
+        """
+        Args:
+            path (str): Cassette file (JSON lines).
+            mode (str): 'record' (append real calls) or 'replay' (serve recorded ones).
+            match (str): How replay finds a recording: 'exact' request or 'sequence'.
+            replay_latency (bool): Sleep for each call's recorded duration when replaying.
+            latency_scale (float): Multiplier for replayed durations.
+        """
+        if mode not in (self.RECORD, self.REPLAY):
+            raise ValueError(f"Unknown cassette mode {mode!r}")
+        if match not in ('exact', 'sequence'):
+            raise ValueError(f"Unknown cassette match {match!r}")
+        self.path = path
+        self.mode = mode
+        self.match = match
+        self.replay_latency = replay_latency
+        self.latency_scale = latency_scale
+
+        self._lock = threading.Lock()
+        self._by_key: Dict[str, List[Dict]] = defaultdict(list)
+        self._by_kind: Dict[str, List[Dict]] = defaultdict(list)
+        self._served: Dict[str, int] = defaultdict(int)
+        self.recorded = 0
+        self.replayed = 0
+        if mode == self.REPLAY:
+            self._load()
+
+    @classmethod
+    def from_options(cls, record: Optional[str] = None, replay: Optional[str] = None,
+                     **kwargs) -> Optional['Cassette']:
+        """Create a cassette from --record/--replay style options, or None if neither is set."""
+        if record and replay:
+            raise ValueError("Choose either recording or replaying a cassette, not both")
+        if record:
+            return cls(record, mode=cls.RECORD, **kwargs)
+        if replay:
+            return cls(replay, mode=cls.REPLAY, **kwargs)
+        return None
+
+    @staticmethod
+    def request_key(kind: str, request: Dict[str, Any]) -> str:
+        """Stable hash of a request, used to find its recording."""
+        canonical = json.dumps([kind, request], sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        return hashlib.blake2b(canonical.encode('utf-8'), digest_size=12).hexdigest()
+
+    def _load(self):
+        """Index the recordings in the cassette file."""
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette {self.path} does not exist; record one first")
+        with open(self.path, encoding='utf-8') as cassette:
+            for line in cassette:
+                if not line.strip():
+                    continue
+                interaction = json.loads(line)
+                self._by_key[interaction['key']].append(interaction)
+                self._by_kind[interaction['kind']].append(interaction)
+
+    def _append(self, interaction: Dict):
+        """Write one recording (whole lines only, so concurrent calls never interleave)."""
+        line = json.dumps(interaction, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as cassette:
+                cassette.write(line)
+            self.recorded += 1
+
+    def _next_recording(self, kind: str, key: str) -> Dict:
+        """The recording to serve for this call (in order, cycling when calls outnumber recordings)."""
+        recordings = self._by_key.get(key) if self.match == 'exact' else self._by_kind.get(kind)
+        slot = key if self.match == 'exact' else kind
+        if not recordings:
+            raise CassetteMissError(f"No recorded {kind} call matches this request (key {key})")
+        with self._lock:
+            index = self._served[slot] % len(recordings)
+            self._served[slot] += 1
+            self.replayed += 1
+        return recordings[index]
+
+    def _replay(self, kind: str, request: Dict[str, Any]) -> Dict:
+        """Wait out the recorded latency if asked, then return the recording."""
+        interaction = self._next_recording(kind, self.request_key(kind, request))
+        if self.replay_latency:
+            time.sleep(interaction['elapsed_ms'] * self.latency_scale / 1000)
+        if interaction.get('error') is not None:
+            raise RuntimeError(f"Recorded {kind} error: {interaction['error']}")
+        return interaction
+
+    def call(self, kind: str, request: Dict[str, Any], perform: Callable[[], Any]) -> Any:
+        """
+        Run (record mode) or replay one call with a JSON-serializable result.
+        Args:
+            kind (str): Kind of call, e.g. 'weather'.
+            request (Dict[str, Any]): What identifies the call (no secrets).
+            perform (Callable[[], Any]): Makes the real call.
+        Returns:
+            Any: The real or recorded response.
+        """
+        if self.mode == self.REPLAY:
+            return self._replay(kind, request)['response']
+
+        started = time.perf_counter()
+        response, error = None, None
+        try:
+            response = perform()
+            return response
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._append({
+                'kind': kind, 'key': self.request_key(kind, request), 'request': request,
+                'response': response, 'error': error,
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 3), 'recorded_at': time.time()
+            })
+
+    def stream(self, kind: str, request: Dict[str, Any], perform: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """
+        Run (record mode) or replay a call that streams text.
+        A recording holds the text that was read; if the reader stopped early
+        (e.g. at a stop sequence) it is marked as truncated.
+        Args:
+            kind (str): Kind of call, e.g. 'llm'.
+            request (Dict[str, Any]): What identifies the call (no secrets).
+            perform (Callable[[], Iterator[str]]): Starts the real stream.
+        Yields:
+            str: Pieces of the real or recorded response.
+        """
+        if self.mode == self.REPLAY:
+            yield self._replay(kind, request)['response']
+            return
+
+        started = time.perf_counter()
+        chunks: List[str] = []
+        error, complete = None, False
+        try:
+            for chunk in perform():
+                chunks.append(chunk)
+                yield chunk
+            complete = True
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._append({
+                'kind': kind, 'key': self.request_key(kind, request), 'request': request,
+                'response': ''.join(chunks), 'error': error, 'truncated': not complete and error is None,
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 3), 'recorded_at': time.time()
+            })
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of recorded and replayed calls, and recordings loaded per kind."""
+        with self._lock:
+            report = {'recorded': self.recorded, 'replayed': self.replayed}
+            report.update({f"loaded_{kind}": len(items) for kind, items in self._by_kind.items()})
+            return report
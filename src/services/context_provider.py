@@ -0,0 +1,196 @@
+"""
+Background story context snapshots for the Bedtime Story Generator.
+"""
+
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from ..models import ChildPreferences, StoryContext, TimeInfo, WeatherInfo
+from ..tools import City, SearchTool, TimeTool, WeatherTool
+
+# The weather and time for one place, refreshed in the background.
+@dataclass(frozen=True)
+class ContextSnapshot:
+    """Data class to store precomputed weather and time for a city and timezone."""
+    city: str                        # City the weather is for (its gazetteer ID when known)
+    timezone: Optional[str]          # IANA timezone of the time info (None: server local time)
+    weather: WeatherInfo             # Weather at the last refresh
+    time_info: TimeInfo              # Time at the last refresh
+    weather_refreshed_at: float      # When the weather was fetched (epoch seconds; 0 while only fallback weather is known)
+    time_refreshed_at: float         # When the time info was computed (epoch seconds)
+
+class ContextProvider:
+    """
+    Keep a fresh weather and time snapshot for every city/timezone in use.
+
+    A background thread refreshes the time info every TIME_REFRESH_SECONDS and the
+    weather every weather_refresh_seconds, so building a StoryContext for a
+    request (context_for) only picks an educational fact from memory. A place is
+    tracked from its first request until it has not been asked for in
+    IDLE_SECONDS; that first request waits for one synchronous refresh, which
+    concurrent first requests for the same place wait for and share.
+
+    A failed weather lookup keeps the previous weather (and is retried on the
+    next refresh); a place whose weather was never fetched gets the fallback
+    weather until a lookup succeeds.
+    """
+
+    # Used when a request does not name a city
+    DEFAULT_CITY = WeatherTool.DEFAULT_CITY
+
+    DEFAULT_WEATHER_REFRESH_SECONDS = 300
+    TIME_REFRESH_SECONDS = 30
+    IDLE_SECONDS = 3600
+
+    def __init__(self, weather_tool: Optional[WeatherTool] = None, time_tool: Optional[TimeTool] = None,
+                 search_tool: Optional[SearchTool] = None,
+                 weather_refresh_seconds: float = DEFAULT_WEATHER_REFRESH_SECONDS):
+        """
+        Args:
+            weather_tool (Optional[WeatherTool]): Fetches weather (give it a cache to share lookups between processes).
+            time_tool (Optional[TimeTool]): Computes time info.
+            search_tool (Optional[SearchTool]): Picks educational facts.
+            weather_refresh_seconds (float): How old a weather snapshot may get.
+        """
+        self.weather_tool = weather_tool or WeatherTool()
+        self.time_tool = time_tool or TimeTool()
+        self.search_tool = search_tool or SearchTool()
+        self.weather_refresh_seconds = weather_refresh_seconds
+
+        self._snapshots: Dict[Tuple[str, Optional[str]], ContextSnapshot] = {}
+        # The place each key's weather is looked up as (None: not a place, always the fallback)
+        self._places: Dict[Tuple[str, Optional[str]], Optional[City]] = {}
+        # Held while a new place's first refresh runs, so concurrent first requests fetch once
+        self._first_refreshes: Dict[Tuple[str, Optional[str]], threading.Lock] = {}
+        self._last_used: Dict[Tuple[str, Optional[str]], float] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refreshes = 0
+
+    def start(self):
+        """Start the background refresh thread (done automatically on first use)."""
+        with self._lock:
+            if self._thread is None and not self._closed.is_set():
+                self._thread = threading.Thread(target=self._refresh_loop, name="context-provider", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Stop the background refresh thread."""
+        self._closed.set()
+        self._wake.set()
+
+    def snapshot(self, city: Optional[str] = None, timezone: Optional[str] = None) -> ContextSnapshot:
+        """
+        Get the current snapshot for a place, refreshing it now only if it is new.
+        Args:
+            city (Optional[str]): City for the weather (default: DEFAULT_CITY).
+            timezone (Optional[str]): IANA timezone such as 'Asia/Kolkata' (default, or if unknown:
+                server local time).
+        Returns:
+            ContextSnapshot: Weather and time for the place.
+        """
+        timezone = TimeTool.valid_timezone(timezone)
+        # Spellings of the same city share one snapshot (unlisted places by their normalized name)
+        resolved = self.weather_tool.resolve_city(city or self.DEFAULT_CITY)
+        key = (resolved.id if resolved is not None else city, timezone)
+        with self._lock:
+            self._last_used[key] = time.time()
+            self._places.setdefault(key, resolved)
+            snapshot = self._snapshots.get(key)
+            if snapshot is None:
+                first_refresh = self._first_refreshes.setdefault(key, threading.Lock())
+        if snapshot is None:
+            self.start()
+            with first_refresh:
+                with self._lock:
+                    snapshot = self._snapshots.get(key)
+                if snapshot is None:
+                    snapshot = self._refresh(key, None)
+            with self._lock:
+                self._first_refreshes.pop(key, None)
+        return snapshot
+
+    def context_for(self, preferences: ChildPreferences, city: Optional[str] = None,
+                    timezone: Optional[str] = None) -> StoryContext:
+        """
+        Build a StoryContext from the place's snapshot and a fact for one of the child's interests.
+        Args:
+            preferences (ChildPreferences): The child's preferences and story settings.
+            city (Optional[str]): City for the weather.
+            timezone (Optional[str]): Timezone for the time info.
+        Returns:
+            StoryContext: Context ready for StoryGenerator.generate_story(context=...).
+        """
+        snapshot = self.snapshot(city, timezone)
+        return StoryContext(
+            preferences=preferences,
+            weather=snapshot.weather,
+            time_info=snapshot.time_info,
+            educational_fact=self.search_tool.search_facts(random.choice(preferences.interests))
+        )
+
+    def tracked(self) -> List[ContextSnapshot]:
+        """Snapshots of every place currently kept fresh."""
+        with self._lock:
+            return list(self._snapshots.values())
+
+    def _refresh(self, key: Tuple[str, Optional[str]], previous: Optional[ContextSnapshot]) -> ContextSnapshot:
+        """Recompute the time info, and the weather if it is due, for one place."""
+        city, timezone = key
+        now = time.time()
+        weather = previous.weather if previous is not None else None
+        weather_refreshed_at = previous.weather_refreshed_at if previous is not None else 0.0
+        if weather is None or now - weather_refreshed_at >= self.weather_refresh_seconds:
+            # The key only has the place's ID; its query (the name as typed, if unlisted) is kept aside
+            with self._lock:
+                place = self._places.get(key)
+            fetched = self.weather_tool.weather_for(place) if place is not None else None
+            if fetched is not None:
+                weather, weather_refreshed_at = fetched, now
+            elif weather is None:
+                # Nothing better yet; weather_refreshed_at stays 0 so the next refresh tries again
+                weather = WeatherTool.fallback_weather()
+            else:
+                print(f"Keeping the previous weather for {city}")
+
+        snapshot = ContextSnapshot(
+            city=city,
+            timezone=timezone,
+            weather=weather,
+            time_info=self.time_tool.get_time_info(timezone),
+            weather_refreshed_at=weather_refreshed_at,
+            time_refreshed_at=now
+        )
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self.refreshes += 1
+        return snapshot
+
+    def _refresh_loop(self):
+        """Refresh every tracked place until closed, forgetting places nobody asks for."""
+        while not self._closed.is_set():
+            self._wake.wait(self.TIME_REFRESH_SECONDS)
+            self._wake.clear()
+            if self._closed.is_set():
+                break
+
+            now = time.time()
+            with self._lock:
+                for key, last_used in list(self._last_used.items()):
+                    if now - last_used > self.IDLE_SECONDS:
+                        del self._last_used[key]
+                        self._snapshots.pop(key, None)
+                        self._places.pop(key, None)
+                due = list(self._snapshots.items())
+
+            for key, snapshot in due:
+                try:
+                    self._refresh(key, snapshot)
+                except Exception as e:
+                    # Keep serving the previous snapshot
+                    print(f"Context refresh error for {key[0]}: {e}")
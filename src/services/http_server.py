@@ -0,0 +1,372 @@
+"""
+Headless HTTP story-generation service for the Bedtime Story Generator.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from ..models import ChildPreferences
+from ..utils import StoryRenderer
+
+logger = logging.getLogger(__name__)
+
+class RequestError(Exception):
+    """An HTTP error to report to the client."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class StoryHTTPServer:
+    """
+    Minimal asyncio HTTP server in front of StoryGenerator.
+
+    Endpoints:
+        POST /stories   Generate a story from JSON preferences. Add ?stream=1 (or
+                        "stream": true) to receive newline-delimited JSON events:
+                        progress updates and the model's text as it is written,
+                        then one event per finished paragraph, then "done".
+        GET  /healthz   Report worker and queue usage.
+
+    Generation runs on a bounded thread pool. At most max_workers stories are
+    generated at once and at most max_queue more wait for a worker; further
+    requests are rejected immediately with 429 and a Retry-After header. A
+    request's slot is held until its generation finishes, even if the client
+    disconnects first, so the pool never has more than capacity stories to write.
+    """
+
+    DEFAULT_MAX_WORKERS = 8
+    DEFAULT_MAX_QUEUE = 32
+    MAX_BODY_BYTES = 64 * 1024
+    READ_TIMEOUT_SECONDS = 10
+
+    STATUS_TEXT = {
+        200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+        408: 'Request Timeout', 413: 'Payload Too Large', 429: 'Too Many Requests',
+        500: 'Internal Server Error'
+    }
+
+    def __init__(self, generator_factory: Callable[[], object], host: str = '127.0.0.1', port: int = 8080,
+                 max_workers: int = DEFAULT_MAX_WORKERS, max_queue: int = DEFAULT_MAX_QUEUE,
+                 scheduler=None, memory_monitor=None):
+        """
+        Args:
+            generator_factory (Callable[[], object]): Creates a StoryGenerator. Each worker thread
+                gets its own generator, so per-generator state (e.g. counters) is never shared.
+            host (str): Interface to listen on.
+            port (int): Port to listen on.
+            max_workers (int): Stories generated concurrently.
+            max_queue (int): Requests allowed to wait for a worker before returning 429.
+            scheduler: Optional MicroBatchScheduler used by the generators; its batch-size and
+                queue-wait histograms are included in /healthz.
+            memory_monitor: Optional MemoryMonitor whose latest report is included in /healthz.
+        """
+        self.generator_factory = generator_factory
+        self.host = host
+        self.port = port
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.scheduler = scheduler
+        self.memory_monitor = memory_monitor
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="story-http")
+        self._local = threading.local()
+        self._admitted = 0
+        self._running = 0
+        self._running_lock = threading.Lock()
+        self._stats = {'completed': 0, 'rejected': 0, 'failed': 0}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def capacity(self) -> int:
+        """Total requests admitted at once (generating plus waiting)."""
+        return self.max_workers + self.max_queue
+
+    def _generator(self):
+        """Get this worker thread's StoryGenerator, creating it on first use."""
+        generator = getattr(self._local, 'generator', None)
+        if generator is None:
+            generator = self.generator_factory()
+            self._local.generator = generator
+        return generator
+
+    async def start(self):
+        """Start listening for connections."""
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        sockets = self._server.sockets or []
+        if sockets:
+            self.port = sockets[0].getsockname()[1]
+        logger.info("Story service listening on http://%s:%d (workers=%d, queue=%d)",
+                    self.host, self.port, self.max_workers, self.max_queue)
+
+    async def serve_forever(self):
+        """Start the server and serve until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting connections and shut down the worker pool."""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._pool.shutdown(wait=False)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve one request per connection."""
+        try:
+            method, target, body = await asyncio.wait_for(self._read_request(reader), self.READ_TIMEOUT_SECONDS)
+            url = urlsplit(target)
+            query = parse_qs(url.query)
+
+            if url.path == '/healthz':
+                if method != 'GET':
+                    raise RequestError(405, "Use GET for /healthz")
+                await self._send_json(writer, 200, self.health())
+            elif url.path == '/stories':
+                if method != 'POST':
+                    raise RequestError(405, "Use POST for /stories")
+                await self._handle_story(writer, body, query)
+            else:
+                raise RequestError(404, f"No route for {url.path}")
+        except RequestError as e:
+            await self._send_json(writer, e.status, {'error': e.message}, self._error_headers(e.status))
+        except asyncio.TimeoutError:
+            await self._send_json(writer, 408, {'error': "Request not received in time"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception:
+            # Details go to the log only; they may include internals the client should not see
+            logger.exception("Unhandled error while serving request")
+            await self._send_json(writer, 500, {'error': "Internal server error"})
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    def _error_headers(self, status: int) -> Dict[str, str]:
+        """Extra headers for error responses."""
+        return {'Retry-After': '1'} if status == 429 else {}
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        """Read the request line, headers and body."""
+        request_line = (await reader.readline()).decode('latin-1').strip()
+        parts = request_line.split()
+        if len(parts) != 3:
+            raise RequestError(400, "Malformed request line")
+        method, target, _ = parts
+
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1')
+            if line in ('\r\n', '\n', ''):
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get('content-length', '0') or 0)
+        except ValueError:
+            raise RequestError(400, "Invalid Content-Length")
+        if length > self.MAX_BODY_BYTES:
+            raise RequestError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b''
+        return method.upper(), target, body
+
+    @staticmethod
+    def parse_preferences(payload: dict) -> ChildPreferences:
+        """
+        Build ChildPreferences from a JSON payload, applying the UI's defaults.
+        Args:
+            payload (dict): Decoded request body.
+        Returns:
+            ChildPreferences: The validated preferences.
+        Raises:
+            RequestError: If required fields are missing or invalid.
+        """
+        try:
+            return ChildPreferences.from_dict(payload)
+        except ValueError as e:
+            raise RequestError(400, str(e))
+
+    async def _handle_story(self, writer: asyncio.StreamWriter, body: bytes, query: Dict[str, list]):
+        """Admit, generate and return a story."""
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            raise RequestError(400, "Body must be valid JSON")
+        preferences = self.parse_preferences(payload)
+
+        output_format = (query.get('format') or [None])[0] or payload.get('format') or 'html'
+        if output_format not in StoryRenderer.FORMATS:
+            raise RequestError(400, f"format must be one of {', '.join(StoryRenderer.FORMATS)}")
+        stream = (query.get('stream') or ['0'])[0] in ('1', 'true') or payload.get('stream') is True
+
+        # Backpressure: reject instead of queueing without bound
+        with self._running_lock:
+            if self._admitted >= self.capacity:
+                self._stats['rejected'] += 1
+                raise RequestError(429, "Story service is busy, please retry shortly")
+            self._admitted += 1
+
+        # The slot now belongs to the generation, which releases it when it finishes (see _generate)
+        if stream:
+            await self._stream_story(writer, preferences)
+        else:
+            started = time.perf_counter()
+            story = await self._generate(preferences)
+            renderer = StoryRenderer.from_html(story, metadata={'title': f"A Bedtime Story for {preferences.name}"})
+            await self._send_json(writer, 200, {
+                'format': output_format,
+                'story': renderer.render(output_format),
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+            })
+
+    def _generate(self, preferences: ChildPreferences,
+                  on_progress: Optional[Callable[..., None]] = None) -> asyncio.Future:
+        """
+        Start generating a story on the worker pool for an admitted request.
+        The request's admission slot is released when generation finishes, not when the
+        response ends, so a client that disconnects does not free a slot still in use.
+        Returns:
+            asyncio.Future: Resolves to the story HTML.
+        """
+        def work():
+            with self._running_lock:
+                self._running += 1
+            try:
+                return self._generator().generate_story(preferences, on_progress=on_progress)
+            finally:
+                with self._running_lock:
+                    self._running -= 1
+
+        def finished(future):
+            with self._running_lock:
+                self._admitted -= 1
+                failed = future.cancelled() or future.exception() is not None
+                self._stats['failed' if failed else 'completed'] += 1
+
+        try:
+            future = self._pool.submit(work)
+        except Exception:
+            with self._running_lock:
+                self._admitted -= 1
+            raise
+        future.add_done_callback(finished)
+        return asyncio.wrap_future(future)
+
+    async def _stream_story(self, writer: asyncio.StreamWriter, preferences: ChildPreferences):
+        """
+        Stream progress, the model's text and the finished paragraphs as newline-delimited
+        JSON over chunked encoding.
+        "text" events carry the text added since the previous one, as the model writes it;
+        one with "reset": true replaces everything sent so far (the model started over).
+        The "paragraph" events that follow are the filtered, illustrated final story.
+        """
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        sent = {'text': ''}
+        sent_lock = threading.Lock()
+
+        def on_progress(stage, partial=None):
+            # Called from worker threads; hand the events to the event loop
+            loop.call_soon_threadsafe(events.put_nowait, {'event': 'progress', 'stage': stage})
+            if not partial:
+                return
+            with sent_lock:
+                previous = sent['text']
+                if partial == previous:
+                    return
+                if partial.startswith(previous):
+                    event = {'event': 'text', 'text': partial[len(previous):]}
+                else:
+                    event = {'event': 'text', 'text': partial, 'reset': True}
+                sent['text'] = partial
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        # Started first, so the admission slot is handed over before anything can fail
+        task = self._generate(preferences, on_progress=on_progress)
+
+        writer.write(self._status_line(200) + self._header_block({
+            'Content-Type': 'application/x-ndjson',
+            'Transfer-Encoding': 'chunked',
+            'Cache-Control': 'no-cache'
+        }))
+
+        # The status line is out: from here on, errors are reported inside the stream
+        try:
+            while not task.done() or not events.empty():
+                getter = asyncio.ensure_future(events.get())
+                done, _ = await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if getter in done:
+                    await self._write_chunk(writer, getter.result())
+                else:
+                    getter.cancel()
+
+            story = task.result()
+            renderer = StoryRenderer.from_html(story)
+            for index, (illustration, paragraph) in enumerate(
+                    zip(renderer.document.illustrations, renderer.document.paragraphs)):
+                await self._write_chunk(writer, {
+                    'event': 'paragraph', 'index': index, 'illustration': illustration, 'text': paragraph
+                })
+            await self._write_chunk(writer, {'event': 'done', 'paragraphs': len(renderer.document.paragraphs)})
+        except ConnectionError:
+            raise
+        except Exception:
+            logger.exception("Error while streaming a story")
+            await self._write_chunk(writer, {'event': 'error', 'error': "Story generation failed"})
+
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+
+    async def _write_chunk(self, writer: asyncio.StreamWriter, event: dict):
+        """Write one NDJSON event as an HTTP chunk."""
+        data = (json.dumps(event) + '\n').encode('utf-8')
+        writer.write(f'{len(data):x}\r\n'.encode('ascii') + data + b'\r\n')
+        await writer.drain()
+
+    def health(self) -> dict:
+        """Current load and counters."""
+        report = {
+            'status': 'ok',
+            'running': self._running,
+            'waiting': max(self._admitted - self._running, 0),
+            'admitted': self._admitted,
+            'capacity': self.capacity,
+            'max_workers': self.max_workers,
+            **self._stats
+        }
+        if self.scheduler is not None:
+            report['batching'] = self.scheduler.metrics()
+        if self.memory_monitor is not None:
+            report['memory'] = self.memory_monitor.report()
+        return report
+
+    def _status_line(self, status: int) -> bytes:
+        return f"HTTP/1.1 {status} {self.STATUS_TEXT.get(status, 'Unknown')}\r\n".encode('ascii')
+
+    @staticmethod
+    def _header_block(headers: Dict[str, str]) -> bytes:
+        lines = ''.join(f"{name}: {value}\r\n" for name, value in {**headers, 'Connection': 'close'}.items())
+        return (lines + '\r\n').encode('latin-1')
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: int, payload: dict,
+                         extra_headers: Optional[Dict[str, str]] = None):
+        """Send a complete JSON response."""
+        data = json.dumps(payload).encode('utf-8')
+        headers = {'Content-Type': 'application/json', 'Content-Length': str(len(data)), **(extra_headers or {})}
+        try:
+            writer.write(self._status_line(status) + self._header_block(headers) + data)
+            await writer.drain()
+        except ConnectionError:
+            pass
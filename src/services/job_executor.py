@@ -0,0 +1,162 @@
+"""
+Background story generation jobs for the Bedtime Story Generator.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from ..utils import JobCancelledError
+
+# This dataclass tracks one background generation job. The UI keeps only the
+# job ID in session state and reads the job's status on each rerun.
+@dataclass
+class GenerationJob:
+    """Data class to store the status of a background generation job."""
+    job_id: str                          # Unique job ID
+    status: str = "queued"               # queued, running, done, failed or cancelled
+    stage: str = "Waiting for a storyteller"  # Human-readable progress message
+    partial: str = ""                    # Output so far, updated as the model streams it
+    result: Optional[str] = None         # Final output once the job is done
+    error: Optional[str] = None          # Error message if the job failed
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    cancel_requested: bool = False       # Set by cancel() once the job is already running
+    future: Optional[Future] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        """Whether the job has stopped (done, failed or cancelled)."""
+        return self.status in ("done", "failed", "cancelled")
+
+    def report_progress(self, stage: str, partial: Optional[str] = None):
+        """
+        Update the job's progress; passed to the job function as on_progress.
+        Args:
+            stage (str): What the job is doing now.
+            partial (Optional[str]): Output produced so far.
+        Raises:
+            JobCancelledError: If the job was cancelled, so the job function stops at this stage.
+        """
+        if self.cancel_requested:
+            raise JobCancelledError(f"Job {self.job_id} was cancelled")
+        self.stage = stage
+        if partial is not None:
+            self.partial = partial
+
+class GenerationJobExecutor:
+    """
+    Run story generation in a bounded pool of background threads.
+    Streamlit reruns the script for every interaction, so the executor is shared
+    by the whole process (see shared()) and jobs are looked up by ID.
+    """
+
+    DEFAULT_MAX_WORKERS = 4
+
+    # Finished jobs that nobody collected are forgotten after this many seconds
+    DEFAULT_RETENTION_SECONDS = 3600
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS,
+                 retention_seconds: float = DEFAULT_RETENTION_SECONDS):
+        """
+        Args:
+            max_workers (int): Maximum number of stories generated at the same time.
+            retention_seconds (float): How long finished jobs are kept for pickup.
+        """
+        self.retention_seconds = retention_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="story-job")
+        self._jobs: Dict[str, GenerationJob] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls) -> 'GenerationJobExecutor':
+        """Get the process-wide executor, creating it on first use."""
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls()
+            return cls._shared_instance
+
+    def submit(self, fn: Callable[..., str], *args, **kwargs) -> str:
+        """
+        Start a job in the background.
+        The function is called as fn(*args, on_progress=job.report_progress, **kwargs).
+        Args:
+            fn (Callable[..., str]): The work to run, e.g. StoryGenerator.generate_story.
+        Returns:
+            str: The job ID to store in session state.
+        """
+        self._forget_expired_jobs()
+
+        job = GenerationJob(job_id=uuid.uuid4().hex)
+        with self._lock:
+            self._jobs[job.job_id] = job
+        job.future = self._pool.submit(self._run, job, fn, args, kwargs)
+        return job.job_id
+
+    def _run(self, job: GenerationJob, fn: Callable[..., str], args: tuple, kwargs: dict):
+        """Run a job function and record its outcome on the job."""
+        job.status = "running"
+        try:
+            job.result = fn(*args, on_progress=job.report_progress, **kwargs)
+            job.status = "done"
+        except JobCancelledError:
+            job.status = "cancelled"
+        except Exception as e:
+            print(f"Generation job {job.job_id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[GenerationJob]:
+        """Look up a job by ID (None if unknown or expired)."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def pop(self, job_id: str) -> Optional[GenerationJob]:
+        """Look up a job and stop tracking it, e.g. once its result has been shown."""
+        with self._lock:
+            return self._jobs.pop(job_id, None)
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a job. A job that has not started is dropped; a running job is asked
+        to stop, which it does at its next progress report.
+        Args:
+            job_id (str): The job to cancel.
+        Returns:
+            bool: True if the job was cancelled before it ran.
+        """
+        job = self.get(job_id)
+        if job is None or job.future is None or job.finished:
+            return False
+        if not job.future.cancel():
+            job.cancel_requested = True
+            return False
+        job.status = "cancelled"
+        job.finished_at = time.time()
+        return True
+
+    def pending_count(self) -> int:
+        """Number of jobs that are queued or running."""
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _forget_expired_jobs(self):
+        """Drop finished jobs that were never collected."""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished and job.finished_at is not None and job.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs and optionally wait for running ones."""
+        self._pool.shutdown(wait=wait)
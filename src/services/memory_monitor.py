@@ -0,0 +1,274 @@
+"""
+Opt-in memory instrumentation for long-running Bedtime Story Generator servers.
+"""
+
+import gc
+import json
+import os
+import sys
+import threading
+import time
+import types
+import weakref
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+# One periodic measurement of the process's memory.
+@dataclass
+class MemorySnapshot:
+    """Data class to store one memory measurement and what changed since the previous one."""
+    taken_at: float                          # When it was taken (epoch seconds)
+    traced_bytes: int                        # Bytes currently allocated by Python (tracemalloc)
+    peak_bytes: int                          # Highest traced_bytes since tracing started
+    rss_bytes: int                           # Resident set size of the process
+    growth_bytes: int                        # traced_bytes minus the previous snapshot's
+    top_sites: List[Dict] = field(default_factory=list)     # Largest allocation sites: site, bytes, count
+    top_growth: List[Dict] = field(default_factory=list)    # Sites that grew most since the previous snapshot
+    session_bytes: Dict[str, int] = field(default_factory=dict)  # Bytes reachable from each session's objects
+    live_objects: Dict[str, int] = field(default_factory=dict)   # Live instances of WATCHED_TYPES
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+class MemoryMonitor:
+    """
+    Periodic tracemalloc snapshots for finding what makes a server grow.
+
+    Each snapshot records the top allocation sites, the sites that grew since the
+    previous snapshot, the bytes reachable from each registered session (e.g. its
+    StoryGenerator, tools and history) and how many instances of WATCHED_TYPES are
+    alive. When traced memory grows by more than alert_growth_bytes between two
+    snapshots, an alert with that detail is appended to alert_path as a JSON line.
+
+    Tracing slows allocation-heavy code noticeably, so the monitor is off unless
+    started explicitly (MEMORY_MONITOR=1 in the app, --memory-monitor for the server).
+    """
+
+    DEFAULT_INTERVAL_SECONDS = 300
+    DEFAULT_TOP_SITES = 10
+    DEFAULT_ALERT_GROWTH_BYTES = 50 * 2 ** 20
+    DEFAULT_ALERT_PATH = "memory_alerts.jsonl"
+    TRACEBACK_FRAMES = 1
+
+    # Classes whose live instance counts are reported (per-session objects that should not pile up)
+    WATCHED_TYPES = ('StoryGenerator', 'WeatherTool', 'TimeTool', 'SearchTool', 'StoryHistory',
+                     'GenerationJob', 'StoryRenderer', 'PromptBuilder')
+
+    # Objects never counted as part of a session (shared by everything in the process)
+    _SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+                     types.MethodType, weakref.ref, type(threading.Lock()), threading.Thread)
+
+    def __init__(self, interval_seconds: float = DEFAULT_INTERVAL_SECONDS, top_sites: int = DEFAULT_TOP_SITES,
+                 alert_growth_bytes: int = DEFAULT_ALERT_GROWTH_BYTES, alert_path: Optional[str] = DEFAULT_ALERT_PATH,
+                 history: int = 12):
+        """
+        Args:
+            interval_seconds (float): Time between automatic snapshots.
+            top_sites (int): Allocation sites listed per snapshot.
+            alert_growth_bytes (int): Growth between two snapshots that triggers an alert.
+            alert_path (Optional[str]): JSON-lines file alerts are appended to (None: print only).
+            history (int): Snapshots kept in memory for report().
+        """
+        self.interval_seconds = interval_seconds
+        self.top_sites = top_sites
+        self.alert_growth_bytes = alert_growth_bytes
+        self.alert_path = alert_path
+        self.history = history
+
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, List[weakref.ref]] = {}
+        self._shared_ids = set()
+        self._previous = None
+        self._snapshots: List[MemorySnapshot] = []
+        self._closed = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.alerts = 0
+
+    def start(self) -> 'MemoryMonitor':
+        """Start tracing allocations and taking snapshots in the background."""
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.TRACEBACK_FRAMES)
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._snapshot_loop, name="memory-monitor", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop taking snapshots and stop tracing."""
+        import tracemalloc
+
+        self._closed.set()
+        tracemalloc.stop()
+
+    def register(self, session_id: str, *objects):
+        """
+        Attribute objects to a session; their reachable memory is reported per session.
+        Objects are held weakly (or skipped if they cannot be), so registering never keeps them alive.
+        Args:
+            session_id (str): The session (e.g. Streamlit's session_id).
+            *objects: Objects the session owns, such as its StoryGenerator and StoryHistory.
+        """
+        refs = []
+        for obj in objects:
+            try:
+                refs.append(weakref.ref(obj))
+            except TypeError:
+                continue
+        with self._lock:
+            self._sessions[session_id] = refs
+
+    def mark_shared(self, *objects):
+        """Exclude process-wide objects (dispatchers, caches, archives) from per-session sizes."""
+        with self._lock:
+            self._shared_ids.update(id(obj) for obj in objects)
+
+    def _snapshot_loop(self):
+        while not self._closed.wait(self.interval_seconds):
+            try:
+                self.take_snapshot()
+            except Exception as e:
+                print(f"Memory monitor error: {e}")
+
+    def take_snapshot(self) -> MemorySnapshot:
+        """
+        Measure memory now, compare with the previous snapshot and alert on large growth.
+        Returns:
+            MemorySnapshot: The new measurement.
+        """
+        import tracemalloc
+
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("Memory monitor is not started")
+        current = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        traced, peak = tracemalloc.get_traced_memory()
+
+        with self._lock:
+            previous = self._previous
+            last = self._snapshots[-1] if self._snapshots else None
+
+        top_sites = [
+            {'site': str(stat.traceback), 'bytes': stat.size, 'count': stat.count}
+            for stat in current.statistics('lineno')[:self.top_sites]
+        ]
+        top_growth = []
+        if previous is not None:
+            top_growth = [
+                {'site': str(stat.traceback), 'bytes': stat.size_diff, 'count': stat.count_diff}
+                for stat in current.compare_to(previous, 'lineno')[:self.top_sites]
+                if stat.size_diff > 0
+            ]
+
+        snapshot = MemorySnapshot(
+            taken_at=time.time(),
+            traced_bytes=traced,
+            peak_bytes=peak,
+            rss_bytes=self.rss_bytes(),
+            growth_bytes=traced - last.traced_bytes if last is not None else 0,
+            top_sites=top_sites,
+            top_growth=top_growth,
+            session_bytes=self.session_bytes(),
+            live_objects=self.live_objects()
+        )
+        with self._lock:
+            self._previous = current
+            self._snapshots.append(snapshot)
+            del self._snapshots[:-self.history]
+
+        if last is not None and snapshot.growth_bytes > self.alert_growth_bytes:
+            self._alert(snapshot)
+        return snapshot
+
+    def _alert(self, snapshot: MemorySnapshot):
+        """Report growth over the threshold."""
+        self.alerts += 1
+        print(f"Memory alert: traced memory grew by {snapshot.growth_bytes / 2 ** 20:.1f} MB "
+              f"to {snapshot.traced_bytes / 2 ** 20:.1f} MB; top growth: "
+              + "; ".join(f"{item['site']} +{item['bytes'] / 1024:.0f} KB" for item in snapshot.top_growth[:3]))
+        if self.alert_path:
+            with open(self.alert_path, 'a', encoding='utf-8') as alerts:
+                alerts.write(json.dumps({'alert': 'memory_growth', **snapshot.to_dict()}) + '\n')
+
+    def session_bytes(self) -> Dict[str, int]:
+        """Approximate bytes reachable from each live session's registered objects."""
+        with self._lock:
+            sessions = {session_id: [ref() for ref in refs] for session_id, refs in self._sessions.items()}
+            shared = set(self._shared_ids)
+
+        report = {}
+        for session_id, objects in sessions.items():
+            objects = [obj for obj in objects if obj is not None]
+            if not objects:
+                # Everything the session registered has been freed
+                with self._lock:
+                    self._sessions.pop(session_id, None)
+                continue
+            report[session_id] = self.reachable_bytes(objects, shared)
+        return report
+
+    @classmethod
+    def reachable_bytes(cls, roots: List, exclude_ids: Optional[set] = None) -> int:
+        """
+        Sum sys.getsizeof over everything reachable from roots, skipping classes,
+        modules, functions, locks, threads and the excluded objects.
+        """
+        seen = set(exclude_ids or ())
+        stack = list(roots)
+        total = 0
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen or isinstance(obj, cls._SHARED_TYPES):
+                continue
+            seen.add(id(obj))
+            total += sys.getsizeof(obj, 0)
+            stack.extend(gc.get_referents(obj))
+        return total
+
+    @classmethod
+    def live_objects(cls) -> Dict[str, int]:
+        """Number of live instances of each WATCHED_TYPES class."""
+        counts = Counter(type(obj).__name__ for obj in gc.get_objects()
+                         if type(obj).__name__ in cls.WATCHED_TYPES)
+        return {name: counts.get(name, 0) for name in cls.WATCHED_TYPES}
+
+    @staticmethod
+    def rss_bytes() -> int:
+        """Resident set size of this process (peak RSS where /proc is unavailable)."""
+        try:
+            with open('/proc/self/statm') as statm:
+                return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, ValueError, IndexError):
+            import resource
+            usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return usage if sys.platform == 'darwin' else usage * 1024
+
+    def report(self) -> Dict:
+        """
+        Summary of the latest snapshot (for /healthz or a debug page).
+        Returns:
+            Dict: Traced, peak and resident MB, growth, per-session bytes, live objects,
+                top allocation sites and alert count.
+        """
+        with self._lock:
+            latest = self._snapshots[-1] if self._snapshots else None
+        if latest is None:
+            return {'snapshots': 0, 'alerts': self.alerts}
+        return {
+            'snapshots': len(self._snapshots),
+            'alerts': self.alerts,
+            'traced_mb': round(latest.traced_bytes / 2 ** 20, 2),
+            'peak_mb': round(latest.peak_bytes / 2 ** 20, 2),
+            'rss_mb': round(latest.rss_bytes / 2 ** 20, 2),
+            'growth_kb': round(latest.growth_bytes / 1024, 1),
+            'sessions': len(latest.session_bytes),
+            'session_kb': {session_id: round(size / 1024, 1) for session_id, size in latest.session_bytes.items()},
+            'live_objects': latest.live_objects,
+            'top_sites': latest.top_sites[:5],
+            'top_growth': latest.top_growth[:5]
+        }
@@ -0,0 +1,208 @@
+"""
+Micro-batching scheduler for LLM inference in the Bedtime Story Generator.
+"""
+
+import bisect
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Sequence, Tuple
+
+class Histogram:
+    """Thread-safe fixed-bucket histogram (Prometheus-style cumulative upper bounds)."""
+
+    def __init__(self, bounds: Sequence[float]):
+        """
+        Args:
+            bounds (Sequence[float]): Ascending bucket upper bounds; an overflow bucket is added.
+        """
+        self.bounds = list(bounds)
+        self._counts = [0] * (len(self.bounds) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Record one observation."""
+        with self._lock:
+            self._counts[bisect.bisect_left(self.bounds, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict:
+        """
+        Get the current distribution.
+        Returns:
+            Dict: Per-bucket counts keyed by upper bound ('+Inf' for overflow), plus count, sum and mean.
+        """
+        with self._lock:
+            buckets = {str(bound): count for bound, count in zip(self.bounds, self._counts)}
+            buckets['+Inf'] = self._counts[-1]
+            return {
+                'buckets': buckets,
+                'count': self._count,
+                'sum': self._sum,
+                'mean': self._sum / self._count if self._count else 0.0
+            }
+
+# One prompt waiting to be batched.
+@dataclass
+class _PendingPrompt:
+    prompt: str
+    options: Tuple[Tuple[str, object], ...]   # Generation options; only equal options share a batch
+    future: Future = field(default_factory=Future)
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+class MicroBatchScheduler:
+    """
+    Collect prompts from concurrent callers and send them to the model in batches.
+
+    The first prompt to arrive opens a collection window of max_wait_ms; the batch
+    is sent when the window closes or max_batch_size prompts are waiting. Prompts
+    with different generation options (e.g. max_new_tokens) go in separate batches.
+    Each caller gets its own result back.
+
+    batch_fn(prompts, **options) must return one completion per prompt, in order.
+    """
+
+    DEFAULT_MAX_BATCH_SIZE = 8
+    DEFAULT_MAX_WAIT_MS = 20.0
+
+    BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+    QUEUE_WAIT_BUCKETS_MS = (1, 5, 10, 20, 50, 100, 250, 500, 1000)
+
+    def __init__(self, batch_fn: Callable[..., List[str]], max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                 max_wait_ms: float = DEFAULT_MAX_WAIT_MS, max_concurrent_batches: int = 1):
+        """
+        Args:
+            batch_fn (Callable[..., List[str]]): Runs one batched generation.
+            max_batch_size (int): Largest batch sent to the model.
+            max_wait_ms (float): How long the first prompt of a batch waits for others.
+            max_concurrent_batches (int): Batches that may run on the backend at once.
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait_ms = max_wait_ms
+        self.batch_size_histogram = Histogram(self.BATCH_SIZE_BUCKETS)
+        self.queue_wait_histogram = Histogram(self.QUEUE_WAIT_BUCKETS_MS)
+
+        self._queue: "queue.Queue[_PendingPrompt]" = queue.Queue()
+        self._runner = ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix="llm-batch")
+        self._closed = threading.Event()
+        self._collector = threading.Thread(target=self._collect_loop, name="llm-batch-collector", daemon=True)
+        self._collector.start()
+
+    @classmethod
+    def for_batch_backend(cls, backend, **kwargs) -> 'MicroBatchScheduler':
+        """
+        Create a scheduler for a backend that really generates several prompts in one call,
+        such as a local model running a padded batch. Hosted APIs that answer one prompt
+        per request (e.g. HuggingFaceHub, whose generate() loops over the prompts) gain
+        nothing from batching and should be called directly.
+        Args:
+            backend: Has generate_batch(prompts, max_new_tokens=None, stop=None) -> List[str].
+            **kwargs: Scheduler settings (max_batch_size, max_wait_ms, ...).
+        """
+        def batch_fn(prompts: List[str], max_new_tokens: int = None, stop: Tuple[str, ...] = None) -> List[str]:
+            return backend.generate_batch(prompts, max_new_tokens=max_new_tokens, stop=list(stop) if stop else None)
+
+        return cls(batch_fn, **kwargs)
+
+    def submit(self, prompt: str, **options) -> Future:
+        """
+        Queue a prompt for the next batch.
+        Args:
+            prompt (str): The prompt text.
+            **options: Generation options passed to batch_fn (must be hashable).
+        Returns:
+            Future: Resolves to the completion for this prompt.
+        """
+        if self._closed.is_set():
+            raise RuntimeError("Scheduler is closed")
+        pending = _PendingPrompt(prompt=prompt, options=tuple(sorted(options.items())))
+        self._queue.put(pending)
+        return pending.future
+
+    def generate(self, prompt: str, timeout: float = None, **options) -> str:
+        """Queue a prompt and wait for its completion (on timeout it is withdrawn if not yet sent)."""
+        future = self.submit(prompt, **options)
+        try:
+            return future.result(timeout=timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def _collect_loop(self):
+        """Form batches from the queue until closed."""
+        while not self._closed.is_set():
+            try:
+                first = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            batch = [first]
+            deadline = first.enqueued_at + self.max_wait_ms / 1000
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Only prompts with identical generation options can share a model call
+            groups: Dict[Tuple, List[_PendingPrompt]] = {}
+            for pending in batch:
+                groups.setdefault(pending.options, []).append(pending)
+            for group in groups.values():
+                self._runner.submit(self._run_batch, group)
+
+    def _run_batch(self, group: List[_PendingPrompt]):
+        """Send one batch to the backend and route results back to the callers."""
+        # Prompts cancelled while waiting are left out; the rest can no longer be cancelled
+        group = [pending for pending in group if pending.future.set_running_or_notify_cancel()]
+        if not group:
+            return
+
+        started = time.perf_counter()
+        for pending in group:
+            self.queue_wait_histogram.observe((started - pending.enqueued_at) * 1000)
+        self.batch_size_histogram.observe(len(group))
+
+        try:
+            results = self.batch_fn([pending.prompt for pending in group], **dict(group[0].options))
+            if len(results) != len(group):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(group)} prompts")
+        except Exception as e:
+            for pending in group:
+                if not pending.future.done():
+                    pending.future.set_exception(e)
+            return
+
+        for pending, result in zip(group, results):
+            if not pending.future.done():
+                pending.future.set_result(result)
+
+    def metrics(self) -> Dict:
+        """Batch-size and queue-wait (ms) histograms plus the current queue depth."""
+        return {
+            'queue_depth': self._queue.qsize(),
+            'batch_size': self.batch_size_histogram.snapshot(),
+            'queue_wait_ms': self.queue_wait_histogram.snapshot()
+        }
+
+    def close(self):
+        """Stop collecting new batches; queued prompts that were not sent fail."""
+        self._closed.set()
+        self._collector.join(timeout=1)
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Scheduler closed"))
+        self._runner.shutdown(wait=True)
@@ -0,0 +1,305 @@
+"""
+Fair, rate-limited dispatch of LLM requests for the Bedtime Story Generator.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+class TokenBucket:
+    """Token bucket allowing `rate` requests per second with bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        """Tokens available right now."""
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self) -> float:
+        """
+        Take one token if available.
+        Returns:
+            float: 0 if a token was taken, otherwise seconds until one is available.
+        """
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+# One queued LLM request (compared by identity).
+@dataclass(eq=False)
+class DispatchTicket:
+    """Data class to track a request waiting in the dispatcher."""
+    ticket_id: int
+    tenant: str                      # Who the request is for (session, API client, batch job)
+    priority: int                    # RequestDispatcher.INTERACTIVE, BATCH or PREGENERATION
+    fn: Callable[[], object] = field(repr=False)
+    future: Future = field(default_factory=Future, repr=False)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+class RequestDispatcher:
+    """
+    Token-bucket rate limiter with priority classes and per-tenant fairness.
+
+    Requests wait in their priority class; a higher class is always served first
+    (interactive before batch before pre-generation). Within a class, tenants are
+    served round-robin, so one tenant with many queued requests cannot starve the
+    others. A request is started only when the token bucket allows it and one
+    of the max_concurrency slots is free, so while the backend is saturated
+    requests stay queued (and keep their priority order) instead of piling up
+    behind the running ones.
+    """
+
+    INTERACTIVE = 0
+    BATCH = 1
+    PREGENERATION = 2
+    PRIORITY_NAMES = {INTERACTIVE: 'interactive', BATCH: 'batch', PREGENERATION: 'pregeneration'}
+
+    DEFAULT_RATE_PER_SECOND = 1.0
+    DEFAULT_BURST = 5
+    DEFAULT_MAX_CONCURRENCY = 8
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, rate_per_second: float = DEFAULT_RATE_PER_SECOND, burst: float = DEFAULT_BURST,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        """
+        Args:
+            rate_per_second (float): Sustained LLM requests per second (the provider's limit).
+            burst (float): Requests that may start back-to-back after an idle period.
+            max_concurrency (int): LLM requests running at the same time.
+        """
+        self.bucket = TokenBucket(rate_per_second, burst)
+        self.max_concurrency = max(max_concurrency, 1)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm-dispatch")
+        # Requests started and not yet finished; a new one starts only below max_concurrency
+        self._running = 0
+        self._ids = itertools.count(1)
+        # priority -> tenant -> queued tickets; tenant order is the round-robin order
+        self._queues: Dict[int, "OrderedDict[str, Deque[DispatchTicket]]"] = {
+            priority: OrderedDict() for priority in self.PRIORITY_NAMES
+        }
+        self._condition = threading.Condition()
+        self._closed = False
+        self.dispatched = {name: 0 for name in self.PRIORITY_NAMES.values()}
+        self._thread = threading.Thread(target=self._dispatch_loop, name="llm-dispatcher", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(cls) -> 'RequestDispatcher':
+        """Get the process-wide dispatcher, creating it on first use."""
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls()
+            return cls._shared_instance
+
+    def submit(self, fn: Callable[[], object], tenant: str = 'default',
+               priority: int = INTERACTIVE) -> DispatchTicket:
+        """
+        Queue a request.
+        Args:
+            fn (Callable[[], object]): The LLM call to run once admitted.
+            tenant (str): Who the request is for; tenants share capacity fairly.
+            priority (int): INTERACTIVE, BATCH or PREGENERATION.
+        Returns:
+            DispatchTicket: Track it with estimate() and wait on ticket.future.
+        """
+        if priority not in self.PRIORITY_NAMES:
+            raise ValueError(f"Unknown priority: {priority}")
+        ticket = DispatchTicket(ticket_id=next(self._ids), tenant=tenant, priority=priority, fn=fn)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Dispatcher is closed")
+            self._queues[priority].setdefault(tenant, deque()).append(ticket)
+            self._condition.notify()
+        return ticket
+
+    def run(self, fn: Callable[[], object], tenant: str = 'default', priority: int = INTERACTIVE,
+            on_wait: Optional[Callable[[int, float], None]] = None, poll_seconds: float = 0.5):
+        """
+        Queue a request and wait for its result.
+        Args:
+            fn (Callable[[], object]): The LLM call.
+            tenant (str): Who the request is for.
+            priority (int): INTERACTIVE, BATCH or PREGENERATION.
+            on_wait (Optional[Callable[[int, float], None]]): Called with (position, estimated seconds)
+                while the request is still queued.
+            poll_seconds (float): How often on_wait is called.
+        Returns:
+            The result of fn.
+        """
+        ticket = self.submit(fn, tenant=tenant, priority=priority)
+        try:
+            while on_wait is not None and not ticket.future.done():
+                estimate = self.estimate(ticket)
+                if estimate is None:
+                    break
+                on_wait(*estimate)
+                try:
+                    return ticket.future.result(timeout=poll_seconds)
+                except FutureTimeoutError:
+                    continue
+        except BaseException:
+            # The caller gave up (e.g. its job was cancelled): do not leave the request queued
+            self.cancel(ticket)
+            raise
+        return ticket.future.result()
+
+    def estimate(self, ticket: DispatchTicket) -> Optional[Tuple[int, float]]:
+        """
+        Estimate a queued request's position and wait.
+        Assumes no further higher-priority requests arrive.
+        Args:
+            ticket (DispatchTicket): A ticket from submit().
+        Returns:
+            Optional[Tuple[int, float]]: (requests ahead, estimated seconds until it starts),
+                or None if the request is no longer queued.
+        """
+        with self._condition:
+            tenants = self._queues[ticket.priority]
+            own_queue = tenants.get(ticket.tenant)
+            if own_queue is None or ticket not in own_queue:
+                return None
+
+            # Everything in higher priority classes goes first
+            ahead = sum(len(q) for priority, queues in self._queues.items()
+                        if priority < ticket.priority for q in queues.values())
+
+            # Round-robin: each other tenant gets one turn per turn of ours
+            index = own_queue.index(ticket)
+            before_us = True
+            for tenant, queue in tenants.items():
+                if tenant == ticket.tenant:
+                    before_us = False
+                    ahead += index
+                    continue
+                ahead += min(len(queue), index + (1 if before_us else 0))
+
+            tokens = self.bucket.available()
+        wait_seconds = max(0.0, (ahead + 1 - tokens) / self.bucket.rate)
+        return ahead, wait_seconds
+
+    def queue_depths(self) -> Dict[str, int]:
+        """Number of queued requests per priority class."""
+        with self._condition:
+            return {self.PRIORITY_NAMES[priority]: sum(len(q) for q in tenants.values())
+                    for priority, tenants in self._queues.items()}
+
+    def _next_ticket(self) -> Optional[DispatchTicket]:
+        """Pop the next ticket by priority, then round-robin over tenants. Caller holds the lock."""
+        for priority in sorted(self._queues):
+            tenants = self._queues[priority]
+            if not tenants:
+                continue
+            tenant, queue = next(iter(tenants.items()))
+            ticket = queue.popleft()
+            # Move the tenant to the back of the rotation, or drop it if it has nothing left
+            del tenants[tenant]
+            if queue:
+                tenants[tenant] = queue
+            return ticket
+        return None
+
+    def _has_pending(self) -> bool:
+        return any(tenants for tenants in self._queues.values())
+
+    def _dispatch_loop(self):
+        """Start queued requests as fast as the token bucket and the free slots allow."""
+        while True:
+            with self._condition:
+                while not self._closed and (not self._has_pending() or self._running >= self.max_concurrency):
+                    self._condition.wait()
+                if self._closed:
+                    return
+
+                # Take a token before choosing, so a request arriving meanwhile can still go first
+                delay = self.bucket.try_acquire()
+                if delay > 0:
+                    self._condition.wait(timeout=delay)
+                    continue
+
+                ticket = self._next_ticket()
+                self.dispatched[self.PRIORITY_NAMES[ticket.priority]] += 1
+                self._running += 1
+
+            self._pool.submit(self._run_ticket, ticket)
+
+    def _run_ticket(self, ticket: DispatchTicket):
+        """Run one admitted request, then free its slot."""
+        try:
+            if not ticket.future.set_running_or_notify_cancel():
+                return
+            try:
+                ticket.future.set_result(ticket.fn())
+            except Exception as e:
+                ticket.future.set_exception(e)
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify()
+
+    def running(self) -> int:
+        """Number of requests currently running."""
+        with self._condition:
+            return self._running
+
+    def cancel(self, ticket: DispatchTicket) -> bool:
+        """Remove a request that has not started yet; returns True if it was removed."""
+        with self._condition:
+            tenants = self._queues[ticket.priority]
+            queue = tenants.get(ticket.tenant)
+            if queue is None or ticket not in queue:
+                return False
+            queue.remove(ticket)
+            if not queue:
+                del tenants[ticket.tenant]
+        ticket.future.cancel()
+        return True
+
+    def promote(self, tenant: str, from_priority: int, to_priority: int) -> int:
+        """
+        Move a tenant's queued requests to another priority class, keeping their order.
+        Args:
+            tenant (str): Whose requests to move.
+            from_priority (int): Their current class (e.g. PREGENERATION).
+            to_priority (int): The new class (e.g. INTERACTIVE once the user asks for the story).
+        Returns:
+            int: Number of requests moved.
+        """
+        with self._condition:
+            queue = self._queues[from_priority].pop(tenant, None)
+            if not queue:
+                return 0
+            for ticket in queue:
+                ticket.priority = to_priority
+            self._queues[to_priority].setdefault(tenant, deque()).extend(queue)
+            self._condition.notify()
+            return len(queue)
+
+    def close(self):
+        """Stop dispatching; queued requests are cancelled."""
+        with self._condition:
+            self._closed = True
+            pending = [ticket for tenants in self._queues.values() for q in tenants.values() for ticket in q]
+            for tenants in self._queues.values():
+                tenants.clear()
+            self._condition.notify_all()
+        for ticket in pending:
+            ticket.future.cancel()
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,141 @@
+"""
+Speculative background story generation for the Bedtime Story Generator.
+"""
+
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from ..models import ChildPreferences, FrozenChildPreferences
+from ..utils import DeferredActions
+from .job_executor import GenerationJobExecutor
+from .request_dispatcher import RequestDispatcher
+
+# A story started before the user asked for it.
+@dataclass
+class SpeculativeJob:
+    """Data class to track a speculative generation job."""
+    job_id: str                      # Job in the GenerationJobExecutor
+    preferences_hash: str            # Stable hash of the (normalized) preferences it was started for
+    generator: object = field(repr=False)  # The StoryGenerator running it
+    # Archiving and template-cache updates, done only once the story is claimed
+    commits: DeferredActions = field(default_factory=DeferredActions, repr=False)
+
+class SpeculativeGeneration:
+    """
+    Start stories as soon as preferences are submitted, before the user presses
+    "Generate".
+
+    The job runs on the shared GenerationJobExecutor at pre-generation priority,
+    so it never delays stories someone is already waiting for. When the user asks
+    for a story with the same preferences, claim() hands over the job (and moves
+    its LLM request up to interactive priority). Otherwise abandon() cancels it:
+    a queued job is dropped, and a running job stops at its next stage. A
+    speculative story has no side effects until it is claimed: it is archived,
+    stored as a template or counted as a template reuse only then. Outcomes are
+    counted for stats().
+    """
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, executor: Optional[GenerationJobExecutor] = None):
+        """
+        Args:
+            executor (Optional[GenerationJobExecutor]): Where jobs run (defaults to the shared executor).
+        """
+        self.executor = executor or GenerationJobExecutor.shared()
+        self._lock = threading.Lock()
+        self._counts = {'started': 0, 'claimed': 0, 'claimed_ready': 0,
+                        'cancelled_queued': 0, 'cancelled_running': 0, 'discarded_finished': 0}
+
+    @classmethod
+    def shared(cls) -> 'SpeculativeGeneration':
+        """Get the process-wide instance, creating it on first use."""
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cls._shared_instance = cls()
+            return cls._shared_instance
+
+    @staticmethod
+    def preferences_hash(preferences: ChildPreferences) -> str:
+        """Hash that is equal for preferences differing only in casing, spacing or interest order."""
+        return FrozenChildPreferences.from_mutable(preferences).stable_hash()
+
+    def _count(self, outcome: str):
+        with self._lock:
+            self._counts[outcome] += 1
+
+    def start(self, generator, preferences: ChildPreferences) -> SpeculativeJob:
+        """
+        Start generating a story in the background.
+        Args:
+            generator: A StoryGenerator; its dispatcher priority is lowered to PREGENERATION for this job.
+            preferences (ChildPreferences): The submitted preferences.
+        Returns:
+            SpeculativeJob: Keep it (e.g. in session state) to claim or abandon later.
+        """
+        generator.priority = RequestDispatcher.PREGENERATION
+        commits = DeferredActions()
+        job_id = self.executor.submit(generator.generate_story, preferences, deferred=commits)
+        self._count('started')
+        return SpeculativeJob(job_id=job_id, preferences_hash=self.preferences_hash(preferences),
+                              generator=generator, commits=commits)
+
+    def claim(self, speculative: Optional[SpeculativeJob], preferences: ChildPreferences) -> Optional[str]:
+        """
+        Take over a speculative job for a story the user has now asked for.
+        Args:
+            speculative (Optional[SpeculativeJob]): The job from start(), if any.
+            preferences (ChildPreferences): The preferences the story is wanted for.
+        Returns:
+            Optional[str]: The job ID to follow, or None if the job does not match or is gone
+                (a mismatching job is abandoned).
+        """
+        if speculative is None:
+            return None
+        job = self.executor.get(speculative.job_id)
+        if (job is None or job.status in ('failed', 'cancelled')
+                or speculative.preferences_hash != self.preferences_hash(preferences)):
+            self.abandon(speculative)
+            return None
+
+        # Someone is waiting now: give the job interactive priority
+        generator = speculative.generator
+        generator.priority = RequestDispatcher.INTERACTIVE
+        if getattr(generator, 'dispatcher', None) is not None:
+            generator.dispatcher.promote(generator.tenant, RequestDispatcher.PREGENERATION,
+                                         RequestDispatcher.INTERACTIVE)
+
+        # The story will be shown: let it be archived and cached
+        speculative.commits.commit()
+
+        self._count('claimed_ready' if job.finished else 'claimed')
+        return speculative.job_id
+
+    def abandon(self, speculative: Optional[SpeculativeJob]):
+        """
+        Cancel a speculative job that will not be used.
+        Args:
+            speculative (Optional[SpeculativeJob]): The job from start(), if any.
+        """
+        if speculative is None:
+            return
+        speculative.commits.discard()
+        job = self.executor.get(speculative.job_id)
+        if job is None:
+            return
+        if job.finished:
+            self.executor.pop(job.job_id)
+            self._count('discarded_finished')
+        elif self.executor.cancel(job.job_id):
+            self.executor.pop(job.job_id)
+            self._count('cancelled_queued')
+        else:
+            # Running: it stops at its next stage and is forgotten after the retention period
+            self._count('cancelled_running')
+
+    def stats(self) -> Dict[str, int]:
+        """Counts of started, claimed (ready or still running) and abandoned speculative jobs."""
+        with self._lock:
+            return dict(self._counts)
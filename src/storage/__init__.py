@@ -0,0 +1,13 @@
+"""
+Storage package for the Bedtime Story Generator.
+"""
+
+from .story_history import HistoryEntry, StoryHistory
+from .story_archive import ArchivedStory, ArchiveBatchWriter, StoryArchive
+from .template_cache import StoryTemplate, StoryTemplateCache
+from .cache_backend import CacheBackend, InProcessCache, SQLiteCache
+from .story_codec import CodecReport, StoryCodec
+
+__all__ = ['HistoryEntry', 'StoryHistory', 'ArchivedStory', 'ArchiveBatchWriter', 'StoryArchive',
+           'StoryTemplate', 'StoryTemplateCache', 'CacheBackend', 'InProcessCache', 'SQLiteCache',
+           'CodecReport', 'StoryCodec']
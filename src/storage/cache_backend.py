@@ -0,0 +1,321 @@
+"""
+Cache backends shared by the Bedtime Story Generator's tools and generators.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+class CacheBackend(ABC):
+    """
+    Key/value cache for bytes with per-entry expiry.
+
+    Subclasses must implement get, set, delete and clear (a backend missing one
+    cannot be instantiated). The JSON helpers and
+    get_or_compute_json build on those; get_or_compute_json lets one caller
+    compute a missing value while others wanting the same key wait for it
+    (within one process for InProcessCache, across processes for SQLiteCache).
+    """
+
+    # Backends selectable by name (see create())
+    KINDS = ('memory', 'sqlite')
+
+    # How long a caller may hold the right to compute a missing value
+    LEASE_SECONDS = 10.0
+    LEASE_POLL_SECONDS = 0.05
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'computed': 0, 'waited': 0}
+
+    @classmethod
+    def create(cls, kind: str = 'sqlite', path: Optional[str] = None) -> 'CacheBackend':
+        """
+        Create a backend by name.
+        Args:
+            kind (str): 'memory' (this process only) or 'sqlite' (shared by processes on this host).
+            path (Optional[str]): Database file for the SQLite backend.
+        Returns:
+            CacheBackend: The new backend.
+        """
+        if kind == 'memory':
+            return InProcessCache()
+        if kind == 'sqlite':
+            return SQLiteCache(path or SQLiteCache.DEFAULT_PATH)
+        raise ValueError(f"Unknown cache backend {kind!r} (expected one of {', '.join(cls.KINDS)})")
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Get a value, or None if it is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        """Store a value, expiring after ttl seconds (never, if None)."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove a value if present."""
+
+    @abstractmethod
+    def clear(self):
+        """Remove every value."""
+
+    def _acquire_lease(self, key: str) -> Optional[Any]:
+        """Try to become the one caller computing key; returns a token, or None if someone else is."""
+        return True
+
+    def _release_lease(self, key: str, token: Any):
+        """Give up the right to compute key."""
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get_counted(self, key: str) -> Optional[bytes]:
+        """Like get(), but counted as a hit or miss in stats()."""
+        data = self.get(key)
+        self._count('hits' if data is not None else 'misses')
+        return data
+
+    def set_counted(self, key: str, value: bytes, ttl: Optional[float] = None):
+        """Like set(), but counted as a store in stats()."""
+        self.set(key, value, ttl)
+        self._count('sets')
+
+    def get_json(self, key: str) -> Any:
+        """Get a JSON value, or None if it is missing or expired."""
+        data = self.get_counted(key)
+        return json.loads(data.decode('utf-8')) if data is not None else None
+
+    def set_json(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a JSON-serializable value."""
+        self.set_counted(key, json.dumps(value, separators=(',', ':')).encode('utf-8'), ttl)
+
+    def get_or_compute_json(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """
+        Get a JSON value, computing and storing it if missing.
+        While one caller computes a value, others asking for the same key wait for
+        its result (up to LEASE_SECONDS) instead of computing it again.
+        Args:
+            key (str): Cache key.
+            compute (Callable[[], Any]): Produces the value; exceptions propagate and nothing is stored.
+            ttl (Optional[float]): Seconds until the stored value expires.
+        Returns:
+            Any: The cached or newly computed value.
+        """
+        value = self.get_json(key)
+        if value is not None:
+            return value
+
+        deadline = time.monotonic() + self.LEASE_SECONDS
+        token = self._acquire_lease(key)
+        while token is None and time.monotonic() < deadline:
+            # Someone else is computing it: wait for their result
+            time.sleep(self.LEASE_POLL_SECONDS)
+            data = self.get(key)
+            if data is not None:
+                self._count('waited')
+                return json.loads(data.decode('utf-8'))
+            token = self._acquire_lease(key)
+
+        try:
+            # The previous lease holder may have stored it just before we took over
+            data = self.get(key) if token is not None else None
+            if data is not None:
+                return json.loads(data.decode('utf-8'))
+            value = compute()
+            self.set_json(key, value, ttl)
+            self._count('computed')
+            return value
+        finally:
+            if token is not None:
+                self._release_lease(key, token)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss, store and compute counts of the counted and JSON helpers in this process."""
+        with self._stats_lock:
+            return dict(self._stats)
+
+class InProcessCache(CacheBackend):
+    """Thread-safe in-memory cache with least-recently-used eviction, private to this process."""
+
+    DEFAULT_MAX_ENTRIES = 1024
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Args:
+            max_entries (int): Number of values to keep (least recently used are evicted).
+        """
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        # key -> token of the caller computing it; taken and given back under _lock
+        self._leases: Dict[str, object] = {}
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._entries[key] = (bytes(value), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _acquire_lease(self, key: str) -> Optional[Any]:
+        with self._lock:
+            if key in self._leases:
+                return None
+            token = self._leases[key] = object()
+            return token
+
+    def _release_lease(self, key: str, token: Any):
+        with self._lock:
+            # Only the holder gives the lease back
+            if self._leases.get(key) is token:
+                del self._leases[key]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+class SQLiteCache(CacheBackend):
+    """
+    Cache stored in a SQLite database in WAL mode, shared by every process on the
+    host that opens the same file (e.g. several Streamlit or server workers).
+
+    Readers never wait for writers, and each write is a single short statement.
+    Expired rows are removed every PURGE_EVERY writes. Each thread gets its own
+    connection. Leases (a row per key being computed) keep processes from
+    computing the same missing value at the same time.
+    """
+
+    DEFAULT_PATH = "cache.db"
+    BUSY_TIMEOUT_MS = 5000
+    PURGE_EVERY = 500
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY,
+            value BLOB NOT NULL,
+            expires_at REAL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS cache_leases (
+            key TEXT PRIMARY KEY,
+            owner TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        """
+        Args:
+            path (str): SQLite database file; created if it does not exist.
+        """
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._connection().executescript(self._SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Autocommit mode: every statement is its own short transaction
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=self.BUSY_TIMEOUT_MS / 1000)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        connection = self._connection()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, sqlite3.Binary(value), expires_at)
+        )
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge_expired()
+
+    def delete(self, key: str):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        connection = self._connection()
+        connection.execute("DELETE FROM cache")
+        connection.execute("DELETE FROM cache_leases")
+
+    def purge_expired(self) -> int:
+        """
+        Remove expired values and abandoned leases.
+        Returns:
+            int: Number of values removed.
+        """
+        now = time.time()
+        connection = self._connection()
+        connection.execute("DELETE FROM cache_leases WHERE expires_at <= ?", (now,))
+        return connection.execute("DELETE FROM cache WHERE expires_at <= ?", (now,)).rowcount
+
+    def _acquire_lease(self, key: str) -> Optional[Any]:
+        owner = f"{self._owner}-{threading.get_ident()}"
+        now = time.time()
+        connection = self._connection()
+        # A lease left behind by a crashed process expires and can be taken over
+        connection.execute("DELETE FROM cache_leases WHERE key = ? AND expires_at <= ?", (key, now))
+        inserted = connection.execute(
+            "INSERT OR IGNORE INTO cache_leases (key, owner, expires_at) VALUES (?, ?, ?)",
+            (key, owner, now + self.LEASE_SECONDS)
+        ).rowcount
+        return owner if inserted else None
+
+    def _release_lease(self, key: str, token: Any):
+        self._connection().execute("DELETE FROM cache_leases WHERE key = ? AND owner = ?", (key, token))
+
+    def __len__(self) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM cache WHERE expires_at IS NULL OR expires_at > ?", (time.time(),)
+        ).fetchone()[0]
+
+    def close(self):
+        """Close this thread's connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
@@ -0,0 +1,458 @@
+"""
+Persistent SQLite story archive with full-text search for the Bedtime Story Generator.
+"""
+
+import datetime
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models import FrozenStoryContext, StoryContext
+from ..utils import StoryRenderer
+from .story_codec import StoryCodec
+
+# One archived story, as returned by lookups and searches.
+@dataclass
+class ArchivedStory:
+    """Data class to store a story read back from the archive."""
+    story_id: int                    # Row ID in the archive
+    child_name: str                  # Child the story was written for
+    title: str                       # Title shown in lists
+    story: str                       # Story HTML as generated
+    created_at: float                # When the story was archived (epoch seconds)
+    snippet: str = ""                # Matching excerpt (search results only)
+    context: Optional[StoryContext] = None  # Full context (get() only)
+
+class StoryArchive:
+    """
+    SQLite-backed store of every generated story.
+
+    Stories are recorded with their StoryContext and the owner they were written
+    for (a session or API client), indexed with FTS5 for word and prefix search,
+    and de-duplicated per owner by a hash of their normalized text. Lookups that
+    list stories take an owner, so one family never sees another's stories.
+    The database runs in WAL mode, so searches never wait for writers; bulk
+    inserts commit in small chunks so interactive writes can interleave.
+    Each thread gets its own connection.
+
+    The story HTML is stored compressed with StoryCodec.default(); every
+    dictionary used is kept in the archive, so stories stay readable when the
+    default dictionary changes. The plain-text body stays uncompressed because
+    the full-text index reads it.
+    """
+
+    DEFAULT_PATH = "stories.db"
+    BULK_CHUNK_SIZE = 200
+    BUSY_TIMEOUT_MS = 5000
+
+    # Words that carry no meaning in queries like "the dragon one from last week"
+    STOPWORDS = frozenset({
+        'a', 'an', 'the', 'one', 'ones', 'story', 'stories', 'about', 'from', 'with', 'and',
+        'of', 'that', 'this', 'was', 'which', 'for', 'in', 'on', 'to', 'where', 'had'
+    })
+
+    # Relative dates understood in queries, with how many days back they reach
+    TIME_PHRASES = (
+        ('last month', 60), ('this month', 31), ('last week', 14), ('this week', 7),
+        ('yesterday', 2), ('today', 1)
+    )
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS stories (
+            id INTEGER PRIMARY KEY,
+            content_hash TEXT NOT NULL UNIQUE,
+            owner TEXT NOT NULL DEFAULT '',
+            child_name TEXT NOT NULL,
+            title TEXT NOT NULL,
+            story TEXT NOT NULL,
+            body TEXT NOT NULL,
+            interests TEXT NOT NULL,
+            context BLOB,
+            created_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_stories_child_created ON stories (child_name, created_at);
+        CREATE INDEX IF NOT EXISTS idx_stories_created ON stories (created_at);
+        CREATE TABLE IF NOT EXISTS story_dictionaries (
+            dictionary_id INTEGER PRIMARY KEY,
+            backend TEXT NOT NULL,
+            dictionary BLOB NOT NULL
+        );
+    """
+
+    # Created after older archives have gained the owner column
+    _OWNER_INDEX = "CREATE INDEX IF NOT EXISTS idx_stories_owner_created ON stories (owner, created_at)"
+
+    _FTS_SCHEMA = """
+        CREATE VIRTUAL TABLE IF NOT EXISTS stories_fts USING fts5(
+            title, body, interests, content='stories', content_rowid='id',
+            tokenize='porter unicode61'
+        );
+        CREATE TRIGGER IF NOT EXISTS stories_fts_insert AFTER INSERT ON stories BEGIN
+            INSERT INTO stories_fts (rowid, title, body, interests)
+            VALUES (new.id, new.title, new.body, new.interests);
+        END;
+        CREATE TRIGGER IF NOT EXISTS stories_fts_delete AFTER DELETE ON stories BEGIN
+            INSERT INTO stories_fts (stories_fts, rowid, title, body, interests)
+            VALUES ('delete', old.id, old.title, old.body, old.interests);
+        END;
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH):
+        """
+        Args:
+            path (str): SQLite database file; created if it does not exist.
+        """
+        self.path = path
+        self._local = threading.local()
+        self.full_text = True
+        # dictionary_id -> codec, for reading stories back
+        self._codecs: Dict[int, StoryCodec] = {}
+        self._codecs_lock = threading.Lock()
+
+        connection = self._connection()
+        connection.executescript(self._SCHEMA)
+        columns = {row[1] for row in connection.execute("PRAGMA table_info(stories)")}
+        if 'owner' not in columns:
+            # Archives written before stories had owners: their stories belong to no one
+            connection.execute("ALTER TABLE stories ADD COLUMN owner TEXT NOT NULL DEFAULT ''")
+        connection.execute(self._OWNER_INDEX)
+        try:
+            connection.executescript(self._FTS_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: fall back to substring search
+            self.full_text = False
+
+    def _connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it on first use."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Autocommit mode; writes open their own transactions
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=self.BUSY_TIMEOUT_MS / 1000)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(f"PRAGMA busy_timeout={self.BUSY_TIMEOUT_MS}")
+            self._local.connection = connection
+        return connection
+
+    @staticmethod
+    def owner_for_token(token: str) -> str:
+        """
+        Durable archive owner for the holder of an API token, without storing the token.
+        Args:
+            token (str): The user's Hugging Face API token.
+        Returns:
+            str: An owner ID that stays the same across sessions and processes using the token.
+        """
+        digest = hashlib.blake2b(token.strip().encode('utf-8'), digest_size=16, person=b'story-owner').hexdigest()
+        return f"token:{digest}"
+
+    @staticmethod
+    def content_hash(text: str, owner: str = '') -> str:
+        """Hash of a story's text for one owner, ignoring case and whitespace differences."""
+        normalized = ' '.join(text.lower().split())
+        if owner:
+            # The same story written for two owners is stored for each of them
+            normalized = owner + '\0' + normalized
+        return hashlib.blake2b(normalized.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _writing_codec(self) -> StoryCodec:
+        """The codec new stories are stored with, after recording its dictionary in the archive."""
+        codec = StoryCodec.default()
+        with self._codecs_lock:
+            if codec.dictionary_id in self._codecs:
+                return codec
+        self._connection().execute(
+            "INSERT OR IGNORE INTO story_dictionaries (dictionary_id, backend, dictionary) VALUES (?, ?, ?)",
+            (codec.dictionary_id, codec.backend, sqlite3.Binary(codec.dictionary))
+        )
+        with self._codecs_lock:
+            self._codecs[codec.dictionary_id] = codec
+        return codec
+
+    def _reading_codec(self, dictionary_id: int) -> StoryCodec:
+        """The codec for a dictionary recorded in the archive."""
+        with self._codecs_lock:
+            codec = self._codecs.get(dictionary_id)
+        if codec is None:
+            row = self._connection().execute(
+                "SELECT backend, dictionary FROM story_dictionaries WHERE dictionary_id = ?", (dictionary_id,)
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Story dictionary {dictionary_id} is missing from the archive")
+            codec = StoryCodec(row[1], backend=row[0])
+            with self._codecs_lock:
+                self._codecs[dictionary_id] = codec
+        return codec
+
+    def _decode_story(self, stored) -> str:
+        """Story HTML from the story column (compressed, or text in archives written before compression)."""
+        if isinstance(stored, str):
+            return stored
+        _, dictionary_id = StoryCodec.read_header(stored)
+        return self._reading_codec(dictionary_id).decompress(stored)
+
+    def _archived(self, row: Tuple) -> ArchivedStory:
+        """ArchivedStory from an (id, child_name, title, story, created_at[, snippet]) row."""
+        return ArchivedStory(row[0], row[1], row[2], self._decode_story(row[3]), *row[4:])
+
+    def _row_for(self, story: str, context: StoryContext, title: Optional[str],
+                 created_at: Optional[float], owner: str) -> Tuple:
+        """Build the stories-table row for one story."""
+        body = StoryRenderer.from_html(story).render('text')
+        preferences = context.preferences
+        return (
+            self.content_hash(body, owner),
+            owner,
+            preferences.name,
+            title or f"A Bedtime Story for {preferences.name}",
+            sqlite3.Binary(self._writing_codec().compress(story)),
+            body,
+            ' '.join(preferences.interests),
+            FrozenStoryContext.from_mutable(context).to_bytes(),
+            created_at if created_at is not None else time.time()
+        )
+
+    _INSERT = """
+        INSERT OR IGNORE INTO stories
+            (content_hash, owner, child_name, title, story, body, interests, context, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+
+    def add(self, story: str, context: StoryContext, title: Optional[str] = None,
+            created_at: Optional[float] = None, owner: str = '') -> int:
+        """
+        Archive one story; a story whose text is already archived for the owner is not stored again.
+        Args:
+            story (str): The story HTML.
+            context (StoryContext): The context the story was generated with.
+            title (Optional[str]): Title shown in lists (defaults to "A Bedtime Story for <name>").
+            created_at (Optional[float]): Epoch seconds (defaults to now).
+            owner (str): Who the story was written for (e.g. a session ID); searches are limited to it.
+        Returns:
+            int: ID of the archived story (the existing one for duplicates).
+        """
+        row = self._row_for(story, context, title, created_at, owner)
+        connection = self._connection()
+        with self._transaction(connection):
+            connection.execute(self._INSERT, row)
+            (story_id,) = connection.execute(
+                "SELECT id FROM stories WHERE content_hash = ?", (row[0],)
+            ).fetchone()
+        return story_id
+
+    def add_many(self, records: Iterable[Tuple[str, StoryContext, str]],
+                 chunk_size: int = BULK_CHUNK_SIZE) -> int:
+        """
+        Archive many stories, committing every chunk_size rows.
+        Args:
+            records (Iterable[Tuple[str, StoryContext, str]]): (story HTML, context, owner) tuples;
+                the owner may be left out.
+            chunk_size (int): Rows per transaction; smaller chunks hold the write lock for less time.
+        Returns:
+            int: Number of new (non-duplicate) stories stored.
+        """
+        connection = self._connection()
+        inserted = 0
+        chunk: List[Tuple] = []
+
+        def flush():
+            nonlocal inserted
+            with self._transaction(connection):
+                inserted += connection.executemany(self._INSERT, chunk).rowcount
+            chunk.clear()
+
+        for story, context, *owner in records:
+            chunk.append(self._row_for(story, context, None, None, owner[0] if owner else ''))
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+        return inserted
+
+    @staticmethod
+    @contextmanager
+    def _transaction(connection: sqlite3.Connection):
+        """Write transaction that takes the write lock up front, so it never fails halfway on SQLITE_BUSY."""
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def get(self, story_id: int) -> Optional[ArchivedStory]:
+        """Read one story, including its decoded StoryContext."""
+        row = self._connection().execute(
+            "SELECT id, child_name, title, story, created_at, context FROM stories WHERE id = ?",
+            (story_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        context = FrozenStoryContext.from_bytes(row[5]).to_mutable() if row[5] else None
+        return ArchivedStory(story_id=row[0], child_name=row[1], title=row[2], story=self._decode_story(row[3]),
+                             created_at=row[4], context=context)
+
+    def recent(self, limit: int = 20, child_name: Optional[str] = None,
+               owner: Optional[str] = None) -> List[ArchivedStory]:
+        """Most recently archived stories, optionally for one owner and child (owner None: everyone's)."""
+        sql = "SELECT id, child_name, title, story, created_at FROM stories"
+        filters, params = [], []
+        if owner is not None:
+            filters.append("owner = ?")
+            params.append(owner)
+        if child_name:
+            filters.append("child_name = ?")
+            params.append(child_name)
+        if filters:
+            sql += " WHERE " + " AND ".join(filters)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        return [self._archived(row) for row in self._connection().execute(sql, params)]
+
+    @classmethod
+    def parse_query(cls, query: str, now: Optional[float] = None) -> Tuple[List[str], Optional[float]]:
+        """
+        Split a free-text query into search terms and an optional start time.
+        Args:
+            query (str): e.g. "the dragon one from last week".
+            now (Optional[float]): Reference time in epoch seconds (defaults to now).
+        Returns:
+            Tuple[List[str], Optional[float]]: (search terms, earliest created_at or None).
+        """
+        text = query.lower()
+        since = None
+        for phrase, days in cls.TIME_PHRASES:
+            if phrase in text:
+                text = text.replace(phrase, ' ')
+                reference = datetime.datetime.fromtimestamp(now if now is not None else time.time())
+                start_of_day = reference.replace(hour=0, minute=0, second=0, microsecond=0)
+                since = (start_of_day - datetime.timedelta(days=days - 1)).timestamp()
+                break
+        terms = [word for word in re.findall(r'\w+', text) if word not in cls.STOPWORDS]
+        return terms, since
+
+    def search(self, query: str, owner: Optional[str], child_name: Optional[str] = None,
+               limit: int = 20) -> List[ArchivedStory]:
+        """
+        Find an owner's archived stories matching a free-text query, best matches first.
+        Each word matches as a prefix ("drag" finds "dragons"); relative dates such
+        as "yesterday" or "last week" restrict when the story was archived.
+        Args:
+            query (str): Search text.
+            owner (Optional[str]): Only search stories written for this owner. None searches
+                everyone's stories and is meant for administrative tools only.
+            child_name (Optional[str]): Only search this child's stories.
+            limit (int): Maximum number of results.
+        Returns:
+            List[ArchivedStory]: Matching stories with a highlighted snippet.
+        """
+        terms, since = self.parse_query(query)
+        filters, params = [], []
+        if owner is not None:
+            filters.append("s.owner = ?")
+            params.append(owner)
+        if child_name:
+            filters.append("s.child_name = ?")
+            params.append(child_name)
+        if since is not None:
+            filters.append("s.created_at >= ?")
+            params.append(since)
+
+        if not terms:
+            sql = "SELECT s.id, s.child_name, s.title, s.story, s.created_at, '' FROM stories s"
+            if filters:
+                sql += " WHERE " + " AND ".join(filters)
+            sql += " ORDER BY s.created_at DESC LIMIT ?"
+        elif self.full_text:
+            match = ' '.join('"' + term.replace('"', '') + '"*' for term in terms)
+            sql = ("SELECT s.id, s.child_name, s.title, s.story, s.created_at, "
+                   "snippet(stories_fts, 1, '[', ']', '…', 12) "
+                   "FROM stories_fts JOIN stories s ON s.id = stories_fts.rowid "
+                   "WHERE stories_fts MATCH ?")
+            params.insert(0, match)
+            for condition in filters:
+                sql += " AND " + condition
+            sql += " ORDER BY bm25(stories_fts) LIMIT ?"
+        else:
+            sql = "SELECT s.id, s.child_name, s.title, s.story, s.created_at, '' FROM stories s WHERE "
+            conditions = ["(s.body LIKE ? OR s.interests LIKE ?)" for _ in terms] + filters
+            params = [value for term in terms for value in (f"%{term}%", f"%{term}%")] + params
+            sql += " AND ".join(conditions) + " ORDER BY s.created_at DESC LIMIT ?"
+
+        params.append(limit)
+        return [self._archived(row) for row in self._connection().execute(sql, params)]
+
+    def delete(self, story_id: int) -> bool:
+        """Remove a story; returns True if it existed."""
+        connection = self._connection()
+        with self._transaction(connection):
+            cursor = connection.execute("DELETE FROM stories WHERE id = ?", (story_id,))
+        return cursor.rowcount > 0
+
+    def count(self) -> int:
+        """Number of archived stories."""
+        return self._connection().execute("SELECT COUNT(*) FROM stories").fetchone()[0]
+
+    def batch_writer(self, batch_size: int = BULK_CHUNK_SIZE) -> 'ArchiveBatchWriter':
+        """Buffered writer for batch jobs; see ArchiveBatchWriter."""
+        return ArchiveBatchWriter(self, batch_size)
+
+    def close(self):
+        """Close this thread's connection."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+class ArchiveBatchWriter:
+    """
+    Thread-safe buffer that archives stories in bulk.
+    Has the same add(story, context, owner) method as StoryArchive, so it can be given to
+    StoryGenerator in batch jobs; rows are written with add_many() once batch_size
+    stories are buffered, and on flush() or close().
+    """
+
+    def __init__(self, archive: StoryArchive, batch_size: int = StoryArchive.BULK_CHUNK_SIZE):
+        self.archive = archive
+        self.batch_size = max(batch_size, 1)
+        self.inserted = 0
+        self._buffer: List[Tuple[str, StoryContext, str]] = []
+        self._lock = threading.Lock()
+
+    def add(self, story: str, context: StoryContext, owner: str = ''):
+        """Buffer a story for archiving."""
+        with self._lock:
+            self._buffer.append((story, context, owner))
+            if len(self._buffer) < self.batch_size:
+                return
+            pending, self._buffer = self._buffer, []
+        self._write(pending)
+
+    def flush(self):
+        """Write all buffered stories."""
+        with self._lock:
+            pending, self._buffer = self._buffer, []
+        if pending:
+            self._write(pending)
+
+    def _write(self, pending: List[Tuple[str, StoryContext, str]]):
+        inserted = self.archive.add_many(pending, chunk_size=self.batch_size)
+        with self._lock:
+            self.inserted += inserted
+
+    def close(self):
+        """Write any remaining stories."""
+        self.flush()
+
+    def __enter__(self) -> 'ArchiveBatchWriter':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,395 @@
+"""
+Dictionary-based story compression for the Bedtime Story Generator.
+"""
+
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from ..utils import StoryFormatter
+
+# Compression measurements for one codec over a set of stories.
+@dataclass
+class CodecReport:
+    """Data class to store compression ratio and decode speed of a StoryCodec."""
+    backend: str                     # 'zstd' or 'zlib'
+    dictionary_bytes: int            # Size of the trained dictionary
+    stories: int                     # Stories measured
+    raw_bytes: int                   # Their size as UTF-8 text
+    compressed_bytes: int            # Their size compressed with the dictionary
+    baseline_bytes: int              # Their size compressed one by one with plain zlib
+    decode_mb_per_second: float      # Decompression throughput (uncompressed MB per second)
+
+    @property
+    def ratio(self) -> float:
+        """Raw size divided by compressed size."""
+        return self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0.0
+
+    @property
+    def baseline_ratio(self) -> float:
+        """Raw size divided by the plain zlib size."""
+        return self.raw_bytes / self.baseline_bytes if self.baseline_bytes else 0.0
+
+class StoryCodec:
+    """
+    Compress stories with a dictionary trained on stories like them.
+
+    Each story on its own is too short for a general-purpose compressor to learn
+    its repetition; a shared dictionary of the phrases stories have in common
+    (the <p style=...> wrappers, fallback template sentences, emoji illustrations)
+    lets even a single story compress well. Uses zstandard dictionaries when the
+    package is installed and a zlib preset dictionary otherwise.
+
+    Compressed stories start with a backend byte and the dictionary's checksum,
+    so decompress() refuses data written with a different dictionary.
+    """
+
+    DEFAULT_DICTIONARY_SIZE = 16 * 1024
+    ZLIB_MAX_DICTIONARY_SIZE = 32 * 1024     # zlib only looks back 32 KB
+    COMPRESSION_LEVEL = 6
+    ZSTD_LEVEL = 9
+
+    _ZLIB = 1
+    _ZSTD = 2
+    _BACKENDS = {_ZLIB: 'zlib', _ZSTD: 'zstd'}
+
+    # The process-wide codec (see default()): its dictionary file, and the archive that trains it
+    DEFAULT_DICTIONARY_PATH = "story.dict"
+    MIN_ARCHIVE_STORIES = 100
+    ARCHIVE_TRAINING_STORIES = 2000
+    _dictionary_path: Optional[str] = DEFAULT_DICTIONARY_PATH
+    _archive_path: Optional[str] = None
+
+    # Pieces of text considered when building a zlib dictionary: tags, and runs of text between them
+    _SEGMENT_PATTERN = re.compile(r"<[^>]*>|[^<.!?]+[.!?]*")
+    MIN_SEGMENT_LENGTH = 8
+
+    _default_instance = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, dictionary: bytes, backend: Optional[str] = None):
+        """
+        Args:
+            dictionary (bytes): Trained dictionary (see train()).
+            backend (Optional[str]): 'zstd' or 'zlib'; defaults to zstd when installed.
+        """
+        zstandard = self._import_zstandard()
+        if backend is None:
+            backend = 'zstd' if zstandard is not None else 'zlib'
+        if backend == 'zstd' and zstandard is None:
+            raise ValueError("The zstd backend needs the zstandard package")
+        if backend not in ('zstd', 'zlib'):
+            raise ValueError(f"Unknown codec backend {backend!r}")
+
+        self.backend = backend
+        self.dictionary = bytes(dictionary)
+        self.dictionary_id = zlib.crc32(self.dictionary)
+        self._header = bytes([self._ZSTD if backend == 'zstd' else self._ZLIB]) + self.dictionary_id.to_bytes(4, 'big')
+        self._local = threading.local()
+        if backend == 'zstd':
+            self._zstd_dictionary = zstandard.ZstdCompressionDict(self.dictionary)
+        else:
+            self._zlib_dictionary = self.dictionary[-self.ZLIB_MAX_DICTIONARY_SIZE:]
+
+    @staticmethod
+    def _import_zstandard():
+        """The zstandard module, or None if it is not installed."""
+        try:
+            import zstandard
+            return zstandard
+        except ImportError:
+            return None
+
+    @classmethod
+    def train(cls, stories: Iterable[str], dictionary_size: int = DEFAULT_DICTIONARY_SIZE,
+              backend: Optional[str] = None) -> 'StoryCodec':
+        """
+        Train a codec on sample stories.
+        Args:
+            stories (Iterable[str]): Representative stories (a few hundred is plenty).
+            dictionary_size (int): Dictionary size in bytes.
+            backend (Optional[str]): 'zstd' or 'zlib'; defaults to zstd when installed.
+        Returns:
+            StoryCodec: A codec using the trained dictionary.
+        """
+        samples = [story.encode('utf-8') for story in stories if story]
+        zstandard = cls._import_zstandard()
+        if backend == 'zstd' and zstandard is None:
+            raise ValueError("The zstd backend needs the zstandard package")
+        if backend != 'zlib' and zstandard is not None:
+            try:
+                dictionary = zstandard.train_dictionary(dictionary_size, samples)
+                return cls(dictionary.as_bytes(), backend='zstd')
+            except zstandard.ZstdError:
+                # Too few samples for zstd's trainer: use the zlib dictionary builder instead
+                pass
+        dictionary = cls._build_zlib_dictionary(samples, min(dictionary_size, cls.ZLIB_MAX_DICTIONARY_SIZE))
+        return cls(dictionary, backend='zlib')
+
+    @classmethod
+    def _build_zlib_dictionary(cls, samples: List[bytes], dictionary_size: int) -> bytes:
+        """
+        Build a preset dictionary from the segments most stories share.
+        Segments are ranked by the bytes they would save (stories containing them
+        times their length); the most valuable go last, where zlib reaches them
+        with the shortest distances.
+        """
+        document_counts = Counter()
+        for sample in samples:
+            segments = cls._SEGMENT_PATTERN.findall(sample.decode('utf-8'))
+            document_counts.update({segment for segment in segments if len(segment) >= cls.MIN_SEGMENT_LENGTH})
+
+        ranked = sorted(
+            (segment for segment, count in document_counts.items() if count > 1),
+            key=lambda segment: (document_counts[segment] - 1) * len(segment),
+            reverse=True
+        )
+        chosen = []
+        size = 0
+        for segment in ranked:
+            encoded = segment.encode('utf-8')
+            if size + len(encoded) > dictionary_size:
+                continue
+            chosen.append(encoded)
+            size += len(encoded)
+        return b''.join(reversed(chosen))
+
+    @classmethod
+    def from_archive(cls, archive, limit: int = ARCHIVE_TRAINING_STORIES, **kwargs) -> 'StoryCodec':
+        """
+        Train a codec on the most recent stories of a StoryArchive.
+        Args:
+            archive: The StoryArchive to read.
+            limit (int): Stories to train on.
+            **kwargs: Passed to train().
+        Returns:
+            StoryCodec: A codec using the trained dictionary.
+        """
+        return cls.train([entry.story for entry in archive.recent(limit=limit)], **kwargs)
+
+    @classmethod
+    def configure_default(cls, dictionary_path: Optional[str] = DEFAULT_DICTIONARY_PATH,
+                          archive_path: Optional[str] = None):
+        """
+        Choose where default() keeps its dictionary and which archive trains it.
+        Call before the first default(); processes sharing a cache must use the same dictionary file.
+        Args:
+            dictionary_path (Optional[str]): Dictionary file (None: never saved, always the sample corpus).
+            archive_path (Optional[str]): Story archive to train on once it has MIN_ARCHIVE_STORIES.
+        """
+        with cls._default_lock:
+            cls._dictionary_path = dictionary_path
+            cls._archive_path = archive_path
+            cls._default_instance = None
+
+    @classmethod
+    def default(cls) -> 'StoryCodec':
+        """
+        The process-wide codec, created on first use.
+        Every process sharing a cache must use the same dictionary, so it comes from
+        the dictionary file when there is one. Otherwise it is trained on the
+        configured archive's recent stories (once there are MIN_ARCHIVE_STORIES) and
+        saved to the file, where the first process to save wins; without such an
+        archive it is trained on the deterministic sample_corpus() and not saved,
+        so real stories take over once the archive has grown.
+        """
+        with cls._default_lock:
+            if cls._default_instance is None:
+                cls._default_instance = cls._load_default()
+            return cls._default_instance
+
+    @classmethod
+    def _load_default(cls) -> 'StoryCodec':
+        """Load or train the process-wide codec (see default()). Caller holds the lock."""
+        path = cls._dictionary_path
+        if path and os.path.exists(path):
+            with open(path, 'rb') as source:
+                return cls(source.read())
+
+        codec = None
+        if path and cls._archive_path and os.path.exists(cls._archive_path):
+            # Imported here: the archive stores stories with this codec
+            from .story_archive import StoryArchive
+            archive = StoryArchive(cls._archive_path)
+            try:
+                if archive.count() >= cls.MIN_ARCHIVE_STORIES:
+                    codec = cls.from_archive(archive)
+            except Exception as e:
+                print(f"Story dictionary training error: {e}")
+            finally:
+                archive.close()
+        if codec is None:
+            return cls.train(cls.sample_corpus())
+        return cls(cls._save_dictionary(path, codec.dictionary), backend=codec.backend)
+
+    @staticmethod
+    def _save_dictionary(path: str, dictionary: bytes) -> bytes:
+        """Save a dictionary unless another process saved one first; returns the dictionary in the file."""
+        temporary = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(temporary, 'wb') as output:
+                output.write(dictionary)
+            # Linking fails if the file exists, so every process ends up with the same dictionary
+            os.link(temporary, path)
+        except FileExistsError:
+            with open(path, 'rb') as source:
+                dictionary = source.read()
+        except OSError as e:
+            print(f"Story dictionary not saved: {e}")
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+        return dictionary
+
+    @classmethod
+    def read_header(cls, data: bytes) -> Tuple[str, int]:
+        """
+        Get the backend and dictionary checksum a compressed story was written with.
+        Args:
+            data (bytes): Output of compress().
+        Returns:
+            Tuple[str, int]: ('zstd' or 'zlib', dictionary_id).
+        Raises:
+            ValueError: If the data is not a compressed story.
+        """
+        if len(data) < 5 or data[0] not in cls._BACKENDS:
+            raise ValueError("Not a compressed story")
+        return cls._BACKENDS[data[0]], int.from_bytes(data[1:5], 'big')
+
+    @staticmethod
+    def sample_corpus(count: int = 200, seed: int = 7) -> List[str]:
+        """
+        Stories shaped like the app's output, for training without an archive:
+        the fallback templates and formatted free text, with illustrations.
+        Args:
+            count (int): Number of stories.
+            seed (int): Random seed (fixed, so the corpus is the same in every process).
+        Returns:
+            List[str]: Formatted sample stories.
+        """
+        from ..prompts import StoryPrompts
+
+        rng = random.Random(seed)
+        names = ['Mia', 'Leo', 'Ava', 'Noah', 'Zoe', 'Omar', 'Lily', 'Kai', 'Emma', 'Ravi', 'Aanya', 'Sam']
+        animals = ['cat', 'dog', 'owl', 'bunny', 'fox', 'turtle', 'unicorn', 'dragon', 'dolphin']
+        colors = ['pink', 'blue', 'purple', 'green', 'yellow', 'orange', 'red', 'rainbow']
+        interests = ['animals', 'space', 'dragons', 'ocean', 'castles', 'stars', 'nature', 'fairies']
+        weathers = ['clear sky', 'scattered clouds', 'light rain', 'gentle snow', 'overcast clouds']
+        sentences = [
+            "Once upon a time, {name} found a glowing {color} path behind the garden.",
+            "A friendly {animal} waved from the window and asked {name} to come and play.",
+            "Together they counted the stars until the moon began to smile.",
+            "The {color} light twinkled softly over the sleepy village.",
+            "{name} learned something wonderful about {interest} that night.",
+            "The wind whispered a lullaby through the {weather}.",
+            "With a happy yawn, {name} snuggled under the blanket and drifted into sweet dreams.",
+            "Every dream is a new adventure waiting to begin."
+        ]
+        templates = StoryPrompts.get_fallback_story_templates()
+
+        stories = []
+        for index in range(count):
+            values = {
+                'name': rng.choice(names), 'animal': rng.choice(animals), 'color': rng.choice(colors),
+                'interest': rng.choice(interests), 'weather': rng.choice(weathers)
+            }
+            if index % 2 == 0:
+                text = rng.choice(templates).format(
+                    name=values['name'], age=rng.randint(3, 10), mood='happy and cheerful',
+                    interests=', '.join(rng.sample(interests, 2)), animal=values['animal'],
+                    color=values['color'], weather=values['weather'], season=rng.choice(['spring', 'autumn']),
+                    time_of_day='evening', fact="stars twinkle because of the air around the Earth"
+                )
+            else:
+                paragraphs = [' '.join(rng.sample(sentences, 3)).format(**values) for _ in range(rng.randint(3, 6))]
+                text = '\n\n'.join(paragraphs)
+            story = StoryFormatter.format_story(text, values['name'])
+            stories.append(StoryFormatter.add_illustrations(story))
+        return stories
+
+    def compress(self, story: str) -> bytes:
+        """
+        Compress one story.
+        Args:
+            story (str): The story text.
+        Returns:
+            bytes: Header plus compressed data.
+        """
+        data = story.encode('utf-8')
+        if self.backend == 'zstd':
+            return self._header + self._zstd_compressor().compress(data)
+        compressor = zlib.compressobj(self.COMPRESSION_LEVEL, zlib.DEFLATED, -15, zdict=self._zlib_dictionary)
+        return self._header + compressor.compress(data) + compressor.flush()
+
+    def decompress(self, data: bytes) -> str:
+        """
+        Decompress a story written by compress().
+        Args:
+            data (bytes): Compressed story.
+        Returns:
+            str: The story text.
+        Raises:
+            ValueError: If the data was written with another dictionary or backend.
+        """
+        if data[:5] != self._header:
+            raise ValueError("Story was compressed with a different codec dictionary")
+        if self.backend == 'zstd':
+            return self._zstd_decompressor().decompress(data[5:]).decode('utf-8')
+        decompressor = zlib.decompressobj(-15, zdict=self._zlib_dictionary)
+        return (decompressor.decompress(data[5:]) + decompressor.flush()).decode('utf-8')
+
+    def _zstd_compressor(self):
+        """This thread's zstd compressor (they are not thread-safe)."""
+        compressor = getattr(self._local, 'compressor', None)
+        if compressor is None:
+            import zstandard
+            compressor = zstandard.ZstdCompressor(level=self.ZSTD_LEVEL, dict_data=self._zstd_dictionary,
+                                                  write_content_size=True, write_checksum=False,
+                                                  write_dict_id=False)
+            self._local.compressor = compressor
+        return compressor
+
+    def _zstd_decompressor(self):
+        """This thread's zstd decompressor."""
+        decompressor = getattr(self._local, 'decompressor', None)
+        if decompressor is None:
+            import zstandard
+            decompressor = zstandard.ZstdDecompressor(dict_data=self._zstd_dictionary)
+            self._local.decompressor = decompressor
+        return decompressor
+
+    def measure(self, stories: Iterable[str], rounds: int = 3) -> CodecReport:
+        """
+        Measure compression ratio and decode throughput on a set of stories.
+        Args:
+            stories (Iterable[str]): Stories to measure (ideally not the training stories).
+            rounds (int): Decode passes timed (the fastest is reported).
+        Returns:
+            CodecReport: Sizes, ratios and decode speed.
+        """
+        stories = [story for story in stories if story]
+        compressed = [self.compress(story) for story in stories]
+        raw_bytes = sum(len(story.encode('utf-8')) for story in stories)
+
+        best = float('inf')
+        for _ in range(max(rounds, 1)):
+            started = time.perf_counter()
+            for data in compressed:
+                self.decompress(data)
+            best = min(best, time.perf_counter() - started)
+
+        return CodecReport(
+            backend=self.backend,
+            dictionary_bytes=len(self.dictionary),
+            stories=len(stories),
+            raw_bytes=raw_bytes,
+            compressed_bytes=sum(len(data) for data in compressed),
+            baseline_bytes=sum(len(zlib.compress(story.encode('utf-8'), self.COMPRESSION_LEVEL)) for story in stories),
+            decode_mb_per_second=raw_bytes / best / 1e6 if best > 0 else 0.0
+        )
@@ -0,0 +1,187 @@
+"""
+Bounded, compressed per-session story history for the Bedtime Story Generator.
+"""
+
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .story_codec import StoryCodec
+
+# This dataclass stores one story in a session's history. Only the most recent
+# stories keep their text as-is; older ones keep only the compressed bytes.
+@dataclass
+class HistoryEntry:
+    """Data class to store a story in the session history."""
+    entry_id: str                    # Unique entry ID
+    title: str                       # Title shown in the history list
+    created_at: float                # When the story was added (epoch seconds)
+    raw_size: int                    # Size of the story text in UTF-8 bytes
+    story: Optional[str] = None      # Story text, kept only for recent entries
+    compressed: Optional[bytes] = None  # Compressed story text for older entries
+
+    @property
+    def stored_bytes(self) -> int:
+        """Approximate bytes held for the story body."""
+        if self.compressed is not None:
+            return len(self.compressed)
+        return self.raw_size
+
+class StoryHistory:
+    """
+    Per-session story history with entry and byte caps and LRU eviction.
+    The newest entries stay uncompressed for instant display; older entries are
+    compressed (with a StoryCodec dictionary, so even one short story shrinks
+    well) and only decompressed when opened. Every history in the process
+    is tracked (weakly), so total_bytes() reports memory across all sessions.
+    """
+
+    DEFAULT_MAX_ENTRIES = 20
+    DEFAULT_MAX_BYTES = 256 * 1024
+    DEFAULT_UNCOMPRESSED_ENTRIES = 1
+
+    # All live histories in this process, for the memory gauge
+    _instances = weakref.WeakSet()
+    _instances_lock = threading.Lock()
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 uncompressed_entries: int = DEFAULT_UNCOMPRESSED_ENTRIES,
+                 codec: Optional[StoryCodec] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            max_entries (int): Maximum number of stories kept; least recently used are evicted.
+            max_bytes (int): Maximum bytes held for story bodies (as stored, i.e. mostly compressed);
+                least recently used stories are evicted to stay under it, except the most recent one.
+            uncompressed_entries (int): Number of most recently used stories kept uncompressed.
+            codec (Optional[StoryCodec]): Compresses older entries (default: StoryCodec.default(),
+                trained on first use).
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.uncompressed_entries = uncompressed_entries
+        self._codec = codec
+        self._entries: "OrderedDict[str, HistoryEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+        with StoryHistory._instances_lock:
+            StoryHistory._instances.add(self)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def codec(self) -> StoryCodec:
+        """The codec for older entries, resolved on first compression."""
+        if self._codec is None:
+            self._codec = StoryCodec.default()
+        return self._codec
+
+    def add(self, story: str, title: str) -> str:
+        """
+        Add a story as the most recently used entry.
+        Args:
+            story (str): The story text (usually HTML).
+            title (str): Title shown in the history list.
+        Returns:
+            str: The new entry's ID.
+        """
+        entry = HistoryEntry(
+            entry_id=uuid.uuid4().hex,
+            title=title,
+            created_at=time.time(),
+            raw_size=len(story.encode('utf-8')),
+            story=story
+        )
+        with self._lock:
+            self._entries[entry.entry_id] = entry
+            self._compress_older_entries()
+            self._evict()
+        return entry.entry_id
+
+    def open(self, entry_id: str) -> Optional[str]:
+        """
+        Get a story's text, decompressing it if needed, and mark it most recently used.
+        Args:
+            entry_id (str): The entry to open.
+        Returns:
+            Optional[str]: The story text, or None if the entry is not in the history.
+        """
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is None:
+                return None
+
+            if entry.story is None:
+                entry.story = self.codec.decompress(entry.compressed)
+                entry.compressed = None
+            self._entries.move_to_end(entry_id)
+            self._compress_older_entries()
+            self._evict()
+            return entry.story
+
+    def entries(self) -> List[HistoryEntry]:
+        """List entries, most recently used first (story bodies are not decompressed)."""
+        with self._lock:
+            return list(reversed(self._entries.values()))
+
+    def remove(self, entry_id: str) -> bool:
+        """Remove an entry; returns True if it existed."""
+        with self._lock:
+            return self._entries.pop(entry_id, None) is not None
+
+    def _compress_older_entries(self):
+        """Compress every entry except the most recently used ones. Caller holds the lock."""
+        keep = max(self.uncompressed_entries, 0)
+        older = list(self._entries.values())[:-keep] if keep else list(self._entries.values())
+        for entry in older:
+            if entry.story is not None:
+                entry.compressed = self.codec.compress(entry.story)
+                entry.story = None
+
+    def _evict(self):
+        """
+        Drop least recently used entries until both caps hold. The most recent
+        entry always stays, even if it is over the byte budget alone. Caller holds the lock.
+        """
+        stored = sum(entry.stored_bytes for entry in self._entries.values())
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or stored > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            stored -= evicted.stored_bytes
+            self.evictions += 1
+
+    def stored_bytes(self) -> int:
+        """Bytes held for story bodies in this history."""
+        with self._lock:
+            return sum(entry.stored_bytes for entry in self._entries.values())
+
+    def raw_bytes(self) -> int:
+        """Bytes the story bodies would take uncompressed."""
+        with self._lock:
+            return sum(entry.raw_size for entry in self._entries.values())
+
+    @classmethod
+    def total_bytes(cls) -> int:
+        """Bytes held for story bodies across all sessions in this process."""
+        return cls.memory_report()['stored_bytes']
+
+    @classmethod
+    def memory_report(cls) -> Dict[str, int]:
+        """
+        Summarize history memory across all sessions in this process.
+        Returns:
+            Dict[str, int]: Session count, entry count, stored bytes and uncompressed bytes.
+        """
+        with cls._instances_lock:
+            histories = list(cls._instances)
+
+        report = {'sessions': len(histories), 'entries': 0, 'stored_bytes': 0, 'raw_bytes': 0}
+        for history in histories:
+            report['entries'] += len(history)
+            report['stored_bytes'] += history.stored_bytes()
+            report['raw_bytes'] += history.raw_bytes()
+        return report
@@ -0,0 +1,280 @@
+"""
+Re-personalizable story template cache for the Bedtime Story Generator.
+"""
+
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from ..models import ChildPreferences, FrozenChildPreferences, StoryContext
+
+# Child details abstracted out of cached stories, in the order they are replaced
+_SLOTS = ('name', 'favorite_animal', 'favorite_color')
+
+# Request context abstracted out of cached stories where it appears word for word
+_CONTEXT_SLOTS = ('fact', 'weather')
+
+# Placeholders look like ⟦favorite_animal⟧. The slot name's casing records the word's:
+# ⟦Favorite_animal⟧ was capitalized, ⟦FAVORITE_ANIMAL⟧ all capitals. A trailing "+s" means plural.
+_MARKER_PATTERN = re.compile(r'⟦(\w+)(\+s)?⟧')
+
+# One LLM story with its personal details replaced by placeholders.
+@dataclass
+class StoryTemplate:
+    """Data class to store a cached story template."""
+    template: str                    # Story HTML with ⟦slot⟧ placeholders
+    origin: Tuple[str, str, str]     # (name, animal, color) of the child it was written for
+    requires: Tuple[Tuple[str, str], ...] = ()  # Context values the story may mention in other words
+    uses: int = 0                    # Times it was re-personalized for another child
+    served_to: Set[Tuple[str, str, str]] = field(default_factory=set, repr=False)
+
+class StoryTemplateCache:
+    """
+    Cache of LLM stories keyed on the expensive parts of a request.
+
+    Stories are stored with the child's name, favorite animal and favorite color
+    replaced by placeholders. A later request with the same interests, mood, age
+    band, story length and season, but different slot values, gets a cached story
+    with its own details substituted in instead of a new LLM generation. The
+    educational fact and weather description are replaced the same way where the
+    story quotes them; a story that does not quote them (it may have paraphrased
+    them) is only reused for requests with the same fact and weather. Each base
+    story is reused at most max_reuses times and never twice for the same child,
+    so families still hear new stories.
+    """
+
+    DEFAULT_MAX_KEYS = 256
+    DEFAULT_MAX_REUSES = 3
+    DEFAULT_TEMPLATES_PER_KEY = 4
+
+    # Upper age of each band; stories are simplified per age, so bands must not be too wide
+    AGE_BANDS = (4, 7, 10)
+
+    # Shorter names (e.g. "I", "A") cannot be told apart from words in the story, so they are not cached
+    MIN_NAME_LENGTH = 2
+
+    def __init__(self, max_keys: int = DEFAULT_MAX_KEYS, max_reuses: int = DEFAULT_MAX_REUSES,
+                 templates_per_key: int = DEFAULT_TEMPLATES_PER_KEY):
+        """
+        Args:
+            max_keys (int): Distinct request keys kept; least recently used are evicted.
+            max_reuses (int): How many other children one base story may be re-personalized for
+                (0 disables the cache: nothing is stored).
+            templates_per_key (int): Base stories kept for each key.
+        """
+        self.max_keys = max_keys
+        self.max_reuses = max_reuses
+        self.templates_per_key = templates_per_key
+        self._templates: "OrderedDict[Tuple, List[StoryTemplate]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.retired = 0
+
+    def __len__(self) -> int:
+        return sum(len(templates) for templates in self._templates.values())
+
+    @classmethod
+    def age_band(cls, age: int) -> int:
+        """Index of the age band an age falls into."""
+        for index, upper in enumerate(cls.AGE_BANDS):
+            if age <= upper:
+                return index
+        return len(cls.AGE_BANDS)
+
+    @classmethod
+    def cache_key(cls, preferences: ChildPreferences, season: str) -> Tuple:
+        """Key over the dimensions that need a new LLM generation when they change."""
+        frozen = FrozenChildPreferences.from_mutable(preferences)
+        return (frozen.interests, frozen.mood, cls.age_band(frozen.age), frozen.story_length,
+                season.strip().lower())
+
+    @staticmethod
+    def _slot_values(preferences: ChildPreferences) -> Tuple[str, str, str]:
+        return tuple(' '.join(str(getattr(preferences, slot)).split()) for slot in _SLOTS)
+
+    @staticmethod
+    def _context_values(context: StoryContext) -> Dict[str, str]:
+        return {'fact': ' '.join(context.educational_fact.split()).rstrip('.!?'),
+                'weather': ' '.join(context.weather.description.split())}
+
+    @staticmethod
+    def _values(context: StoryContext) -> Dict[str, str]:
+        """Every slot's value for a request; the fact comes first, as it may contain the animal or color."""
+        values = StoryTemplateCache._context_values(context)
+        values.update(zip(_SLOTS, StoryTemplateCache._slot_values(context.preferences)))
+        return values
+
+    @staticmethod
+    def _slot_pattern(slot: str, value: str) -> re.Pattern:
+        """
+        Pattern for one slot's value in story text (outside HTML tags, captured as group 1).
+        The name is matched only as written, capitalized or in capitals, so a name that is also
+        a word ("Will", "May", "Rose") leaves the word alone; other values match in any case,
+        and animal and color also match their plurals.
+        """
+        if slot == 'name':
+            forms = sorted({value, value[:1].upper() + value[1:], value.upper()}, key=len, reverse=True)
+            return re.compile(r'(<[^>]*>)|\b(?:' + '|'.join(map(re.escape, forms)) + r')(?!\w)')
+        plural = '(?:e?s)?' if slot in ('favorite_animal', 'favorite_color') else ''
+        return re.compile(r'(<[^>]*>)|\b' + re.escape(value) + plural + r'(?!\w)', re.IGNORECASE)
+
+    @staticmethod
+    def abstract(story: str, context: StoryContext) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+        """
+        Replace the child's details, the fact and the weather with placeholders.
+        Only text outside HTML tags is changed. The name is matched as written,
+        capitalized or in capitals ("MIA" and "Mia's" are found too); the other
+        values in any case (see _slot_pattern).
+        Args:
+            story (str): The story HTML.
+            context (StoryContext): The context the story was written for.
+        Returns:
+            Tuple[str, Tuple[Tuple[str, str], ...]]: The story with ⟦slot⟧ placeholders, and the
+                (slot, value) pairs of context values that were not found word for word.
+        """
+        requires = []
+        for slot, value in StoryTemplateCache._values(context).items():
+            if not value:
+                continue
+            pattern = StoryTemplateCache._slot_pattern(slot, value)
+            found = False
+
+            def replace(match, slot=slot, value=value):
+                nonlocal found
+                if match.group(1):
+                    return match.group(1)
+                found = True
+                word = match.group(0)
+                if word.isupper() and any(char.isalpha() for char in word[1:]):
+                    marker = slot.upper()
+                elif word[:1].isupper() and slot != 'name':
+                    marker = slot.capitalize()
+                else:
+                    marker = slot
+                return f"⟦{marker}{'+s' if len(word) > len(value) else ''}⟧"
+
+            story = pattern.sub(replace, story)
+            if not found and slot in _CONTEXT_SLOTS:
+                requires.append((slot, value.lower()))
+        return story, tuple(requires)
+
+    @staticmethod
+    def personalize(template: str, context: StoryContext) -> str:
+        """Fill a template's placeholders with another request's details."""
+        values = StoryTemplateCache._values(context)
+
+        def replace(match):
+            marker = match.group(1)
+            slot = marker.lower()
+            value = values.get(slot, '')
+            if slot in ('favorite_animal', 'favorite_color'):
+                value = value.lower()
+            if match.group(2):
+                value = StoryTemplateCache.pluralize(value)
+            if marker.isupper():
+                return value.upper()
+            if marker[:1].isupper():
+                return value[:1].upper() + value[1:]
+            if slot in _CONTEXT_SLOTS:
+                # Mid-sentence: "... that elephants can't jump"
+                return value[:1].lower() + value[1:]
+            return value
+        return _MARKER_PATTERN.sub(replace, template)
+
+    @staticmethod
+    def pluralize(word: str) -> str:
+        """Simple English plural for animal and color words."""
+        if re.search(r'(s|x|z|ch|sh)$', word, re.IGNORECASE):
+            return word + 'es'
+        if re.search(r'[^aeiou]y$', word, re.IGNORECASE):
+            return word[:-1] + 'ies'
+        return word + 's'
+
+    def store(self, story: str, context: StoryContext):
+        """
+        Cache an LLM story for re-personalization (nothing is stored when max_reuses is 0,
+        or for names shorter than MIN_NAME_LENGTH).
+        Args:
+            story (str): The story as written for this request.
+            context (StoryContext): The child's preferences, weather, time and fact it was written with.
+        """
+        if self.max_reuses <= 0 or len(context.preferences.name.strip()) < self.MIN_NAME_LENGTH:
+            return
+        template, requires = self.abstract(story, context)
+        entry = StoryTemplate(template=template, origin=self._slot_values(context.preferences), requires=requires)
+        entry.served_to.add(entry.origin)
+        key = self.cache_key(context.preferences, context.time_info.season)
+        with self._lock:
+            templates = self._templates.setdefault(key, [])
+            templates.append(entry)
+            del templates[:-self.templates_per_key]
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_keys:
+                self._templates.popitem(last=False)
+
+    def lookup(self, context: StoryContext, deferred=None) -> Optional[str]:
+        """
+        Get a cached story re-personalized for a request.
+        Args:
+            context (StoryContext): The requesting child's preferences, weather, time and fact.
+            deferred: Optional DeferredActions (speculative requests); the reuse is then only
+                counted if they are committed.
+        Returns:
+            Optional[str]: The personalized story, or None if no reusable template matches.
+        """
+        key = self.cache_key(context.preferences, context.time_info.season)
+        slots = self._slot_values(context.preferences)
+        current = {slot: value.lower() for slot, value in self._context_values(context).items()}
+        with self._lock:
+            templates = self._templates.get(key)
+            candidates = [t for t in templates or ()
+                          if slots not in t.served_to and all(current[slot] == value for slot, value in t.requires)]
+            if not candidates:
+                self.misses += 1
+                return None
+
+            # Spread reuse over the base stories
+            entry = min(candidates, key=lambda t: t.uses)
+            template = entry.template
+            if deferred is None:
+                self._record_use(key, entry, slots)
+
+        if deferred is not None:
+            deferred.add(lambda: self._use_later(key, entry, slots))
+        return self.personalize(template, context)
+
+    def _record_use(self, key: Tuple, entry: StoryTemplate, slots: Tuple[str, str, str]):
+        """Count one reuse of a template, retiring it at max_reuses. Caller holds the lock."""
+        entry.uses += 1
+        entry.served_to.add(slots)
+        self.hits += 1
+        templates = self._templates.get(key)
+        if templates is None or entry not in templates:
+            # Retired or evicted meanwhile
+            return
+        if entry.uses >= self.max_reuses:
+            templates.remove(entry)
+            self.retired += 1
+            if not templates:
+                del self._templates[key]
+        else:
+            self._templates.move_to_end(key)
+
+    def _use_later(self, key: Tuple, entry: StoryTemplate, slots: Tuple[str, str, str]):
+        """Count a deferred reuse once it is committed."""
+        with self._lock:
+            self._record_use(key, entry, slots)
+
+    def stats(self) -> Dict[str, int]:
+        """Hit, miss and retirement counts plus the number of cached templates."""
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'retired': self.retired,
+                    'templates': sum(len(t) for t in self._templates.values())}
+
+    def clear(self):
+        """Drop all cached templates."""
+        with self._lock:
+            self._templates.clear()
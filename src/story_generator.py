@@ -2,41 +2,179 @@
 Main story generator module for the Bedtime Story Generator.
 """
 
+import contextlib
+import dataclasses
 import random
+import threading
 import time
-from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional
 
-# Import LangChain components for LLMs, tools, and agent orchestration
-from langchain.llms import HuggingFaceHub
-from langchain.tools import Tool
-from langchain.agents import initialize_agent, AgentType
+# LangChain and the Hugging Face client are imported lazily (see the llm and
+# agent properties), so importing this module stays fast.
 
 # Import local models, tools, prompts, and utilities
-from .models import ChildPreferences, WeatherInfo, TimeInfo, StoryContext
+from .models import ChildPreferences, FrozenChildPreferences, WeatherInfo, TimeInfo, StoryContext
 from .tools import WeatherTool, TimeTool, SearchTool
-from .prompts import StoryPrompts
-from .utils import ContentFilter, StoryFormatter
+from .prompts import StoryPrompts, PromptBuilder, BuiltPrompt, PrefixCache
+from .utils import (ContentFilter, StoryFormatter, DegenerationDetector, DegenerateOutputError,
+                    DeferredActions, JobCancelledError)
 
 class StoryGenerator:
     """Main story generation class using LangChain and Hugging Face LLMs."""
     
-    def __init__(self, huggingfacehub_api_token: str):
+    # Progress stage reported when the LLM fails and a template story is told instead
+    FALLBACK_STAGE = "Telling a favorite classic instead"
+    
+    # Progress stage reported, with the text so far, while the model writes the story
+    WRITING_STAGE = "Writing the story"
+    
+    # Extra attempts when the model's output degenerates into loops
+    DEGENERATION_RETRIES = 1
+    
+    # How long a generated story is served again for identical requests (seconds)
+    STORY_CACHE_TTL = 900
+    
+    def __init__(self, huggingfacehub_api_token: str,
+                 input_token_budget: int = PromptBuilder.DEFAULT_INPUT_TOKEN_BUDGET,
+                 local_backend=None, scheduler=None, dispatcher=None,
+                 tenant: str = 'default', priority: int = 0, archive=None, template_cache=None,
+                 parallel_sections: bool = True, cache=None, story_cache_ttl: float = STORY_CACHE_TTL,
+                 context_provider=None, cassette=None, city: Optional[str] = None,
+                 timezone: Optional[str] = None, owner: Optional[str] = None):
         """
         Initialize the story generator with a Hugging Face LLM and contextual tools.
         Args:
             huggingfacehub_api_token (str): API token for Hugging Face Hub.
+            input_token_budget (int): Maximum number of prompt tokens sent per story.
+            local_backend: Optional local inference backend (see PrefixCache). When given,
+                stories are generated locally and the static prompt prefix is encoded only once.
+            scheduler: Optional MicroBatchScheduler shared by several generators. When given,
+                prompts are batched with those of concurrent requests (for backends that generate
+                a batch in one call; see MicroBatchScheduler.for_batch_backend).
+            dispatcher: Optional RequestDispatcher that rate-limits LLM calls fairly across tenants.
+            tenant (str): Who this generator's requests are for (e.g. a session ID).
+            priority (int): Dispatcher priority class (RequestDispatcher.INTERACTIVE, BATCH, PREGENERATION).
+            archive: Optional StoryArchive (or ArchiveBatchWriter) that records every story with its context,
+                for the owner.
+            template_cache: Optional StoryTemplateCache. LLM stories are cached with the child's details
+                abstracted, and re-personalized for similar requests instead of generating again.
+            parallel_sections (bool): With a local backend or scheduler, write long stories as an outline
+                followed by sections generated concurrently (see PromptBuilder.SECTION_COUNTS), instead of
+                one long completion. The rate-limited Hugging Face agent always writes one completion.
+            cache: Optional CacheBackend for weather and finished stories. A SQLiteCache shared by
+                all worker processes fetches each city's weather and each story once per host.
+            story_cache_ttl (float): Seconds a cached story is returned for identical preferences
+                (0 caches weather only).
+            context_provider: Optional ContextProvider. Weather and time then come from its
+                background-refreshed snapshot instead of being fetched for each story.
+            cassette: Optional Cassette that records every LLM call and weather API exchange,
+                or replays recorded ones without network access.
+            city (Optional[str]): Where the child is, for the weather (default: WeatherTool.DEFAULT_CITY).
+            timezone (Optional[str]): IANA timezone for the time of day (default, or if unknown: server local time).
+            owner (Optional[str]): Who archived stories belong to and can be found by, across sessions
+                (e.g. StoryArchive.owner_for_token; default: the tenant).
         """
-        # Set up the language model (DialoGPT-medium) from Hugging Face
-        self.llm = HuggingFaceHub(
-            repo_id="microsoft/DialoGPT-medium",
-            model_kwargs={"temperature": 0.8, "max_length": 500},
-            huggingfacehub_api_token=huggingfacehub_api_token
-        )
+        # Base generation settings; the output token limit is added per call (see _agent_for)
+        self.model_kwargs = {"temperature": 0.8}
+        
+        # The LLM and agent are created on first use (see the llm and agent properties)
+        self.huggingfacehub_api_token = huggingfacehub_api_token
+        self._llm = None
+        self._agent = None
+        self.tools = []
+        self._llm_lock = threading.Lock()
+        # Per-thread agents keyed by output token limit, so concurrent calls never share or modify one
+        self._local_agents = threading.local()
+        
+        # Builds compact prompts within the input token budget
+        self.prompt_builder = PromptBuilder(input_token_budget=input_token_budget)
+        
+        # Reuses the encoded instruction prefix when running on a local backend
+        self.prefix_cache = PrefixCache(local_backend) if local_backend is not None else None
+        
+        # Batches prompts from concurrent requests into one model call
+        self.scheduler = scheduler
+        
+        # Rate-limits LLM calls with per-tenant fairness and priority classes
+        self.dispatcher = dispatcher
+        self.tenant = tenant
+        self.priority = priority
+        
+        # Persists finished stories so they can be found and re-read later, by the same owner
+        self.archive = archive
+        self.owner = owner if owner is not None else tenant
+        
+        # Re-personalizes cached stories for requests that differ only in name, animal or color
+        self.template_cache = template_cache
+        
+        # Long stories: outline first, then all sections at once
+        self.parallel_sections = parallel_sections
+        
+        # Completions cut short because they degenerated
+        self.degeneration_aborts = 0
+        
+        # Weather and finished stories shared with other generators (and processes) using the cache
+        self.cache = cache
+        self.story_cache_ttl = story_cache_ttl
+        
+        # Precomputed weather and time snapshots (see get_story_context)
+        self.context_provider = context_provider
+        self.city = city
+        # An unknown timezone (e.g. a typo in STORY_TIMEZONE) falls back to local time, with a warning
+        self.timezone = TimeTool.valid_timezone(timezone)
+        
+        # Records or replays external calls for offline benchmarks
+        self.cassette = cassette
         
         # Initialize context tools for weather, time, and educational facts
-        self.weather_tool = WeatherTool()
+        self.weather_tool = WeatherTool(cache=cache, cassette=cassette)
         self.time_tool = TimeTool()
         self.search_tool = SearchTool()
+    
+    @property
+    def llm(self):
+        """The Hugging Face LLM, created (and LangChain imported) on first access."""
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    self._llm = self._create_llm()
+        return self._llm
+    
+    @property
+    def agent(self):
+        """The LangChain agent with context tools, created on first access."""
+        if self._agent is None:
+            llm = self.llm
+            with self._llm_lock:
+                if self._agent is None:
+                    self._agent = self._create_agent(llm)
+        return self._agent
+    
+    def _create_llm(self, max_new_tokens: Optional[int] = None):
+        """
+        Create a Hugging Face LLM.
+        Args:
+            max_new_tokens (Optional[int]): Output token limit (the prompt does not count against it).
+        Returns:
+            HuggingFaceHub: A new LLM with its own generation settings.
+        """
+        from langchain.llms import HuggingFaceHub
+        
+        model_kwargs = dict(self.model_kwargs)
+        if max_new_tokens is not None:
+            model_kwargs["max_new_tokens"] = max_new_tokens
+        # Set up the language model (DialoGPT-medium) from Hugging Face
+        return HuggingFaceHub(
+            repo_id="microsoft/DialoGPT-medium",
+            model_kwargs=model_kwargs,
+            huggingfacehub_api_token=self.huggingfacehub_api_token
+        )
+    
+    def _create_agent(self, llm):
+        """Create a LangChain agent with the context tools around an LLM."""
+        from langchain.tools import Tool
+        from langchain.agents import initialize_agent, AgentType
         
         # Wrap tools as LangChain Tool objects for agent use
         self.tools = [
@@ -58,49 +196,97 @@ class StoryGenerator:
         ]
         
         # Initialize a LangChain agent that can use the above tools
-        self.agent = initialize_agent(
+        return initialize_agent(
             self.tools,
-            self.llm,
+            llm,
             agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
             verbose=False
         )
     
-    def generate_story(self, preferences: ChildPreferences) -> str:
+    def _agent_for(self, max_new_tokens: int):
+        """
+        This thread's agent for an output token limit, created on first use.
+        Generation settings are fixed when an agent is created, so requests for
+        different story lengths (and concurrent requests) never change a shared LLM.
+        """
+        agents = getattr(self._local_agents, 'agents', None)
+        if agents is None:
+            agents = self._local_agents.agents = {}
+        agent = agents.get(max_new_tokens)
+        if agent is None:
+            agent = agents[max_new_tokens] = self._create_agent(self._create_llm(max_new_tokens))
+        return agent
+    
+    def generate_story(self, preferences: ChildPreferences,
+                       on_progress: Optional[Callable[..., None]] = None,
+                       context: Optional[StoryContext] = None,
+                       deferred: Optional[DeferredActions] = None) -> str:
         """
         Generate a personalized bedtime story based on child preferences and real-world context.
         Args:
             preferences (ChildPreferences): The child's preferences and story settings.
+            on_progress (Optional[Callable[..., None]]): Called as on_progress(stage, partial=None)
+                when generation moves to a new stage (used by background jobs).
+            context (Optional[StoryContext]): Weather, time and fact gathered beforehand (e.g. by
+                get_story_context or a ContextProvider); gathered now if not given.
+            deferred (Optional[DeferredActions]): For stories nobody has asked for yet (speculative
+                generation): archiving the story, sharing it through the story cache, storing it as a
+                template and using up a template reuse are added here, to happen only if the story is used.
         Returns:
             str: The final, formatted, and filtered story.
         """
+        report = on_progress or (lambda stage, partial=None: None)
         
-        # Gather real-world context for the story
-        weather_info = self.weather_tool.get_weather()
-        time_info = self.time_tool.get_time_info()
+        # Gather real-world context for the story, unless the caller already has it
+        if context is None:
+            report("Checking the weather and the stars")
+            context = self.get_story_context(preferences)
+        elif context.preferences is not preferences:
+            context = dataclasses.replace(context, preferences=preferences)
+        weather_info = context.weather
+        time_info = context.time_info
+        educational_fact = context.educational_fact
         
-        # Get an educational fact related to one of the child's interests
-        educational_fact = self.search_tool.search_facts(
-            random.choice(preferences.interests)
-        )
+        # The same request was answered recently (possibly by another worker process)
+        story_key = self._story_cache_key(preferences, context)
+        cached_story = self._cached_story(story_key)
+        if cached_story is not None:
+            return cached_story
         
-        # Bundle all context into a StoryContext object
-        context = StoryContext(
-            preferences=preferences,
-            weather=weather_info,
-            time_info=time_info,
-            educational_fact=educational_fact
-        )
+        # A story written for a similar request only needs this child's details swapped in
+        if self.template_cache is not None:
+            cached_story = self.template_cache.lookup(context, deferred=deferred)
+            if cached_story is not None:
+                report("Adding the finishing touches")
+                filtered_story = ContentFilter.filter_content(cached_story)
+                simplified_story = ContentFilter.simplify_language(filtered_story, preferences.age)
+                final_story = StoryFormatter.add_illustrations(simplified_story)
+                self._archive_story(final_story, context, deferred)
+                return final_story
         
         try:
-            # Create a prompt for the LLM using all gathered context
-            story_prompt = StoryPrompts.create_story_prompt(
-                preferences, weather_info, time_info, educational_fact
-            )
-            # Use the agent (with tools) to generate the story
-            response = self.agent.run(story_prompt)
-            
-            # Format the story for readability and personalization
-            formatted_story = StoryFormatter.format_story(response, preferences.name)
+            if self._writes_sections(preferences):
+                # Long story: plan it, then write the sections concurrently and join them
+                formatted_story = self._generate_sections(
+                    preferences, weather_info, time_info, educational_fact, report
+                )
+            else:
+                # Create a compact, token-budgeted prompt using all gathered context
+                story_prompt = self.prompt_builder.build(
+                    preferences, weather_info, time_info, educational_fact
+                )
+                # Use the agent (with tools) to generate the story
+                report(self.WRITING_STAGE)
+                response = self._run_llm(
+                    story_prompt, report, on_text=lambda text: report(self.WRITING_STAGE, text)
+                )
+                report("Adding the finishing touches", response)
+                
+                # Format the story for readability and personalization
+                formatted_story = StoryFormatter.format_story(response, preferences.name)
+            # Keep the story for similar requests, before filtering changes its casing
+            if self.template_cache is not None:
+                self._when_used(lambda: self.template_cache.store(formatted_story, context), deferred)
             # Filter the story for safety and appropriateness
             filtered_story = ContentFilter.filter_content(formatted_story)
             # Simplify language based on the child's age
@@ -108,13 +294,258 @@ class StoryGenerator:
             
             # Optionally add illustrations (e.g., emojis or text art)
             final_story = StoryFormatter.add_illustrations(simplified_story)
+            self._when_used(lambda: self._cache_story(story_key, final_story), deferred)
             
-            return final_story
-            
+        except JobCancelledError:
+            # The background job was cancelled: stop without telling a fallback story
+            raise
         except Exception as e:
             # If anything fails, print the error and generate a fallback story
             print(f"Story generation error: {e}")
-            return self._generate_fallback_story(context)
+            report(self.FALLBACK_STAGE)
+            final_story = self._generate_fallback_story(context)
+        
+        self._archive_story(final_story, context, deferred)
+        return final_story
+    
+    @staticmethod
+    def _when_used(action: Callable[[], None], deferred: Optional[DeferredActions]):
+        """Run a side effect of a finished story now, or once the story is used if deferred is given."""
+        if deferred is None:
+            action()
+        else:
+            deferred.add(action)
+    
+    def _writes_sections(self, preferences: ChildPreferences) -> bool:
+        """
+        Whether to write this story as an outline and parallel sections.
+        That takes one more LLM call than sections, so it is only worth it where calls
+        run concurrently and are not rate-limited per request: the local backend and the
+        batch scheduler. Hugging Face Hub calls count against the provider's rate limit
+        and the agent does not run concurrently, so long stories stay one completion there.
+        """
+        if not self.parallel_sections or self.prompt_builder.section_count(preferences.story_length) <= 1:
+            return False
+        return self.prefix_cache is not None or self.scheduler is not None
+    
+    def _generate_sections(self, preferences: ChildPreferences, weather_info: WeatherInfo,
+                           time_info: TimeInfo, educational_fact: str,
+                           report: Callable[..., None]) -> str:
+        """
+        Generate a story as a short outline followed by its sections in parallel.
+        Every section prompt carries the child details and the whole outline, so the
+        parts fit together; wall-clock time is one outline plus one section.
+        Args:
+            preferences (ChildPreferences): The child's preferences and story settings.
+            weather_info (WeatherInfo): Weather context.
+            time_info (TimeInfo): Time/date context.
+            educational_fact (str): Educational fact to include.
+            report (Callable[..., None]): Progress callback.
+        Returns:
+            str: The formatted story, one paragraph block per section.
+        """
+        count = self.prompt_builder.section_count(preferences.story_length)
+        
+        report("Planning the story")
+        outline_prompt = self.prompt_builder.build_outline(
+            preferences, weather_info, time_info, educational_fact
+        )
+        outline = PromptBuilder.parse_outline(
+            self._run_llm(outline_prompt, report, stage="Planning the story"), count
+        )
+        
+        section_prompts = [
+            self.prompt_builder.build_section(preferences, weather_info, time_info, educational_fact, outline, index)
+            for index in range(count)
+        ]
+        stage = f"Writing the story ({count} parts at once)"
+        report(stage)
+        
+        # Each section streams into its own slot; progress shows them joined in order
+        partials = [''] * count
+        partials_lock = threading.Lock()
+        
+        def on_section_text(index: int, text: str):
+            with partials_lock:
+                partials[index] = text
+                joined = '\n\n'.join(part for part in partials if part)
+            report(stage, joined)
+        
+        def write_section(index: int) -> str:
+            return self._run_llm(section_prompts[index], report,
+                                 on_text=lambda text: on_section_text(index, text), stage=stage)
+        
+        with ThreadPoolExecutor(max_workers=count, thread_name_prefix="story-section") as pool:
+            responses = list(pool.map(write_section, range(count)))
+        report("Adding the finishing touches", '\n\n'.join(responses))
+        
+        # Format each section on its own so it keeps its own paragraph
+        return '\n'.join(StoryFormatter.format_story(response, preferences.name) for response in responses)
+    
+    def _story_cache_key(self, preferences: ChildPreferences, context: StoryContext) -> Optional[str]:
+        """
+        Key for stories written for these preferences today, at this place, time of day and weather,
+        or None if not caching. Stories mention the local weather and time of day, so generators
+        for different cities or timezones sharing one cache never serve each other's stories.
+        """
+        if self.cache is None or self.story_cache_ttl <= 0:
+            return None
+        preferences_hash = FrozenChildPreferences.from_mutable(preferences).stable_hash()
+        place = self.weather_tool.resolve_city(self.city)
+        city_id = place.id if place is not None else ' '.join((self.city or '').lower().split())
+        time_info = context.time_info
+        return (f"story:{preferences_hash}:{city_id}:{self.timezone or 'local'}:"
+                f"{time_info.date}:{time_info.time_of_day}:{context.weather.condition}")
+    
+    def _cached_story(self, key: Optional[str]) -> Optional[str]:
+        """Look up a cached story; a cache failure counts as a miss."""
+        if key is None:
+            return None
+        try:
+            data = self.cache.get_counted(key)
+            return self._story_codec().decompress(data) if data is not None else None
+        except Exception as e:
+            print(f"Story cache error: {e}")
+            return None
+    
+    def _cache_story(self, key: Optional[str], story: str):
+        """Share a newly generated story with other workers; never fails the request."""
+        if key is None:
+            return
+        try:
+            self.cache.set_counted(key, self._story_codec().compress(story), ttl=self.story_cache_ttl)
+        except Exception as e:
+            print(f"Story cache error: {e}")
+    
+    @staticmethod
+    def _story_codec():
+        """Dictionary codec for cached stories (the same in every process, so workers can share them)."""
+        # Imported here so importing this module does not load the storage package
+        from .storage import StoryCodec
+        return StoryCodec.default()
+    
+    def _archive_story(self, story: str, context: StoryContext, deferred: Optional[DeferredActions] = None):
+        """Record a finished story in the archive for this generator's owner; never fails the request."""
+        if self.archive is None:
+            return
+        if deferred is not None:
+            deferred.add(lambda: self._archive_story(story, context))
+            return
+        try:
+            self.archive.add(story, context, owner=self.owner)
+        except Exception as e:
+            print(f"Story archive error: {e}")
+    
+    def _run_llm(self, prompt: BuiltPrompt, report: Optional[Callable[..., None]] = None,
+                 on_text: Optional[Callable[[str], None]] = None, stage: Optional[str] = None) -> str:
+        """
+        Send a built prompt to the language model, through the dispatcher if one is set.
+        Args:
+            prompt (BuiltPrompt): The prompt and its output token limit.
+            report (Optional[Callable[..., None]]): Progress callback for queue position updates.
+            on_text (Optional[Callable[[str], None]]): Called with the usable text so far as it streams in.
+            stage (Optional[str]): Stage reported once the request starts (default WRITING_STAGE).
+        Returns:
+            str: The raw model response.
+        """
+        if self.dispatcher is None:
+            return self._call_llm(prompt, on_text)
+        stage = stage or self.WRITING_STAGE
+        
+        def on_wait(position: int, seconds: float):
+            if report is None:
+                return
+            if position > 0:
+                report(f"Waiting for a storyteller ({position} ahead, about {seconds:.0f}s)")
+            else:
+                report(stage)
+        
+        def admitted() -> str:
+            # A job cancelled while it was queued stops here instead of spending the request
+            if report is not None:
+                report(stage)
+            return self._call_llm(prompt, on_text)
+        
+        return self.dispatcher.run(
+            admitted,
+            tenant=self.tenant,
+            priority=self.priority,
+            on_wait=on_wait
+        )
+    
+    def _call_llm(self, prompt: BuiltPrompt, on_text: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Generate a completion, reading it through a DegenerationDetector.
+        Reading stops at a stop sequence, at the story length's paragraph cap, or as
+        soon as the text starts looping; a looping completion with too little usable
+        text is retried, then reported as an error (which leads to the fallback story).
+        Args:
+            prompt (BuiltPrompt): The prompt, its output token limit and stop rules.
+            on_text (Optional[Callable[[str], None]]): Called with the usable text after each chunk.
+                If it raises (e.g. JobCancelledError), the stream is closed and the error propagates.
+        Returns:
+            str: The usable model response.
+        Raises:
+            DegenerateOutputError: If every attempt degenerated.
+        """
+        for attempt in range(self.DEGENERATION_RETRIES + 1):
+            detector = DegenerationDetector.for_prompt(prompt)
+            response = detector.feed_all(self._watched_stream(prompt, detector, on_text))
+            if not detector.degenerate or detector.word_count() >= prompt.min_words:
+                return response
+            self.degeneration_aborts += 1
+            print(f"Degenerate model output ({detector.reason}) after {len(detector.text)} characters, "
+                  f"attempt {attempt + 1} of {self.DEGENERATION_RETRIES + 1}")
+        raise DegenerateOutputError(f"Model output degenerated ({detector.reason})")
+    
+    def _watched_stream(self, prompt: BuiltPrompt, detector: DegenerationDetector,
+                        on_text: Optional[Callable[[str], None]]) -> Iterator[str]:
+        """Stream the response, passing the detector's usable text to on_text after each chunk."""
+        with contextlib.closing(self._stream_llm(prompt)) as chunks:
+            for chunk in chunks:
+                yield chunk
+                # The detector has taken the chunk by the time the next one is requested
+                if on_text is not None:
+                    on_text(detector.result())
+    
+    def _stream_llm(self, prompt: BuiltPrompt) -> Iterator[str]:
+        """
+        Stream the model's response, through the cassette when one is set.
+        Args:
+            prompt (BuiltPrompt): The prompt and its output token limit.
+        Yields:
+            str: Pieces of the raw model response.
+        """
+        if self.cassette is None:
+            yield from self._stream_backend(prompt)
+            return
+        request = {'prompt': prompt.text, 'max_output_tokens': prompt.max_output_tokens, 'stop': list(prompt.stop)}
+        yield from self.cassette.stream('llm', request, lambda: self._stream_backend(prompt))
+    
+    def _stream_backend(self, prompt: BuiltPrompt) -> Iterator[str]:
+        """
+        Call the configured backend: the batch scheduler, the local prefix-cached
+        backend (streamed when it supports it), or the Hugging Face agent.
+        Args:
+            prompt (BuiltPrompt): The prompt and its output token limit.
+        Yields:
+            str: Pieces of the raw model response.
+        """
+        if self.scheduler is not None:
+            # Wait for this prompt's share of a batched generation
+            yield self.scheduler.generate(prompt.text, max_new_tokens=prompt.max_output_tokens, stop=prompt.stop)
+            return
+        
+        if self.prefix_cache is not None:
+            # Local backend: only the per-child suffix needs to be processed
+            yield from self.prefix_cache.stream(
+                prompt.prefix, prompt.suffix, max_new_tokens=prompt.max_output_tokens, stop=list(prompt.stop)
+            )
+            return
+        
+        # Only generate as many new tokens as this story length needs; the agent does not
+        # stream, so its response is checked once it is complete
+        yield self._agent_for(prompt.max_output_tokens).run(prompt.text)
     
     def _generate_fallback_story(self, context: StoryContext) -> str:
         """
@@ -155,13 +586,18 @@ class StoryGenerator:
     def get_story_context(self, preferences: ChildPreferences) -> StoryContext:
         """
         Gather all context information (weather, time, fact) for a given set of preferences.
+        Weather and time are for this generator's city and timezone; with a context
+        provider, they come from its latest snapshot.
         Args:
             preferences (ChildPreferences): The child's preferences and story settings.
         Returns:
             StoryContext: The complete context for story generation.
         """
-        weather_info = self.weather_tool.get_weather()
-        time_info = self.time_tool.get_time_info()
+        if self.context_provider is not None:
+            return self.context_provider.context_for(preferences, self.city, self.timezone)
+        
+        weather_info = self.weather_tool.get_weather(self.city)
+        time_info = self.time_tool.get_time_info(self.timezone)
         educational_fact = self.search_tool.search_facts(
             random.choice(preferences.interests)
         )
@@ -5,5 +5,6 @@ Tools package for the Bedtime Story Generator.
 from .weather_tool import WeatherTool
 from .time_tool import TimeTool
 from .search_tool import SearchTool
+from .gazetteer import City, CityGazetteer
 
-__all__ = ['WeatherTool', 'TimeTool', 'SearchTool'] 
\ No newline at end of file
+__all__ = ['WeatherTool', 'TimeTool', 'SearchTool', 'City', 'CityGazetteer'] 
\ No newline at end of file
@@ -0,0 +1,228 @@
+"""
+Offline city gazetteer for canonicalizing weather lookups.
+"""
+
+import bisect
+import difflib
+import re
+import threading
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# One city known to the gazetteer.
+@dataclass(frozen=True)
+class City:
+    """Data class to store a canonical city."""
+    id: str                          # Canonical ID, e.g. 'bengaluru-in' (used for caching and lookups)
+    name: str                        # Display name, e.g. 'Bengaluru'
+    country: str                     # ISO 3166 country code, e.g. 'IN' ('' if not known)
+    timezone: str                    # IANA timezone, e.g. 'Asia/Kolkata' ('' if not known)
+    aliases: Tuple[str, ...] = ()    # Other accepted names, e.g. ('Bangalore',)
+
+    @property
+    def known(self) -> bool:
+        """Whether the city is in the gazetteer (not just a place name passed on as typed)."""
+        return not self.id.startswith(CityGazetteer.UNLISTED_PREFIX)
+
+    @property
+    def query(self) -> str:
+        """The 'Name,CC' form the weather API resolves unambiguously (the name as typed if unlisted)."""
+        return f"{self.name},{self.country}" if self.country else self.name
+
+class CityGazetteer:
+    """
+    Resolve what a user typed as a city to one canonical City, without the network.
+
+    'Bangalore', ' bengaluru ', 'BENGALURU, India' and 'Bengaluru,IN' all resolve
+    to bengaluru-in, so they share one cached weather lookup. Matching ignores
+    case, accents and punctuation; a trailing ', <country>' picks between cities
+    with the same name; small misspellings ('Bengaluruu') are corrected when one
+    close match stands out. Anything else resolves to None.
+
+    The bundled list only has major cities. For callers that opt in to other
+    places (see WeatherTool's unlisted_cities), place() passes any other
+    plausible name on, keyed by its normalized text and country ('Hobbiton, NZ'
+    and 'hobbiton, New Zealand' share a key), and leaves it to the weather API to
+    decide. Input that cannot be a place name (too short, no letters, very long)
+    or whose qualifier is not a known country is rejected without a lookup.
+    """
+
+    # Similarity (difflib ratio) a misspelling needs to be corrected
+    FUZZY_CUTOFF = 0.85
+    # Inputs shorter than this are only matched exactly (too many near neighbours)
+    MIN_FUZZY_LENGTH = 4
+    MAX_MEMO = 4096
+    # IDs of places not in the gazetteer start with this
+    UNLISTED_PREFIX = "unlisted:"
+    # Longer input is not a place name (the longest real ones are under 90 characters)
+    MAX_NAME_LENGTH = 100
+    # Shorter unlisted names are not looked up (too likely to be typos or junk)
+    MIN_UNLISTED_LENGTH = 3
+
+    _default_instance = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, cities: Iterable[City], countries: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Args:
+            cities (Iterable[City]): Known cities; where names collide, the first one wins unqualified lookups.
+            countries (Optional[Dict[str, Iterable[str]]]): Country code -> names accepted as a qualifier.
+        """
+        self.cities: Dict[str, City] = {}
+        # Normalized name or alias -> IDs of the cities using it (first is the default)
+        self._index: Dict[str, List[str]] = {}
+        self._countries: Dict[str, str] = {}
+
+        for city in cities:
+            self.cities[city.id] = city
+            for name in (city.name, city.id, *city.aliases):
+                ids = self._index.setdefault(self.normalize(name), [])
+                if city.id not in ids:
+                    ids.append(city.id)
+        for code, names in (countries or {}).items():
+            self._countries[code.lower()] = code
+            for name in names:
+                self._countries[self.normalize(name)] = code
+
+        self._keys = sorted(self._index)
+        self._lock = threading.Lock()
+        self._memo: Dict[str, Optional[str]] = {}
+
+    @classmethod
+    def default(cls) -> 'CityGazetteer':
+        """The process-wide gazetteer built from the bundled city data, created on first use."""
+        with cls._default_lock:
+            if cls._default_instance is None:
+                # Imported here so loading the tools package does not build the index
+                from .gazetteer_data import CITIES, COUNTRIES
+                cls._default_instance = cls(
+                    (City(id=city_id, name=name, country=country, timezone=timezone, aliases=tuple(aliases))
+                     for city_id, name, country, timezone, aliases in CITIES),
+                    COUNTRIES
+                )
+            return cls._default_instance
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lowercase, strip accents and punctuation, and collapse spaces."""
+        decomposed = unicodedata.normalize('NFKD', text)
+        stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+        return ' '.join(re.sub(r"[^\w\s]", ' ', stripped.lower()).split())
+
+    def resolve(self, text: Optional[str]) -> Optional[City]:
+        """
+        Find the city a user meant.
+        Args:
+            text (Optional[str]): City as typed, optionally followed by ', <country>'.
+        Returns:
+            Optional[City]: The canonical city, or None if it cannot be resolved.
+        """
+        if not text or not text.strip():
+            return None
+        with self._lock:
+            if text in self._memo:
+                city_id = self._memo[text]
+                return self.cities[city_id] if city_id is not None else None
+
+        city_id = self._resolve_id(text)
+        with self._lock:
+            if len(self._memo) >= self.MAX_MEMO:
+                self._memo.clear()
+            self._memo[text] = city_id
+        return self.cities[city_id] if city_id is not None else None
+
+    def _resolve_id(self, text: str) -> Optional[str]:
+        """Resolve uncached input: exact name, then name plus country qualifier, then misspellings."""
+        whole = self.normalize(text)
+        if whole in self._index:
+            return self._index[whole][0]
+
+        name, country = whole, None
+        if ',' in text:
+            head, _, tail = text.rpartition(',')
+            country = self._countries.get(self.normalize(tail))
+            if country is None:
+                # 'Springfield, Narnia': a qualifier we cannot check is not guessed past
+                return None
+            name = self.normalize(head)
+
+        candidates = self._index.get(name)
+        if candidates is None and len(name) >= self.MIN_FUZZY_LENGTH:
+            close = difflib.get_close_matches(name, self._keys, n=2, cutoff=self.FUZZY_CUTOFF)
+            # Only correct when the best match is clearly the intended one
+            if close and (len(close) == 1 or set(self._index[close[0]]) == set(self._index[close[1]])):
+                candidates = self._index[close[0]]
+        if not candidates:
+            return None
+        if country is None:
+            return candidates[0]
+        for city_id in candidates:
+            if self.cities[city_id].country == country:
+                return city_id
+        return None
+
+    def place(self, text: Optional[str]) -> Optional[City]:
+        """
+        Find the city a user meant, or pass a name the gazetteer does not list on to the weather API.
+        Args:
+            text (Optional[str]): City as typed, optionally followed by ', <country>'.
+        Returns:
+            Optional[City]: The canonical city; for other plausible names, an unlisted City whose ID
+                is the normalized name and country; None for input that cannot be a place, or whose
+                qualifier is not a known country ('Bengaluru, Narnia').
+        """
+        city = self.resolve(text)
+        if city is not None:
+            return city
+        if not self.is_plausible(text):
+            return None
+        head, country = text, ''
+        if ',' in text:
+            head, _, tail = text.rpartition(',')
+            country = self._countries.get(self.normalize(tail))
+            if country is None:
+                return None
+        name = ' '.join(head.split())
+        normalized = self.normalize(name)
+        if len(normalized) < self.MIN_UNLISTED_LENGTH or not any(char.isalpha() for char in normalized):
+            return None
+        city_id = self.UNLISTED_PREFIX + normalized + (f"-{country.lower()}" if country else '')
+        return City(id=city_id, name=name, country=country, timezone='')
+
+    @classmethod
+    def is_plausible(cls, text: Optional[str]) -> bool:
+        """Whether text could be a place name: it has letters and is not absurdly long."""
+        if not text or len(text) > cls.MAX_NAME_LENGTH:
+            return False
+        normalized = cls.normalize(text)
+        return any(char.isalpha() for char in normalized)
+
+    def suggest(self, prefix: str, limit: int = 5) -> List[City]:
+        """
+        Cities whose name or alias starts with prefix (for autocompletion and error messages).
+        Args:
+            prefix (str): What the user has typed so far.
+            limit (int): Maximum number of cities.
+        Returns:
+            List[City]: Matching cities in alphabetical order of the matched name.
+        """
+        prefix = self.normalize(prefix)
+        if not prefix:
+            return []
+        matches: List[City] = []
+        start = bisect.bisect_left(self._keys, prefix)
+        for key in self._keys[start:]:
+            if not key.startswith(prefix) or len(matches) >= limit:
+                break
+            for city_id in self._index[key]:
+                city = self.cities[city_id]
+                if city not in matches and len(matches) < limit:
+                    matches.append(city)
+        return matches
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    def __contains__(self, text: str) -> bool:
+        return self.resolve(text) is not None
@@ -0,0 +1,262 @@
+"""
+Bundled city data for the offline gazetteer (see CityGazetteer).
+
+Each city is (id, name, country code, IANA timezone, aliases). The id is the
+canonical key used for weather lookups and caching; aliases cover former
+names, local spellings and common abbreviations. Where a name is shared, the
+more populous city is listed first and wins unqualified lookups.
+"""
+
+# Country code -> names accepted after a comma ("Bengaluru, India")
+COUNTRIES = {
+    'AE': ('united arab emirates', 'uae'),
+    'AR': ('argentina',),
+    'AT': ('austria',),
+    'AU': ('australia',),
+    'BD': ('bangladesh',),
+    'BE': ('belgium',),
+    'BR': ('brazil',),
+    'CA': ('canada',),
+    'CH': ('switzerland',),
+    'CL': ('chile',),
+    'CN': ('china',),
+    'CO': ('colombia',),
+    'CZ': ('czech republic', 'czechia'),
+    'DE': ('germany',),
+    'DK': ('denmark',),
+    'EG': ('egypt',),
+    'ES': ('spain',),
+    'ET': ('ethiopia',),
+    'FI': ('finland',),
+    'FR': ('france',),
+    'GB': ('united kingdom', 'uk', 'great britain', 'britain', 'england', 'scotland', 'wales'),
+    'GH': ('ghana',),
+    'GR': ('greece',),
+    'HK': ('hong kong',),
+    'HU': ('hungary',),
+    'ID': ('indonesia',),
+    'IE': ('ireland',),
+    'IL': ('israel',),
+    'IN': ('india', 'bharat'),
+    'IR': ('iran',),
+    'IT': ('italy',),
+    'JP': ('japan',),
+    'KE': ('kenya',),
+    'KR': ('south korea', 'korea'),
+    'LK': ('sri lanka',),
+    'MA': ('morocco',),
+    'MX': ('mexico',),
+    'MY': ('malaysia',),
+    'NG': ('nigeria',),
+    'NL': ('netherlands', 'holland'),
+    'NO': ('norway',),
+    'NP': ('nepal',),
+    'NZ': ('new zealand',),
+    'PE': ('peru',),
+    'PH': ('philippines',),
+    'PK': ('pakistan',),
+    'PL': ('poland',),
+    'PT': ('portugal',),
+    'QA': ('qatar',),
+    'RU': ('russia',),
+    'SA': ('saudi arabia',),
+    'SE': ('sweden',),
+    'SG': ('singapore',),
+    'TH': ('thailand',),
+    'TR': ('turkey', 'turkiye'),
+    'TW': ('taiwan',),
+    'TZ': ('tanzania',),
+    'UA': ('ukraine',),
+    'US': ('united states', 'usa', 'us', 'america', 'united states of america'),
+    'VN': ('vietnam', 'viet nam'),
+    'ZA': ('south africa',),
+}
+
+CITIES = (
+    # India
+    ('bengaluru-in', 'Bengaluru', 'IN', 'Asia/Kolkata', ('Bangalore', 'Bengalooru', 'Blr')),
+    ('mumbai-in', 'Mumbai', 'IN', 'Asia/Kolkata', ('Bombay',)),
+    ('delhi-in', 'Delhi', 'IN', 'Asia/Kolkata', ('New Delhi', 'NCR')),
+    ('chennai-in', 'Chennai', 'IN', 'Asia/Kolkata', ('Madras',)),
+    ('kolkata-in', 'Kolkata', 'IN', 'Asia/Kolkata', ('Calcutta',)),
+    ('hyderabad-in', 'Hyderabad', 'IN', 'Asia/Kolkata', ('Secunderabad', 'Hyd')),
+    ('pune-in', 'Pune', 'IN', 'Asia/Kolkata', ('Poona',)),
+    ('ahmedabad-in', 'Ahmedabad', 'IN', 'Asia/Kolkata', ('Amdavad',)),
+    ('jaipur-in', 'Jaipur', 'IN', 'Asia/Kolkata', ('Pink City',)),
+    ('lucknow-in', 'Lucknow', 'IN', 'Asia/Kolkata', ()),
+    ('kochi-in', 'Kochi', 'IN', 'Asia/Kolkata', ('Cochin', 'Ernakulam')),
+    ('thiruvananthapuram-in', 'Thiruvananthapuram', 'IN', 'Asia/Kolkata', ('Trivandrum',)),
+    ('mysuru-in', 'Mysuru', 'IN', 'Asia/Kolkata', ('Mysore',)),
+    ('mangaluru-in', 'Mangaluru', 'IN', 'Asia/Kolkata', ('Mangalore',)),
+    ('gurugram-in', 'Gurugram', 'IN', 'Asia/Kolkata', ('Gurgaon',)),
+    ('noida-in', 'Noida', 'IN', 'Asia/Kolkata', ()),
+    ('chandigarh-in', 'Chandigarh', 'IN', 'Asia/Kolkata', ()),
+    ('kanpur-in', 'Kanpur', 'IN', 'Asia/Kolkata', ('Cawnpore',)),
+    ('nagpur-in', 'Nagpur', 'IN', 'Asia/Kolkata', ()),
+    ('indore-in', 'Indore', 'IN', 'Asia/Kolkata', ()),
+    ('bhopal-in', 'Bhopal', 'IN', 'Asia/Kolkata', ()),
+    ('patna-in', 'Patna', 'IN', 'Asia/Kolkata', ()),
+    ('vadodara-in', 'Vadodara', 'IN', 'Asia/Kolkata', ('Baroda',)),
+    ('surat-in', 'Surat', 'IN', 'Asia/Kolkata', ()),
+    ('coimbatore-in', 'Coimbatore', 'IN', 'Asia/Kolkata', ('Kovai',)),
+    ('madurai-in', 'Madurai', 'IN', 'Asia/Kolkata', ()),
+    ('visakhapatnam-in', 'Visakhapatnam', 'IN', 'Asia/Kolkata', ('Vizag', 'Vishakhapatnam')),
+    ('vijayawada-in', 'Vijayawada', 'IN', 'Asia/Kolkata', ('Bezawada',)),
+    ('bhubaneswar-in', 'Bhubaneswar', 'IN', 'Asia/Kolkata', ()),
+    ('guwahati-in', 'Guwahati', 'IN', 'Asia/Kolkata', ('Gauhati',)),
+    ('varanasi-in', 'Varanasi', 'IN', 'Asia/Kolkata', ('Banaras', 'Benares', 'Kashi')),
+    ('amritsar-in', 'Amritsar', 'IN', 'Asia/Kolkata', ()),
+    ('dehradun-in', 'Dehradun', 'IN', 'Asia/Kolkata', ('Dehra Dun',)),
+    ('panaji-in', 'Panaji', 'IN', 'Asia/Kolkata', ('Panjim', 'Goa')),
+    ('puducherry-in', 'Puducherry', 'IN', 'Asia/Kolkata', ('Pondicherry', 'Pondy')),
+    ('shimla-in', 'Shimla', 'IN', 'Asia/Kolkata', ('Simla',)),
+    ('srinagar-in', 'Srinagar', 'IN', 'Asia/Kolkata', ()),
+    ('hubballi-in', 'Hubballi', 'IN', 'Asia/Kolkata', ('Hubli',)),
+    ('belagavi-in', 'Belagavi', 'IN', 'Asia/Kolkata', ('Belgaum',)),
+    ('tiruchirappalli-in', 'Tiruchirappalli', 'IN', 'Asia/Kolkata', ('Trichy', 'Tiruchi')),
+
+    # Rest of Asia
+    ('karachi-pk', 'Karachi', 'PK', 'Asia/Karachi', ()),
+    ('lahore-pk', 'Lahore', 'PK', 'Asia/Karachi', ()),
+    ('islamabad-pk', 'Islamabad', 'PK', 'Asia/Karachi', ()),
+    ('hyderabad-pk', 'Hyderabad', 'PK', 'Asia/Karachi', ()),
+    ('dhaka-bd', 'Dhaka', 'BD', 'Asia/Dhaka', ('Dacca',)),
+    ('colombo-lk', 'Colombo', 'LK', 'Asia/Colombo', ()),
+    ('kathmandu-np', 'Kathmandu', 'NP', 'Asia/Kathmandu', ()),
+    ('dubai-ae', 'Dubai', 'AE', 'Asia/Dubai', ()),
+    ('abu-dhabi-ae', 'Abu Dhabi', 'AE', 'Asia/Dubai', ()),
+    ('doha-qa', 'Doha', 'QA', 'Asia/Qatar', ()),
+    ('riyadh-sa', 'Riyadh', 'SA', 'Asia/Riyadh', ()),
+    ('tehran-ir', 'Tehran', 'IR', 'Asia/Tehran', ('Teheran',)),
+    ('tel-aviv-il', 'Tel Aviv', 'IL', 'Asia/Jerusalem', ('Tel Aviv-Yafo',)),
+    ('jerusalem-il', 'Jerusalem', 'IL', 'Asia/Jerusalem', ()),
+    ('istanbul-tr', 'Istanbul', 'TR', 'Europe/Istanbul', ('Constantinople',)),
+    ('ankara-tr', 'Ankara', 'TR', 'Europe/Istanbul', ()),
+    ('singapore-sg', 'Singapore', 'SG', 'Asia/Singapore', ()),
+    ('kuala-lumpur-my', 'Kuala Lumpur', 'MY', 'Asia/Kuala_Lumpur', ('KL',)),
+    ('bangkok-th', 'Bangkok', 'TH', 'Asia/Bangkok', ('Krung Thep',)),
+    ('jakarta-id', 'Jakarta', 'ID', 'Asia/Jakarta', ('Djakarta',)),
+    ('manila-ph', 'Manila', 'PH', 'Asia/Manila', ()),
+    ('ho-chi-minh-city-vn', 'Ho Chi Minh City', 'VN', 'Asia/Ho_Chi_Minh', ('Saigon', 'HCMC')),
+    ('hanoi-vn', 'Hanoi', 'VN', 'Asia/Ho_Chi_Minh', ('Ha Noi',)),
+    ('hong-kong-hk', 'Hong Kong', 'HK', 'Asia/Hong_Kong', ('HK',)),
+    ('taipei-tw', 'Taipei', 'TW', 'Asia/Taipei', ()),
+    ('beijing-cn', 'Beijing', 'CN', 'Asia/Shanghai', ('Peking',)),
+    ('shanghai-cn', 'Shanghai', 'CN', 'Asia/Shanghai', ()),
+    ('guangzhou-cn', 'Guangzhou', 'CN', 'Asia/Shanghai', ('Canton',)),
+    ('shenzhen-cn', 'Shenzhen', 'CN', 'Asia/Shanghai', ()),
+    ('chengdu-cn', 'Chengdu', 'CN', 'Asia/Shanghai', ()),
+    ('seoul-kr', 'Seoul', 'KR', 'Asia/Seoul', ()),
+    ('busan-kr', 'Busan', 'KR', 'Asia/Seoul', ('Pusan',)),
+    ('tokyo-jp', 'Tokyo', 'JP', 'Asia/Tokyo', ()),
+    ('osaka-jp', 'Osaka', 'JP', 'Asia/Tokyo', ()),
+    ('kyoto-jp', 'Kyoto', 'JP', 'Asia/Tokyo', ()),
+    ('sapporo-jp', 'Sapporo', 'JP', 'Asia/Tokyo', ()),
+
+    # Europe
+    ('london-gb', 'London', 'GB', 'Europe/London', ()),
+    ('manchester-gb', 'Manchester', 'GB', 'Europe/London', ()),
+    ('birmingham-gb', 'Birmingham', 'GB', 'Europe/London', ()),
+    ('edinburgh-gb', 'Edinburgh', 'GB', 'Europe/London', ()),
+    ('glasgow-gb', 'Glasgow', 'GB', 'Europe/London', ()),
+    ('cardiff-gb', 'Cardiff', 'GB', 'Europe/London', ()),
+    ('dublin-ie', 'Dublin', 'IE', 'Europe/Dublin', ()),
+    ('paris-fr', 'Paris', 'FR', 'Europe/Paris', ()),
+    ('lyon-fr', 'Lyon', 'FR', 'Europe/Paris', ('Lyons',)),
+    ('marseille-fr', 'Marseille', 'FR', 'Europe/Paris', ('Marseilles',)),
+    ('brussels-be', 'Brussels', 'BE', 'Europe/Brussels', ('Bruxelles', 'Brussel')),
+    ('amsterdam-nl', 'Amsterdam', 'NL', 'Europe/Amsterdam', ()),
+    ('rotterdam-nl', 'Rotterdam', 'NL', 'Europe/Amsterdam', ()),
+    ('berlin-de', 'Berlin', 'DE', 'Europe/Berlin', ()),
+    ('hamburg-de', 'Hamburg', 'DE', 'Europe/Berlin', ()),
+    ('munich-de', 'Munich', 'DE', 'Europe/Berlin', ('München', 'Muenchen')),
+    ('cologne-de', 'Cologne', 'DE', 'Europe/Berlin', ('Köln', 'Koeln')),
+    ('frankfurt-de', 'Frankfurt', 'DE', 'Europe/Berlin', ('Frankfurt am Main',)),
+    ('zurich-ch', 'Zurich', 'CH', 'Europe/Zurich', ('Zürich',)),
+    ('geneva-ch', 'Geneva', 'CH', 'Europe/Zurich', ('Genève', 'Genf')),
+    ('vienna-at', 'Vienna', 'AT', 'Europe/Vienna', ('Wien',)),
+    ('prague-cz', 'Prague', 'CZ', 'Europe/Prague', ('Praha',)),
+    ('warsaw-pl', 'Warsaw', 'PL', 'Europe/Warsaw', ('Warszawa',)),
+    ('krakow-pl', 'Krakow', 'PL', 'Europe/Warsaw', ('Kraków', 'Cracow')),
+    ('budapest-hu', 'Budapest', 'HU', 'Europe/Budapest', ()),
+    ('copenhagen-dk', 'Copenhagen', 'DK', 'Europe/Copenhagen', ('København',)),
+    ('stockholm-se', 'Stockholm', 'SE', 'Europe/Stockholm', ()),
+    ('oslo-no', 'Oslo', 'NO', 'Europe/Oslo', ()),
+    ('helsinki-fi', 'Helsinki', 'FI', 'Europe/Helsinki', ('Helsingfors',)),
+    ('madrid-es', 'Madrid', 'ES', 'Europe/Madrid', ()),
+    ('barcelona-es', 'Barcelona', 'ES', 'Europe/Madrid', ()),
+    ('seville-es', 'Seville', 'ES', 'Europe/Madrid', ('Sevilla',)),
+    ('lisbon-pt', 'Lisbon', 'PT', 'Europe/Lisbon', ('Lisboa',)),
+    ('porto-pt', 'Porto', 'PT', 'Europe/Lisbon', ('Oporto',)),
+    ('rome-it', 'Rome', 'IT', 'Europe/Rome', ('Roma',)),
+    ('milan-it', 'Milan', 'IT', 'Europe/Rome', ('Milano',)),
+    ('naples-it', 'Naples', 'IT', 'Europe/Rome', ('Napoli',)),
+    ('florence-it', 'Florence', 'IT', 'Europe/Rome', ('Firenze',)),
+    ('venice-it', 'Venice', 'IT', 'Europe/Rome', ('Venezia',)),
+    ('athens-gr', 'Athens', 'GR', 'Europe/Athens', ('Athina',)),
+    ('kyiv-ua', 'Kyiv', 'UA', 'Europe/Kyiv', ('Kiev',)),
+    ('moscow-ru', 'Moscow', 'RU', 'Europe/Moscow', ('Moskva',)),
+    ('saint-petersburg-ru', 'Saint Petersburg', 'RU', 'Europe/Moscow', ('St Petersburg', 'Leningrad')),
+
+    # Africa
+    ('cairo-eg', 'Cairo', 'EG', 'Africa/Cairo', ()),
+    ('lagos-ng', 'Lagos', 'NG', 'Africa/Lagos', ()),
+    ('abuja-ng', 'Abuja', 'NG', 'Africa/Lagos', ()),
+    ('accra-gh', 'Accra', 'GH', 'Africa/Accra', ()),
+    ('nairobi-ke', 'Nairobi', 'KE', 'Africa/Nairobi', ()),
+    ('addis-ababa-et', 'Addis Ababa', 'ET', 'Africa/Addis_Ababa', ()),
+    ('dar-es-salaam-tz', 'Dar es Salaam', 'TZ', 'Africa/Dar_es_Salaam', ()),
+    ('casablanca-ma', 'Casablanca', 'MA', 'Africa/Casablanca', ()),
+    ('johannesburg-za', 'Johannesburg', 'ZA', 'Africa/Johannesburg', ('Joburg', 'Jozi')),
+    ('cape-town-za', 'Cape Town', 'ZA', 'Africa/Johannesburg', ()),
+
+    # Americas
+    ('new-york-us', 'New York', 'US', 'America/New_York', ('New York City', 'NYC', 'NY', 'Manhattan')),
+    ('los-angeles-us', 'Los Angeles', 'US', 'America/Los_Angeles', ('LA',)),
+    ('chicago-us', 'Chicago', 'US', 'America/Chicago', ()),
+    ('houston-us', 'Houston', 'US', 'America/Chicago', ()),
+    ('phoenix-us', 'Phoenix', 'US', 'America/Phoenix', ()),
+    ('philadelphia-us', 'Philadelphia', 'US', 'America/New_York', ('Philly',)),
+    ('san-antonio-us', 'San Antonio', 'US', 'America/Chicago', ()),
+    ('san-diego-us', 'San Diego', 'US', 'America/Los_Angeles', ()),
+    ('dallas-us', 'Dallas', 'US', 'America/Chicago', ()),
+    ('austin-us', 'Austin', 'US', 'America/Chicago', ()),
+    ('san-jose-us', 'San Jose', 'US', 'America/Los_Angeles', ()),
+    ('san-francisco-us', 'San Francisco', 'US', 'America/Los_Angeles', ('SF', 'Frisco')),
+    ('seattle-us', 'Seattle', 'US', 'America/Los_Angeles', ()),
+    ('portland-us', 'Portland', 'US', 'America/Los_Angeles', ()),
+    ('denver-us', 'Denver', 'US', 'America/Denver', ()),
+    ('boston-us', 'Boston', 'US', 'America/New_York', ()),
+    ('washington-us', 'Washington', 'US', 'America/New_York', ('Washington DC', 'Washington D.C.', 'DC')),
+    ('atlanta-us', 'Atlanta', 'US', 'America/New_York', ()),
+    ('miami-us', 'Miami', 'US', 'America/New_York', ()),
+    ('orlando-us', 'Orlando', 'US', 'America/New_York', ()),
+    ('minneapolis-us', 'Minneapolis', 'US', 'America/Chicago', ()),
+    ('detroit-us', 'Detroit', 'US', 'America/Detroit', ()),
+    ('las-vegas-us', 'Las Vegas', 'US', 'America/Los_Angeles', ('Vegas',)),
+    ('honolulu-us', 'Honolulu', 'US', 'Pacific/Honolulu', ()),
+    ('anchorage-us', 'Anchorage', 'US', 'America/Anchorage', ()),
+    ('toronto-ca', 'Toronto', 'CA', 'America/Toronto', ()),
+    ('montreal-ca', 'Montreal', 'CA', 'America/Toronto', ('Montréal',)),
+    ('vancouver-ca', 'Vancouver', 'CA', 'America/Vancouver', ()),
+    ('calgary-ca', 'Calgary', 'CA', 'America/Edmonton', ()),
+    ('ottawa-ca', 'Ottawa', 'CA', 'America/Toronto', ()),
+    ('london-ca', 'London', 'CA', 'America/Toronto', ()),
+    ('mexico-city-mx', 'Mexico City', 'MX', 'America/Mexico_City', ('Ciudad de México', 'CDMX')),
+    ('guadalajara-mx', 'Guadalajara', 'MX', 'America/Mexico_City', ()),
+    ('bogota-co', 'Bogota', 'CO', 'America/Bogota', ('Bogotá',)),
+    ('lima-pe', 'Lima', 'PE', 'America/Lima', ()),
+    ('santiago-cl', 'Santiago', 'CL', 'America/Santiago', ()),
+    ('buenos-aires-ar', 'Buenos Aires', 'AR', 'America/Argentina/Buenos_Aires', ()),
+    ('sao-paulo-br', 'Sao Paulo', 'BR', 'America/Sao_Paulo', ('São Paulo',)),
+    ('rio-de-janeiro-br', 'Rio de Janeiro', 'BR', 'America/Sao_Paulo', ('Rio',)),
+
+    # Oceania
+    ('sydney-au', 'Sydney', 'AU', 'Australia/Sydney', ()),
+    ('melbourne-au', 'Melbourne', 'AU', 'Australia/Melbourne', ()),
+    ('brisbane-au', 'Brisbane', 'AU', 'Australia/Brisbane', ()),
+    ('perth-au', 'Perth', 'AU', 'Australia/Perth', ()),
+    ('adelaide-au', 'Adelaide', 'AU', 'Australia/Adelaide', ()),
+    ('auckland-nz', 'Auckland', 'NZ', 'Pacific/Auckland', ()),
+    ('wellington-nz', 'Wellington', 'NZ', 'Pacific/Auckland', ()),
+)
@@ -3,6 +3,7 @@ Time tool for getting current time and date information.
 """
 
 import datetime
+from typing import Dict, Optional
 from ..models import TimeInfo
 
 class TimeTool:
@@ -11,13 +12,51 @@ class TimeTool:
     Determines the current season, time of day, and whether it's bedtime.
     """
     
-    def get_time_info(self) -> TimeInfo:
+    # Timezone name -> whether it exists (so each unknown name is only warned about once)
+    _checked_timezones: Dict[str, bool] = {}
+    
+    @classmethod
+    def valid_timezone(cls, timezone: Optional[str]) -> Optional[str]:
+        """
+        Check a configured timezone, so a typo does not fail every request.
+        Args:
+            timezone (Optional[str]): IANA timezone such as 'Asia/Kolkata'.
+        Returns:
+            Optional[str]: The timezone if it is known; otherwise None (server local time),
+                after printing a warning.
+        """
+        if not timezone:
+            return None
+        known = cls._checked_timezones.get(timezone)
+        if known is None:
+            # Imported here so loading the tools package stays fast
+            from zoneinfo import ZoneInfo
+            try:
+                ZoneInfo(timezone)
+                known = True
+            except (KeyError, ValueError):
+                # ZoneInfoNotFoundError is a KeyError; malformed names raise ValueError
+                print(f"Unknown timezone {timezone!r}; using the server's local time instead")
+                known = False
+            cls._checked_timezones[timezone] = known
+        return timezone if known else None
+    
+    def get_time_info(self, timezone: Optional[str] = None) -> TimeInfo:
         """
         Get current time, date, season, time of day, and bedtime status.
+        Args:
+            timezone (Optional[str]): IANA timezone such as 'Asia/Kolkata' (default, or if the
+                timezone is unknown: the server's local time).
         Returns:
             TimeInfo: Dataclass with all time-related context for the story.
         """
-        now = datetime.datetime.now()  # Get the current date and time
+        timezone = self.valid_timezone(timezone)
+        if timezone:
+            # Imported here so loading the tools package stays fast
+            from zoneinfo import ZoneInfo
+            now = datetime.datetime.now(ZoneInfo(timezone))
+        else:
+            now = datetime.datetime.now()  # Get the current date and time
         
         # Determine the current season based on the month
         month = now.month
@@ -2,53 +2,225 @@
 Weather tool for getting current weather information.
 """
 
-import requests
-from typing import Dict
+import threading
+import time
+from dataclasses import asdict
+from typing import Dict, Optional
 from ..models import WeatherInfo
+from .gazetteer import City, CityGazetteer
+
+class CityNotFoundError(RuntimeError):
+    """Raised when the weather API does not know a city."""
 
 class WeatherTool:
     """
     Tool to get current weather information for story context.
     Fetches weather data from OpenWeatherMap API, or provides fallback data if the API fails.
+    With a cache backend, each city is fetched once per cache_ttl and shared by
+    everything using that cache (with SQLiteCache, every process on the host).
+    Cities are resolved through an offline gazetteer first, so spellings of the
+    same city share one lookup, and a city it cannot resolve gets the fallback
+    without a network call. With unlisted_cities, places the gazetteer does not
+    list are looked up by their normalized name instead; once the API answers
+    that it does not know one, it is not asked again for NOT_FOUND_TTL.
     """
     
-    def __init__(self):
+    # How long fetched weather stays fresh (seconds)
+    DEFAULT_CACHE_TTL = 600
+    
+    # How long a city the API does not know is answered with the fallback without asking again
+    NOT_FOUND_TTL = 24 * 3600
+    
+    # Used when no city is given
+    DEFAULT_CITY = "Bengaluru"
+    
+    def __init__(self, cache=None, cache_ttl: float = DEFAULT_CACHE_TTL, cassette=None,
+                 gazetteer: Optional[CityGazetteer] = None, unlisted_cities: bool = False):
+        """
+        Args:
+            cache: Optional CacheBackend for successful API responses (fallback data is never cached).
+            cache_ttl (float): Seconds a cached response is used for.
+            cassette: Optional Cassette that records the API's HTTP exchanges, or replays them offline.
+            gazetteer (Optional[CityGazetteer]): Resolves city names (default: the bundled gazetteer).
+            unlisted_cities (bool): Also ask the API about plausible places the gazetteer does not
+                list (see CityGazetteer.place), instead of answering them with the fallback.
+        """
         # API key for OpenWeatherMap (using 'demo' for free access; replace with real key for production)
         self.api_key = "demo"  # Using demo key for free access
         self.base_url = "http://api.openweathermap.org/data/2.5/weather"
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+        self.cassette = cassette
+        self.gazetteer = gazetteer or CityGazetteer.default()
+        self.unlisted_cities = unlisted_cities
+        # City ID -> when the API may be asked about it again (used without a cache backend)
+        self._not_found: Dict[str, float] = {}
+        self._not_found_lock = threading.Lock()
+    
+    @staticmethod
+    def cache_key(city: City) -> str:
+        """Cache key for a resolved city."""
+        return f"weather:{city.id}"
+    
+    @staticmethod
+    def not_found_key(city: City) -> str:
+        """Cache key marking a city the API does not know."""
+        return f"weather-not-found:{city.id}"
     
-    def get_weather(self, city: str = "Bengaluru") -> WeatherInfo:
+    def get_weather(self, city: Optional[str] = None) -> WeatherInfo:
         """
-        Get current weather for a city using the OpenWeatherMap API.
-        If the API call fails, returns fallback weather data.
+        Get current weather for a city using the OpenWeatherMap API (or the cache).
+        If the city is unknown to the gazetteer or the API call fails, returns fallback weather data.
         Args:
-            city (str): The city to get weather for (default: 'Bengaluru').
+            city (Optional[str]): The city to get weather for, e.g. 'Bangalore' or 'London, Canada'
+                (default: DEFAULT_CITY).
         Returns:
             WeatherInfo: Dataclass with weather description, temperature, and condition.
         """
+        weather = self.lookup_weather(city)
+        # Fallback weather data if API call fails or returns an error
+        return weather if weather is not None else self.fallback_weather()
+    
+    def lookup_weather(self, city: Optional[str] = None) -> Optional[WeatherInfo]:
+        """
+        Get current weather like get_weather, but without the fallback.
+        Args:
+            city (Optional[str]): The city to get weather for (default: DEFAULT_CITY).
+        Returns:
+            Optional[WeatherInfo]: The weather, or None if the city is unknown or the API call failed.
+        """
+        city = city or self.DEFAULT_CITY
+        resolved = self.resolve_city(city)
+        if resolved is None:
+            # Not a city we can look up: no API call is made
+            print(f"Weather lookup skipped: unknown city {city!r}")
+            return None
+        return self.weather_for(resolved)
+    
+    def resolve_city(self, city: Optional[str] = None) -> Optional[City]:
+        """
+        The place a city name is looked up as; spellings of one place resolve to the same City.
+        Args:
+            city (Optional[str]): City as typed (default: DEFAULT_CITY).
+        Returns:
+            Optional[City]: The place to pass to weather_for, or None if it cannot be looked up.
+        """
+        city = city or self.DEFAULT_CITY
+        return self.gazetteer.place(city) if self.unlisted_cities else self.gazetteer.resolve(city)
+    
+    def weather_for(self, city: City) -> Optional[WeatherInfo]:
+        """
+        Get current weather for an already resolved place (see resolve_city), without the fallback.
+        Args:
+            city (City): The place to get weather for.
+        Returns:
+            Optional[WeatherInfo]: The weather, or None if the API does not know the place or the call failed.
+        """
+        if self._is_not_found(city):
+            return None
         try:
-            params = {
-                'q': city,
-                'appid': self.api_key,
-                'units': 'metric'
-            }
-            # Make a GET request to the weather API
-            response = requests.get(self.base_url, params=params, timeout=5)
-            if response.status_code == 200:
-                data = response.json()
-                # Parse the API response and return a WeatherInfo object
-                return WeatherInfo(
-                    description=data['weather'][0]['description'],
-                    temperature=data['main']['temp'],
-                    condition=data['weather'][0]['main'].lower()
-                )
+            if self.cache is None:
+                return self._fetch_weather(city)
+            # Concurrent lookups of the same city wait for one API call
+            data = self.cache.get_or_compute_json(
+                self.cache_key(city),
+                lambda: asdict(self._fetch_weather(city)),
+                ttl=self.cache_ttl
+            )
+            return WeatherInfo(**data)
+        except CityNotFoundError:
+            self._remember_not_found(city)
+            suggestions = ', '.join(match.name for match in self.gazetteer.suggest(city.name, limit=3))
+            print(f"Weather lookup failed: unknown city {city.name!r}"
+                  + (f" (did you mean {suggestions}?)" if suggestions else ""))
         except Exception as e:
             # Print the error for debugging if the API call fails
             print(f"Weather API error: {e}")
-        
-        # Fallback weather data if API call fails or returns an error
+        return None
+    
+    def _is_not_found(self, city: City) -> bool:
+        """Whether the API recently answered that it does not know this city."""
+        if self.cache is not None:
+            try:
+                return self.cache.get(self.not_found_key(city)) is not None
+            except Exception as e:
+                print(f"Weather cache error: {e}")
+        with self._not_found_lock:
+            retry_at = self._not_found.get(city.id)
+            if retry_at is not None and retry_at <= time.time():
+                del self._not_found[city.id]
+                retry_at = None
+        return retry_at is not None
+    
+    def _remember_not_found(self, city: City):
+        """Stop asking the API about a city it does not know, for NOT_FOUND_TTL."""
+        if self.cache is not None:
+            try:
+                self.cache.set(self.not_found_key(city), b'1', ttl=self.NOT_FOUND_TTL)
+                return
+            except Exception as e:
+                print(f"Weather cache error: {e}")
+        with self._not_found_lock:
+            self._not_found[city.id] = time.time() + self.NOT_FOUND_TTL
+    
+    @staticmethod
+    def fallback_weather() -> WeatherInfo:
+        """
+        The fixed weather used when no real weather is available (also for offline runs).
+        Returns:
+            WeatherInfo: Mild, clear weather.
+        """
         return WeatherInfo(
             description='Clear sky',
             temperature=20.0,
             condition='lear'  # Typo in fallback, should be 'clear'
-        ) 
\ No newline at end of file
+        )
+    
+    def _fetch_weather(self, city: City) -> WeatherInfo:
+        """
+        Call the OpenWeatherMap API.
+        Args:
+            city (City): The resolved city to get weather for.
+        Returns:
+            WeatherInfo: The current weather.
+        Raises:
+            Exception: If the request fails or the API answers with an error status.
+        """
+        if self.cassette is not None:
+            # Only the city identifies the request (the API key is never recorded)
+            exchange = self.cassette.call('weather', {'city': city.id}, lambda: self._http_get(city.query))
+        else:
+            exchange = self._http_get(city.query)
+        
+        if exchange['status'] == 404:
+            raise CityNotFoundError(f"HTTP 404 for {city.query!r}")
+        if exchange['status'] != 200:
+            raise RuntimeError(f"HTTP {exchange['status']} for {city.query!r}")
+        data = exchange['body']
+        # Parse the API response and return a WeatherInfo object
+        return WeatherInfo(
+            description=data['weather'][0]['description'],
+            temperature=data['main']['temp'],
+            condition=data['weather'][0]['main'].lower()
+        )
+    
+    def _http_get(self, city: str) -> Dict:
+        """
+        Make the API request.
+        Args:
+            city (str): The city to get weather for, as 'Name,CC'.
+        Returns:
+            Dict: The HTTP status and the JSON body (None unless the status is 200).
+        """
+        # Imported here so loading the tools package does not pull in requests
+        import requests
+        
+        params = {
+            'q': city,
+            'appid': self.api_key,
+            'units': 'metric'
+        }
+        # Make a GET request to the weather API
+        response = requests.get(self.base_url, params=params, timeout=5)
+        body = response.json() if response.status_code == 200 else None
+        return {'status': response.status_code, 'body': body}
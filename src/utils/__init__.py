@@ -4,5 +4,10 @@ Utilities package for the Bedtime Story Generator.
 
 from .content_filter import ContentFilter
 from .formatter import StoryFormatter
+from .illustration_matcher import IllustrationMatcher
+from .story_renderer import StoryRenderer
+from .degeneration import DegenerateOutputError, DegenerationDetector
+from .jobs import DeferredActions, JobCancelledError
 
-__all__ = ['ContentFilter', 'StoryFormatter'] 
\ No newline at end of file
+__all__ = ['ContentFilter', 'StoryFormatter', 'IllustrationMatcher', 'StoryRenderer',
+           'DegenerateOutputError', 'DegenerationDetector', 'DeferredActions', 'JobCancelledError'] 
\ No newline at end of file
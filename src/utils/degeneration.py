@@ -0,0 +1,168 @@
+"""
+Streaming stop-sequence, length and degeneration checks for model output.
+"""
+
+import re
+from collections import Counter
+from typing import Iterable, Optional, Tuple
+
+class DegenerateOutputError(Exception):
+    """Raised when the model keeps producing repetitive or looping text."""
+
+class DegenerationDetector:
+    """
+    Watch generated text as it streams in and decide when to stop reading.
+
+    Generation stops early when:
+        - a stop sequence appears (e.g. a chat artifact such as "\\nHuman:");
+        - the text starts more paragraphs than the story length needs;
+        - the text degenerates: the same phrase keeps repeating, one word repeats
+          back-to-back, or recent text uses very few distinct words.
+
+    result() returns the usable text: everything before the stop sequence, extra
+    paragraph or the point where the loop began, trimmed to the last full sentence.
+    """
+
+    # Reasons that mean the output was bad, not merely finished
+    DEGENERATE_REASONS = ('repetition', 'word_run', 'low_diversity')
+
+    _WORD_PATTERN = re.compile(r"\w+(?:'\w+)?")
+    _SENTENCE_END = re.compile(r'[.!?]["\')\]]*(?=\s|$)')
+    _PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+    def __init__(self, stop_sequences: Iterable[str] = (), max_paragraphs: Optional[int] = None,
+                 ngram_size: int = 6, max_ngram_repeats: int = 3, max_word_run: int = 4,
+                 diversity_window: int = 80, min_diversity: float = 0.25):
+        """
+        Args:
+            stop_sequences (Iterable[str]): Text that ends the output where it appears.
+            max_paragraphs (Optional[int]): Stop before the paragraph after this many.
+            ngram_size (int): Phrase length (in words) checked for repetition.
+            max_ngram_repeats (int): Occurrences of one phrase that count as a loop.
+            max_word_run (int): The same word this many times in a row counts as degenerate.
+            diversity_window (int): Number of recent words checked for variety.
+            min_diversity (float): Minimum share of distinct words in that window.
+        """
+        self.stop_sequences = tuple(stop for stop in stop_sequences if stop)
+        self.max_paragraphs = max_paragraphs
+        self.ngram_size = ngram_size
+        self.max_ngram_repeats = max_ngram_repeats
+        self.max_word_run = max_word_run
+        self.diversity_window = diversity_window
+        self.min_diversity = min_diversity
+
+        self.text = ""
+        self.reason: Optional[str] = None     # Why reading stopped (None while still going)
+        self._cut: Optional[int] = None       # Character offset where usable text ends
+        self._longest_stop = max((len(stop) for stop in self.stop_sequences), default=0)
+
+    @classmethod
+    def for_prompt(cls, prompt) -> 'DegenerationDetector':
+        """Create a detector with the stop sequences and paragraph limit of a BuiltPrompt."""
+        return cls(stop_sequences=prompt.stop, max_paragraphs=prompt.max_paragraphs)
+
+    @property
+    def stopped(self) -> bool:
+        return self.reason is not None
+
+    @property
+    def degenerate(self) -> bool:
+        """Whether the output was cut because it degenerated."""
+        return self.reason in self.DEGENERATE_REASONS
+
+    def feed(self, chunk: str) -> bool:
+        """
+        Add newly generated text.
+        Args:
+            chunk (str): The next piece of output.
+        Returns:
+            bool: True once generation should stop.
+        """
+        if self.stopped or not chunk:
+            return self.stopped
+        start = max(len(self.text) - self._longest_stop, 0)
+        self.text += chunk
+
+        checks = (
+            lambda: self._check_stop_sequences(start),
+            self._check_paragraphs,
+            self._check_words
+        )
+        for check in checks:
+            found = check()
+            if found is not None:
+                self.reason, self._cut = found
+                break
+        return self.stopped
+
+    def feed_all(self, chunks: Iterable[str]) -> str:
+        """Feed chunks until told to stop (closing the stream early) and return result()."""
+        for chunk in chunks:
+            if self.feed(chunk):
+                break
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+        return self.result()
+
+    def _check_stop_sequences(self, start: int) -> Optional[Tuple[str, int]]:
+        positions = [self.text.find(stop, start) for stop in self.stop_sequences]
+        positions = [position for position in positions if position >= 0]
+        return ('stop_sequence', min(positions)) if positions else None
+
+    def _check_paragraphs(self) -> Optional[Tuple[str, int]]:
+        if not self.max_paragraphs:
+            return None
+        # A paragraph has started once text follows a blank line
+        breaks = [match for match in self._PARAGRAPH_BREAK.finditer(self.text)
+                  if self.text[match.end():].strip()]
+        if len(breaks) >= self.max_paragraphs:
+            return 'paragraph_limit', breaks[self.max_paragraphs - 1].start()
+        return None
+
+    def _check_words(self) -> Optional[Tuple[str, int]]:
+        # Ignore a word that may still be growing at the end of the stream
+        spans = [(match.group(0).lower(), match.start()) for match in self._WORD_PATTERN.finditer(self.text)]
+        if spans and spans[-1][1] + len(spans[-1][0]) == len(self.text):
+            spans.pop()
+        words = [word for word, _ in spans]
+
+        # The same word back-to-back ("the the the the")
+        run = 1
+        for index in range(1, len(words)):
+            run = run + 1 if words[index] == words[index - 1] else 1
+            if run >= self.max_word_run:
+                return 'word_run', spans[index - run + 2][1]
+
+        # A phrase repeating in a loop; keep its first occurrence
+        seen = Counter()
+        first_repeat = {}
+        for index in range(len(words) - self.ngram_size + 1):
+            gram = tuple(words[index:index + self.ngram_size])
+            seen[gram] += 1
+            if seen[gram] == 2:
+                first_repeat[gram] = spans[index][1]
+            if seen[gram] >= self.max_ngram_repeats:
+                return 'repetition', first_repeat[gram]
+
+        # Very few distinct words recently
+        if len(words) >= self.diversity_window:
+            window = words[-self.diversity_window:]
+            if len(set(window)) / len(window) < self.min_diversity:
+                return 'low_diversity', spans[len(words) - self.diversity_window][1]
+        return None
+
+    def result(self) -> str:
+        """The usable text so far (complete sentences only when the output was cut)."""
+        if self._cut is None:
+            return self.text.strip()
+        text = self.text[:self._cut]
+        if self.degenerate:
+            ends = list(self._SENTENCE_END.finditer(text))
+            if ends:
+                text = text[:ends[-1].end()]
+        return text.strip()
+
+    def word_count(self) -> int:
+        """Words in result()."""
+        return len(self._WORD_PATTERN.findall(self.result()))
@@ -5,9 +5,44 @@ Story formatting utilities for the Bedtime Story Generator.
 import re
 from typing import List
 
+from .illustration_matcher import IllustrationMatcher
+
 class StoryFormatter:
     """Class to format stories for display."""
     
+    # Mapping of keywords (or phrases) to emojis for illustration.
+    # Earlier entries win ties; irregular plurals are listed explicitly.
+    ILLUSTRATIONS = {
+        'unicorn': '\U0001F984',
+        'dragon': '\U0001F409',
+        'fairy': '\U0001F9DA',
+        'fairies': '\U0001F9DA',
+        'princess': '\U0001F451',
+        'star': '\u2B50',
+        'moon': '\U0001F319',
+        'sun': '\u2600\uFE0F',
+        'flower': '\U0001F338',
+        'tree': '\U0001F333',
+        'ocean': '\U0001F30A',
+        'mountain': '\U0001F3D4\uFE0F',
+        'castle': '\U0001F3F0',
+        'rainbow': '\U0001F308',
+        'butterfly': '\U0001F98B',
+        'butterflies': '\U0001F98B',
+        'bird': '\U0001F426',
+        'cat': '\U0001F431',
+        'dog': '\U0001F415',
+        'elephant': '\U0001F418',
+        'lion': '\U0001F981',
+        'tiger': '\U0001F42F'
+    }
+    
+    # Regex to match <p ...>...</p> blocks
+    _PARAGRAPH_PATTERN = re.compile(r'<p([^>]*)>(.*?)</p>', re.DOTALL)
+    
+    # Compiled lazily from ILLUSTRATIONS by get_illustration_matcher()
+    _illustration_matcher = None
+    
     @staticmethod
     def format_story(text: str, child_name: str) -> str:
         """
@@ -75,49 +110,34 @@ class StoryFormatter:
     def add_illustrations(text: str) -> str:
         """
         Add simple emoji illustrations to the story based on keywords.
-        Looks for certain words in each paragraph and prepends a relevant emoji.
+        Scans each paragraph once with the precompiled illustration matcher and
+        prepends the emoji of the best (most frequent whole-word) keyword.
         Args:
             text (str): The HTML-formatted story.
         Returns:
             str: The story with emojis added to relevant paragraphs.
         """
-        import re
-        # Mapping of keywords to emojis for illustration
-        illustrations = {
-            'unicorn': '\U0001F984',
-            'dragon': '\U0001F409',
-            'fairy': '\U0001F9DA',
-            'princess': '\U0001F451',
-            'star': '\u2B50',
-            'moon': '\U0001F319',
-            'sun': '\u2600\uFE0F',
-            'flower': '\U0001F338',
-            'tree': '\U0001F333',
-            'ocean': '\U0001F30A',
-            'mountain': '\U0001F3D4\uFE0F',
-            'castle': '\U0001F3F0',
-            'rainbow': '\U0001F308',
-            'butterfly': '\U0001F98B',
-            'bird': '\U0001F426',
-            'cat': '\U0001F431',
-            'dog': '\U0001F415',
-            'elephant': '\U0001F418',
-            'lion': '\U0001F981',
-            'tiger': '\U0001F42F'
-        }
+        matcher = StoryFormatter.get_illustration_matcher()
 
         def insert_emoji(match):
             paragraph = match.group(2)
-            # For each keyword, if found in the paragraph, prepend the emoji
-            for word, emoji in illustrations.items():
-                if word in paragraph.lower():
-                    return f"<p{match.group(1)}>{emoji} {paragraph}</p>"
+            emoji = matcher.best_match(paragraph)
+            if emoji:
+                return f"<p{match.group(1)}>{emoji} {paragraph}</p>"
             return match.group(0)
 
-        # Regex to match <p ...>...</p> blocks
-        pattern = re.compile(r'<p([^>]*)>(.*?)</p>', re.DOTALL)
-        text = pattern.sub(insert_emoji, text)
-        return text
+        return StoryFormatter._PARAGRAPH_PATTERN.sub(insert_emoji, text)
+    
+    @staticmethod
+    def get_illustration_matcher() -> IllustrationMatcher:
+        """
+        Get the shared illustration matcher, compiling it on first use.
+        Returns:
+            IllustrationMatcher: Matcher built from StoryFormatter.ILLUSTRATIONS.
+        """
+        if StoryFormatter._illustration_matcher is None:
+            StoryFormatter._illustration_matcher = IllustrationMatcher(StoryFormatter.ILLUSTRATIONS)
+        return StoryFormatter._illustration_matcher
     
     @staticmethod
     def create_story_summary(preferences, weather, time_info) -> str:
@@ -0,0 +1,157 @@
+"""
+Keyword-to-illustration matching for the Bedtime Story Generator.
+"""
+
+import re
+from typing import Dict, Iterable, Optional, Tuple
+
+class IllustrationMatcher:
+    """
+    Precompiled, word-boundary aware matcher that maps story text to illustrations.
+    All keywords (single words or multi-word phrases) are folded into one regular
+    expression built from a character trie, so a paragraph is scanned once no matter
+    how many keywords the illustration library holds.
+    """
+
+    # Marker used inside the trie to flag the end of a keyword
+    _END = ''
+
+    def __init__(self, illustrations: Dict[str, str], allow_plurals: bool = True,
+                 plurals: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Build the matcher from a keyword -> illustration mapping.
+        Args:
+            illustrations (Dict[str, str]): Keywords or phrases mapped to an illustration (e.g. an emoji).
+                Earlier entries win ties, so list the most specific keywords first.
+            allow_plurals (bool): Also match each keyword's plural ("star" matches "stars").
+            plurals (Optional[Dict[str, Iterable[str]]]): Plural forms for keywords whose plural is
+                not regular (e.g. {'mouse': ['mice']}); other keywords use plural_forms().
+        """
+        # Normalized keyword -> (illustration, priority); priority follows mapping order
+        self._keywords: Dict[str, Tuple[str, int]] = {}
+        for priority, (keyword, illustration) in enumerate(illustrations.items()):
+            normalized = self._normalize(keyword)
+            if normalized and normalized not in self._keywords:
+                self._keywords[normalized] = (illustration, priority)
+
+        # Every accepted spelling -> the keyword it counts for. Plurals are listed
+        # explicitly, so a stray "s" never turns another word into a match
+        # ("stares" is not "stars")
+        explicit = {self._normalize(keyword): [self._normalize(form) for form in forms]
+                    for keyword, forms in (plurals or {}).items()}
+        self._forms: Dict[str, str] = {keyword: keyword for keyword in self._keywords}
+        if allow_plurals:
+            for keyword in self._keywords:
+                for form in explicit.get(keyword, self.plural_forms(keyword)):
+                    self._forms.setdefault(form, keyword)
+
+        self.allow_plurals = allow_plurals
+        self._pattern = self._compile(self._forms)
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Lowercase a keyword or match and collapse inner whitespace to single spaces."""
+        return ' '.join(text.lower().split())
+
+    @staticmethod
+    def plural_forms(keyword: str) -> Tuple[str, ...]:
+        """
+        Regular English plural of a keyword (of its last word, for phrases).
+        Args:
+            keyword (str): Normalized keyword.
+        Returns:
+            Tuple[str, ...]: The plural spellings to match.
+        """
+        if keyword.endswith(('s', 'x', 'z', 'ch', 'sh')):
+            return (keyword + 'es',)
+        if len(keyword) > 1 and keyword.endswith('y') and keyword[-2] not in 'aeiou':
+            return (keyword[:-1] + 'ies',)
+        return (keyword + 's',)
+
+    @classmethod
+    def _compile(cls, keywords: Iterable[str]) -> Optional['re.Pattern']:
+        """
+        Compile all keywords into a single trie-shaped regular expression.
+        Args:
+            keywords (Iterable[str]): Normalized keywords and their plural forms.
+        Returns:
+            re.Pattern: The compiled pattern, or None if there are no keywords.
+        """
+        trie: Dict[str, dict] = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[cls._END] = {}
+
+        if not trie:
+            return None
+
+        # \b on both sides stops "cat" from matching inside "education"
+        return re.compile(r'\b(' + cls._trie_to_regex(trie) + r')\b', re.IGNORECASE)
+
+    @classmethod
+    def _trie_to_regex(cls, node: Dict[str, dict]) -> str:
+        """
+        Convert a trie node into a regular expression fragment.
+        Shared prefixes become a single branch, so the regex engine never retries
+        thousands of alternatives at each position.
+        """
+        terminal = cls._END in node
+        branches = []
+        for char in sorted(key for key in node if key != cls._END):
+            # Any run of whitespace separates the words of a phrase
+            token = r'\s+' if char == ' ' else re.escape(char)
+            branches.append(token + cls._trie_to_regex(node[char]))
+
+        if not branches:
+            return ''
+
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+
+        body = '(?:' + '|'.join(branches) + ')'
+        return body + '?' if terminal else body
+
+    def match_counts(self, text: str) -> Dict[str, int]:
+        """
+        Count how often each keyword appears in the text, in a single scan.
+        Args:
+            text (str): The text to scan.
+        Returns:
+            Dict[str, int]: Normalized keyword -> number of whole-word occurrences (plurals included).
+        """
+        counts: Dict[str, int] = {}
+        if self._pattern is None:
+            return counts
+
+        for match in self._pattern.finditer(text):
+            keyword = self._forms[self._normalize(match.group(1))]
+            counts[keyword] = counts.get(keyword, 0) + 1
+        return counts
+
+    def best_match(self, text: str) -> Optional[str]:
+        """
+        Find the best illustration for a piece of text.
+        The illustration whose keywords occur most often wins; ties go to the
+        keyword listed first in the library.
+        Args:
+            text (str): The text to scan (e.g. one paragraph).
+        Returns:
+            Optional[str]: The chosen illustration, or None if no keyword matched.
+        """
+        counts = self.match_counts(text)
+        if not counts:
+            return None
+
+        # Several keywords may share one illustration, so score per illustration
+        scores: Dict[str, Tuple[int, int]] = {}
+        for keyword, count in counts.items():
+            illustration, priority = self._keywords[keyword]
+            hits, best_priority = scores.get(illustration, (0, priority))
+            scores[illustration] = (hits + count, min(best_priority, priority))
+
+        return max(scores, key=lambda illustration: (scores[illustration][0], -scores[illustration][1]))
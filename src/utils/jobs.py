@@ -0,0 +1,56 @@
+"""
+Job control shared by the story generator and the background job services.
+"""
+
+import threading
+from typing import Callable, List
+
+class JobCancelledError(Exception):
+    """Raised inside a job function when its job was cancelled while running."""
+
+class DeferredActions:
+    """
+    Side effects of a job that must only happen if its result is used.
+
+    Speculative stories are written before anyone asks for them. Archiving such
+    a story or counting a template reuse is added here instead of done at once:
+    commit() runs everything added so far and anything added later, discard()
+    drops it all. Safe to use from the job's thread and the claiming thread.
+    """
+
+    def __init__(self):
+        self._actions: List[Callable[[], None]] = []
+        self._state = 'pending'
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """pending, committed or discarded."""
+        return self._state
+
+    def add(self, action: Callable[[], None]):
+        """Run an action on commit (right away if already committed; never if discarded)."""
+        with self._lock:
+            if self._state == 'pending':
+                self._actions.append(action)
+                return
+            if self._state == 'discarded':
+                return
+        action()
+
+    def commit(self):
+        """Run the pending actions, and from now on run added actions immediately."""
+        with self._lock:
+            if self._state != 'pending':
+                return
+            self._state = 'committed'
+            actions, self._actions = self._actions, []
+        for action in actions:
+            action()
+
+    def discard(self):
+        """Drop the pending actions and ignore any added later."""
+        with self._lock:
+            if self._state == 'pending':
+                self._state = 'discarded'
+                self._actions = []
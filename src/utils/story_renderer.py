@@ -0,0 +1,162 @@
+"""
+Multi-format story rendering for the Bedtime Story Generator.
+"""
+
+import html
+import re
+from typing import Dict, Optional
+from xml.sax.saxutils import escape as xml_escape
+
+from ..models import StoryDocument
+from .formatter import StoryFormatter
+
+class StoryRenderer:
+    """
+    Render a StoryDocument as HTML, plain text, Markdown or SSML.
+    Each format is rendered the first time it is requested and memoized on the
+    renderer, so keeping the renderer in session state means switching formats
+    or re-running the Streamlit script never repeats the work.
+    """
+
+    FORMATS = ('html', 'text', 'markdown', 'ssml')
+
+    # Styling used for story paragraphs, matching StoryFormatter._add_html_formatting
+    PARAGRAPH_STYLE = 'margin-bottom: 1rem; line-height: 1.8;'
+
+    # Pause between paragraphs when the story is read aloud
+    SSML_PARAGRAPH_BREAK = '700ms'
+
+    # Any leftover markup inside a paragraph
+    _TAG_PATTERN = re.compile(r'<[^>]+>')
+
+    # Characters with special meaning at the start of a Markdown paragraph or inline
+    _MARKDOWN_SPECIAL = re.compile(r'([\\`*_#\[\]|])')
+
+    def __init__(self, document: StoryDocument):
+        """
+        Args:
+            document (StoryDocument): The canonical structured story.
+        """
+        self.document = document
+        self._rendered: Dict[str, str] = {}
+
+    @classmethod
+    def from_html(cls, story_html: str, metadata: Optional[Dict[str, str]] = None) -> 'StoryRenderer':
+        """
+        Build a renderer from the HTML produced by the story pipeline.
+        The HTML is parsed exactly once; the parsed result becomes the canonical story.
+        Args:
+            story_html (str): The formatted, filtered and illustrated story HTML.
+            metadata (Optional[Dict[str, str]]): Extra information such as the title.
+        Returns:
+            StoryRenderer: A renderer whose 'html' output is already cached.
+        """
+        known_illustrations = sorted(set(StoryFormatter.ILLUSTRATIONS.values()), key=len, reverse=True)
+
+        blocks = [match.group(2) for match in StoryFormatter._PARAGRAPH_PATTERN.finditer(story_html)]
+        if not blocks:
+            # Plain text without <p> tags: treat blank lines as paragraph breaks
+            blocks = story_html.split('\n\n')
+
+        paragraphs = []
+        illustrations = []
+        for block in blocks:
+            text = html.unescape(cls._TAG_PATTERN.sub('', block))
+            text = ' '.join(text.split())
+            if not text:
+                continue
+
+            # Split off a leading illustration added by StoryFormatter.add_illustrations
+            illustration = None
+            for emoji in known_illustrations:
+                if text.startswith(emoji + ' '):
+                    illustration = emoji
+                    text = text[len(emoji):].strip()
+                    break
+
+            paragraphs.append(text)
+            illustrations.append(illustration)
+
+        renderer = cls(StoryDocument(
+            paragraphs=paragraphs,
+            illustrations=illustrations,
+            metadata=dict(metadata or {})
+        ))
+        # The pipeline output is already valid HTML for this story, so reuse it as-is
+        renderer._rendered['html'] = story_html
+        return renderer
+
+    def render(self, output_format: str) -> str:
+        """
+        Render the story in the requested format, memoizing the result.
+        Args:
+            output_format (str): One of StoryRenderer.FORMATS.
+        Returns:
+            str: The rendered story.
+        Raises:
+            ValueError: If the format is not supported.
+        """
+        if output_format not in self.FORMATS:
+            raise ValueError(f"Unsupported story format: {output_format}")
+
+        if output_format not in self._rendered:
+            render_function = getattr(self, f'_render_{output_format}')
+            self._rendered[output_format] = render_function()
+        return self._rendered[output_format]
+
+    def is_rendered(self, output_format: str) -> bool:
+        """Check whether a format has already been rendered and cached."""
+        return output_format in self._rendered
+
+    def _paragraph_items(self):
+        """Yield (illustration, paragraph) pairs for the story."""
+        return zip(self.document.illustrations, self.document.paragraphs)
+
+    def _render_html(self) -> str:
+        """Render the story as styled HTML paragraphs."""
+        formatted_paragraphs = []
+        for illustration, paragraph in self._paragraph_items():
+            prefix = f"{illustration} " if illustration else ''
+            formatted_paragraphs.append(
+                f"<p style='{self.PARAGRAPH_STYLE}'>{prefix}{html.escape(paragraph, quote=False)}</p>"
+            )
+        return '\n'.join(formatted_paragraphs)
+
+    def _render_text(self) -> str:
+        """Render the story as plain text, suitable for printing or copying."""
+        parts = []
+        title = self.document.metadata.get('title')
+        if title:
+            parts.append(title)
+        parts.extend(self.document.paragraphs)
+        return '\n\n'.join(parts) + '\n'
+
+    def _render_markdown(self) -> str:
+        """Render the story as Markdown, keeping illustrations as emoji."""
+        parts = []
+        title = self.document.metadata.get('title')
+        if title:
+            parts.append('# ' + self._escape_markdown(title))
+        for illustration, paragraph in self._paragraph_items():
+            prefix = f"{illustration} " if illustration else ''
+            parts.append(prefix + self._escape_markdown(paragraph))
+        return '\n\n'.join(parts) + '\n'
+
+    @classmethod
+    def _escape_markdown(cls, text: str) -> str:
+        """Escape characters that Markdown would otherwise interpret."""
+        return cls._MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+    def _render_ssml(self) -> str:
+        """Render the story as SSML for read-aloud, with calm pacing and paragraph pauses."""
+        parts = ['<speak>', '<prosody rate="slow">']
+        title = self.document.metadata.get('title')
+        if title:
+            parts.append(f'<p>{xml_escape(title)}</p>')
+            parts.append(f'<break time="{self.SSML_PARAGRAPH_BREAK}"/>')
+        for paragraph in self.document.paragraphs:
+            # Illustrations are visual only and are not read aloud
+            parts.append(f'<p>{xml_escape(paragraph)}</p>')
+            parts.append(f'<break time="{self.SSML_PARAGRAPH_BREAK}"/>')
+        parts.extend(['</prosody>', '</speak>'])
+        return '\n'.join(parts)
@@ -2,15 +2,68 @@
 Main application file for the Bedtime Story Generator.
 """
 
+import uuid
+
 import streamlit as st
 from src import StoryGenerator, UIComponents, ChildPreferences
+from src.services import (ContextProvider, GenerationJobExecutor, MemoryMonitor, RequestDispatcher,
+                          SpeculativeGeneration)
+from src.storage import CacheBackend, StoryArchive, StoryCodec, StoryHistory, StoryTemplateCache
+from config import Config
+
+@st.cache_resource
+def get_story_archive() -> StoryArchive:
+    """Story archive shared by all sessions on this server."""
+    return StoryArchive(Config.get_story_archive_path())
+
+@st.cache_resource
+def get_template_cache() -> StoryTemplateCache:
+    """Re-personalizable story cache shared by all sessions on this server."""
+    return StoryTemplateCache(max_reuses=Config.STORY_TEMPLATE_MAX_REUSES)
+
+@st.cache_resource
+def get_shared_cache() -> CacheBackend:
+    """Weather and story cache, shared with the other worker processes on this host."""
+    return CacheBackend.create(Config.get_cache_backend(), Config.get_cache_path())
+
+@st.cache_resource
+def get_context_provider() -> ContextProvider:
+    """Weather and time snapshots kept fresh in the background for all sessions."""
+    from src.tools import WeatherTool
+    return ContextProvider(WeatherTool(cache=get_shared_cache(),
+                                       unlisted_cities=Config.is_unlisted_city_lookup_enabled()))
+
+@st.cache_resource
+def configure_story_codec():
+    """Compress stories with the dictionary shared by all workers, trained on the archive once it has grown."""
+    StoryCodec.configure_default(Config.get_story_dictionary_path(), Config.get_story_archive_path())
+
+@st.cache_resource
+def get_memory_monitor():
+    """Memory instrumentation for this server process, if MEMORY_MONITOR is on (else None)."""
+    if not Config.is_memory_monitor_enabled():
+        return None
+    monitor = MemoryMonitor(
+        interval_seconds=Config.MEMORY_MONITOR_INTERVAL_SECONDS,
+        alert_growth_bytes=Config.MEMORY_ALERT_GROWTH_MB * 2 ** 20,
+        alert_path=Config.MEMORY_ALERT_PATH
+    )
+    # Shared by every session, so not counted in any one session's size
+    from src.tools import CityGazetteer
+    monitor.mark_shared(get_story_archive(), get_template_cache(), get_shared_cache(), get_context_provider(),
+                        RequestDispatcher.shared(), GenerationJobExecutor.shared(), SpeculativeGeneration.shared(),
+                        CityGazetteer.default())
+    return monitor.start()
+
+def get_story_owner() -> str:
+    """Who this user's archived stories belong to: STORY_OWNER, or an ID derived from their API token."""
+    return Config.get_story_owner() or StoryArchive.owner_for_token(st.session_state.huggingfacehub_api_token)
 
 class BedtimeStoryApp:
     """Main Streamlit application class."""
     
     def __init__(self):
         self.initialize_session_state()
-        self.story_generator = None
     
     def initialize_session_state(self):
         """Initialize session state variables."""
@@ -18,10 +71,55 @@ class BedtimeStoryApp:
             st.session_state.story_generated = False
         if 'current_story' not in st.session_state:
             st.session_state.current_story = ""
+        if 'story_renderer' not in st.session_state:
+            st.session_state.story_renderer = None
+        if 'story_generator' not in st.session_state:
+            st.session_state.story_generator = None
+        if 'story_job_id' not in st.session_state:
+            st.session_state.story_job_id = None
+        if 'speculative_job' not in st.session_state:
+            st.session_state.speculative_job = None
+        if 'story_error' not in st.session_state:
+            st.session_state.story_error = None
+        if 'story_history' not in st.session_state:
+            st.session_state.story_history = StoryHistory()
         if 'child_preferences' not in st.session_state:
             st.session_state.child_preferences = None
         if 'huggingfacehub_api_token' not in st.session_state:
             st.session_state.huggingfacehub_api_token = ""
+        if 'session_id' not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
+    
+    def create_story_generator(self) -> StoryGenerator:
+        """Create a story generator for this session."""
+        # Share the LLM rate limit fairly between browser sessions; archive for the user, not the session
+        return StoryGenerator(
+            st.session_state.huggingfacehub_api_token,
+            dispatcher=RequestDispatcher.shared(),
+            tenant=st.session_state.session_id,
+            priority=RequestDispatcher.INTERACTIVE,
+            archive=get_story_archive(),
+            owner=get_story_owner(),
+            template_cache=get_template_cache() if Config.STORY_TEMPLATE_MAX_REUSES > 0 else None,
+            cache=get_shared_cache(),
+            story_cache_ttl=Config.STORY_CACHE_TTL_SECONDS,
+            context_provider=get_context_provider(),
+            city=Config.get_story_city(),
+            timezone=Config.get_story_timezone()
+        )
+    
+    def get_story_generator(self) -> StoryGenerator:
+        """
+        This session's story generator, kept in session state across reruns so its agents are
+        reused (and measured by the memory monitor); rebuilt when the API token changes.
+        """
+        generator = st.session_state.story_generator
+        if generator is None or generator.huggingfacehub_api_token != st.session_state.huggingfacehub_api_token:
+            generator = st.session_state.story_generator = self.create_story_generator()
+            monitor = get_memory_monitor()
+            if monitor is not None:
+                monitor.register(st.session_state.session_id, generator, st.session_state.story_history)
+        return generator
     
     def run(self):
         """Main application runner."""
@@ -44,7 +142,23 @@ class BedtimeStoryApp:
 
             preferences = UIComponents.collect_preferences()
             
+            UIComponents.display_story_history()
+            if st.session_state.huggingfacehub_api_token:
+                UIComponents.display_story_search(get_story_archive(), get_story_owner())
+            
             if preferences:
+                # Drop any story still being written for the previous preferences
+                if st.session_state.story_job_id:
+                    GenerationJobExecutor.shared().cancel(st.session_state.story_job_id)
+                    st.session_state.story_job_id = None
+                SpeculativeGeneration.shared().abandon(st.session_state.speculative_job)
+                st.session_state.speculative_job = None
+                
+                # Start writing the story now, so it is (nearly) ready when "Generate" is pressed
+                if st.session_state.huggingfacehub_api_token:
+                    st.session_state.speculative_job = SpeculativeGeneration.shared().start(
+                        self.get_story_generator(), preferences
+                    )
                 st.session_state.child_preferences = preferences
                 st.session_state.story_generated = False
                 st.rerun()
@@ -55,17 +169,19 @@ class BedtimeStoryApp:
             UIComponents.display_welcome()
             return
 
-        if self.story_generator is None:
-            self.story_generator = StoryGenerator(st.session_state.huggingfacehub_api_token)
+        story_generator = self.get_story_generator()
 
         if st.session_state.child_preferences:
-            UIComponents.display_story_section(self.story_generator, st.session_state.child_preferences)
+            UIComponents.display_story_section(story_generator, st.session_state.child_preferences)
         else:
             UIComponents.display_welcome()
 
 def main():
     """Main function to run the application."""
     
+    # Before any story is compressed (session history, cache, archive)
+    configure_story_codec()
+    
     # Initialize the app
     app = BedtimeStoryApp()
     
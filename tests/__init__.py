@@ -0,0 +1,3 @@
+"""
+Tests for the Bedtime Story Generator.
+"""
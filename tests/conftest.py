@@ -0,0 +1,74 @@
+"""
+Shared fixtures for the Bedtime Story Generator tests.
+"""
+
+import pytest
+
+from src.models import ChildPreferences, StoryContext, TimeInfo, WeatherInfo
+
+def make_preferences(**overrides) -> ChildPreferences:
+    """Preferences for a test child; keyword arguments override single fields."""
+    values = dict(name="Mia", age=6, mood="happy", interests=["space", "animals"], story_length="short",
+                  favorite_animal="owl", favorite_color="blue")
+    values.update(overrides)
+    return ChildPreferences(**values)
+
+def make_context(preferences: ChildPreferences = None, fact: str = "the moon has no light of its own",
+                 weather: str = "clear sky") -> StoryContext:
+    """A fixed story context that needs no network access."""
+    return StoryContext(
+        preferences=preferences or make_preferences(),
+        weather=WeatherInfo(description=weather, temperature=18.0, condition=weather.split()[-1]),
+        time_info=TimeInfo(time="20:00", date="October 19, 2026", season="autumn", time_of_day="evening",
+                           is_bedtime=True),
+        educational_fact=fact
+    )
+
+@pytest.fixture
+def preferences() -> ChildPreferences:
+    return make_preferences()
+
+@pytest.fixture
+def context(preferences) -> StoryContext:
+    return make_context(preferences)
+
+STORY_TEXT = ("Once upon a time Mia met a blue owl under the evening sky. They flew over quiet hills "
+              "and counted every twinkling star together. The owl told Mia that the moon has no light "
+              "of its own and only shines with borrowed sunlight.\n\n"
+              "They visited a garden of sleepy flowers and a pond where frogs hummed soft songs. Mia "
+              "laughed and the owl hooted gently as the wind rocked the branches back and forth.\n\n"
+              "At last the owl carried Mia home, tucked her into bed and whispered goodnight. Mia "
+              "smiled, closed her eyes and drifted into warm and happy dreams until the morning.")
+
+class StubLocalBackend:
+    """
+    Local backend stand-in (see PrefixCache) that streams STORY_TEXT word by word.
+    Each word waits for chunk_seconds; `closed` is set when the reader stops early.
+    """
+
+    def __init__(self, text: str = STORY_TEXT, chunk_seconds: float = 0.0):
+        import threading
+        self.text = text
+        self.chunk_seconds = chunk_seconds
+        self.calls = []
+        self.closed = threading.Event()
+        self._lock = threading.Lock()
+
+    def encode_prefix(self, prefix):
+        return prefix
+
+    def generate_from_prefix(self, state, suffix, **kwargs):
+        return ''.join(self.stream_from_prefix(state, suffix, **kwargs))
+
+    def stream_from_prefix(self, state, suffix, **kwargs):
+        import time
+        with self._lock:
+            self.calls.append((suffix, kwargs))
+        words = self.text.split(' ')
+        try:
+            for index, word in enumerate(words):
+                time.sleep(self.chunk_seconds)
+                yield word if index == len(words) - 1 else word + ' '
+        except GeneratorExit:
+            self.closed.set()
+            raise
@@ -0,0 +1,77 @@
+"""
+Tests for BatchRunner: resuming after interruptions and failures, and offline fallback runs.
+"""
+
+import io
+import json
+
+from src.services import BatchRunner
+from src.story_generator import StoryGenerator
+
+def make_lines(*names):
+    return [json.dumps({"id": name, "name": name.title(), "interests": ["space"], "favorite_animal": "owl"})
+            for name in names]
+
+class FlakyGenerator:
+    """Writes a one-line story, failing for the names in `failing`."""
+
+    def __init__(self, failing=(), calls=None):
+        self.failing = set(failing)
+        self.calls = calls if calls is not None else []
+
+    def generate_story(self, preferences):
+        self.calls.append(preferences.name)
+        if preferences.name in self.failing:
+            raise RuntimeError("model unavailable")
+        return f"<p>A story for {preferences.name}.</p>"
+
+def run_batch(tmp_path, lines, generator_factory, **kwargs):
+    output_path = str(tmp_path / "stories.jsonl")
+    runner = BatchRunner(generator_factory, workers=2, checkpoint_path=output_path + ".ckpt", **kwargs)
+    with open(output_path, 'a', encoding='utf-8') as output:
+        summary = runner.run(lines, output, output_path=output_path)
+    return summary, output_path
+
+def test_resume_skips_finished_records_and_retries_failures(tmp_path):
+    lines = make_lines("ana", "ben", "cleo")
+    summary, output_path = run_batch(tmp_path, lines, lambda: FlakyGenerator(failing={"Ben"}))
+    assert (summary.generated, summary.failed, summary.skipped) == (2, 1, 0)
+    with open(output_path + ".ckpt", encoding='utf-8') as checkpoint:
+        assert sorted(checkpoint.read().split()) == ["ana", "cleo"]
+
+    calls = []
+    summary, _ = run_batch(tmp_path, lines, lambda: FlakyGenerator(calls=calls))
+    assert (summary.generated, summary.failed, summary.skipped) == (1, 0, 2)
+    assert calls == ["Ben"]
+
+    summary, _ = run_batch(tmp_path, lines, lambda: FlakyGenerator(calls=calls))
+    assert (summary.generated, summary.skipped) == (0, 3)
+
+def test_output_written_ahead_of_checkpoint_counts_as_done(tmp_path):
+    output_path = tmp_path / "stories.jsonl"
+    output_path.write_text(json.dumps({"id": "ana", "story": "<p>Done.</p>"}) + "\n"
+                           + json.dumps({"id": "ben", "error": "model unavailable"}) + "\n")
+    runner = BatchRunner(FlakyGenerator, checkpoint_path=str(output_path) + ".ckpt")
+    assert runner.load_completed_ids(str(output_path)) == {"ana"}
+
+def test_invalid_lines_are_reported_without_stopping_the_batch():
+    output = io.StringIO()
+    summary = BatchRunner(FlakyGenerator).run(["not json", *make_lines("ana")], output)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert (summary.generated, summary.failed) == (1, 1)
+    assert results[0]["id"] == "line-1" and "Invalid JSON" in results[0]["error"]
+
+def test_fallback_only_never_calls_the_weather_api(tmp_path):
+    def no_weather(*args):
+        raise AssertionError("weather API called")
+
+    def create_generator():
+        generator = StoryGenerator("")
+        generator.weather_tool.get_weather = no_weather
+        return generator
+
+    summary, output_path = run_batch(tmp_path, make_lines("ana", "ben"), create_generator, fallback_only=True)
+    assert (summary.generated, summary.failed) == (2, 0)
+    with open(output_path, encoding='utf-8') as output:
+        stories = {result["id"]: result["story"] for result in map(json.loads, output)}
+    assert "ana" in stories["ana"].lower() and "ben" in stories["ben"].lower()
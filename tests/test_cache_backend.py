@@ -0,0 +1,120 @@
+"""
+Tests for the cache backends: one computation per missing key, and hit/miss stats.
+"""
+
+import dataclasses
+import threading
+import time
+
+import pytest
+
+from src.storage import CacheBackend, InProcessCache, SQLiteCache
+
+from .conftest import make_context
+from .test_story_generator import make_generator
+
+@pytest.fixture(params=["memory", "sqlite"])
+def cache(request, tmp_path):
+    if request.param == "memory":
+        return InProcessCache()
+    return SQLiteCache(str(tmp_path / "cache.db"))
+
+def test_concurrent_callers_compute_a_missing_value_once(cache):
+    calls = []
+    results = []
+    start = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return {"weather": "clear"}
+
+    def worker():
+        start.wait()
+        results.append(cache.get_or_compute_json("weather:paris", compute, ttl=60))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{"weather": "clear"}] * 8
+
+def test_lease_is_held_by_one_thread_at_a_time():
+    cache = InProcessCache()
+    holders = []
+    overlaps = []
+    lock = threading.Lock()
+
+    def worker():
+        for _ in range(200):
+            token = cache._acquire_lease("key")
+            if token is None:
+                continue
+            with lock:
+                holders.append(token)
+                if len(holders) > 1:
+                    overlaps.append(len(holders))
+            with lock:
+                holders.remove(token)
+            cache._release_lease("key", token)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert overlaps == []
+
+def test_only_the_holder_releases_a_lease():
+    cache = InProcessCache()
+    token = cache._acquire_lease("key")
+    assert cache._acquire_lease("key") is None
+    cache._release_lease("key", object())
+    assert cache._acquire_lease("key") is None
+    cache._release_lease("key", token)
+    assert cache._acquire_lease("key") is not None
+
+def test_story_cache_lookups_are_counted():
+    cache = InProcessCache()
+    generator = make_generator(cache=cache)
+    context = make_context()
+    first = generator.generate_story(context.preferences, context=context)
+    assert generator.generate_story(context.preferences, context=context) == first
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["sets"] == 1 and stats["hits"] == 1
+
+def test_story_cache_is_not_shared_between_places_or_times_of_day():
+    cache = InProcessCache()
+    context = make_context()
+    story = make_generator(cache=cache, city="Bangalore").generate_story(context.preferences, context=context)
+
+    # Another spelling of the same city and timezone is served the cached story
+    same = make_generator(cache=cache, city="Bengaluru, India")
+    assert same.generate_story(context.preferences, context=context) == story
+    assert cache.stats()["hits"] == 1
+
+    for other in (make_generator(cache=cache, city="London"),
+                  make_generator(cache=cache, city="Bangalore", timezone="Asia/Tokyo")):
+        other.generate_story(context.preferences, context=context)
+    later = dataclasses.replace(context, time_info=dataclasses.replace(context.time_info, time_of_day="morning"))
+    same.generate_story(context.preferences, context=later)
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["sets"] == 4
+
+def test_incomplete_backend_fails_at_construction():
+    class NoClear(CacheBackend):
+        def get(self, key):
+            return None
+
+        def set(self, key, value, ttl=None):
+            pass
+
+        def delete(self, key):
+            pass
+
+    with pytest.raises(TypeError):
+        NoClear()
+    with pytest.raises(TypeError):
+        CacheBackend()
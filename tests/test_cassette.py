@@ -0,0 +1,78 @@
+"""
+Tests for Cassette: recording a generator run and replaying it offline.
+"""
+
+import json
+
+import pytest
+
+from src.services import Cassette, CassetteMissError
+from src.tools import WeatherTool
+
+from .conftest import STORY_TEXT, StubLocalBackend, make_context, make_preferences
+from .test_story_generator import make_generator
+
+RAIN_RESPONSE = {'status': 200, 'body': {'weather': [{'description': 'light rain', 'main': 'Rain'}],
+                                        'main': {'temp': 11.5}}}
+
+class FailingBackend(StubLocalBackend):
+    """A local backend that must not be reached during replay."""
+
+    def stream_from_prefix(self, state, suffix, **kwargs):
+        raise AssertionError("replay called the backend")
+
+def record_run(path):
+    cassette = Cassette(str(path), mode=Cassette.RECORD)
+    generator = make_generator(local_backend=StubLocalBackend(), cassette=cassette)
+    weather_tool = WeatherTool(cassette=cassette)
+    weather_tool._http_get = lambda query: RAIN_RESPONSE
+    weather = weather_tool.get_weather("Paris")
+    context = make_context(make_preferences(), fact="owls can turn their heads almost all the way around")
+    return weather, generator.generate_story(context.preferences, context=context), cassette
+
+def test_recorded_run_replays_without_the_backend(tmp_path):
+    path = tmp_path / "calls.jsonl"
+    weather, story, recorder = record_run(path)
+    assert recorder.stats()['recorded'] == 2
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line['kind'] for line in lines] == ['weather', 'llm']
+    assert lines[1]['response'].startswith("Once upon a time Mia")
+
+    # Replaying with a different fact changes the prompt; sequence matching still finds the call
+    cassette = Cassette(str(path), match='sequence')
+    replay_tool = WeatherTool(cassette=cassette)
+    replay_tool._http_get = lambda query: pytest.fail("replay called the weather API")
+    assert replay_tool.get_weather("Paris") == weather
+    generator = make_generator(local_backend=FailingBackend(), cassette=cassette)
+    context = make_context(make_preferences(), fact="the moon has no light of its own")
+    replayed = generator.generate_story(context.preferences, context=context)
+    assert "blue owl" in replayed.lower()
+    assert cassette.stats()['replayed'] == 2
+
+def test_exact_match_misses_a_changed_request(tmp_path):
+    path = tmp_path / "calls.jsonl"
+    record_run(path)
+    cassette = Cassette(str(path))
+    with pytest.raises(CassetteMissError):
+        list(cassette.stream('llm', {'prompt': "another prompt"}, lambda: iter([STORY_TEXT])))
+
+def test_recorded_errors_are_replayed(tmp_path):
+    path = tmp_path / "calls.jsonl"
+    recorder = Cassette(str(path), mode=Cassette.RECORD)
+
+    def fail():
+        raise TimeoutError("weather API timed out")
+
+    with pytest.raises(TimeoutError):
+        recorder.call('weather', {'city': 'paris-fr'}, fail)
+    with pytest.raises(RuntimeError, match="timed out"):
+        Cassette(str(path)).call('weather', {'city': 'paris-fr'}, fail)
+
+def test_stream_read_partly_is_marked_truncated(tmp_path):
+    path = tmp_path / "calls.jsonl"
+    recorder = Cassette(str(path), mode=Cassette.RECORD)
+    stream = recorder.stream('llm', {'prompt': "p"}, lambda: iter(["Good", "night", "!"]))
+    assert next(stream) == "Good"
+    stream.close()
+    (line,) = [json.loads(line) for line in path.read_text().splitlines()]
+    assert line['response'] == "Good" and line['truncated'] is True
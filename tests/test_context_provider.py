@@ -0,0 +1,118 @@
+"""
+Tests for ContextProvider: failed refreshes keep good weather, and generators pass their place.
+"""
+
+import threading
+import time
+
+from src.models import WeatherInfo
+from src.services import ContextProvider
+from src.tools import TimeTool, WeatherTool
+
+from .conftest import make_preferences
+from .test_story_generator import make_generator
+
+class FlakyWeatherTool(WeatherTool):
+    """WeatherTool whose API answers are scripted: a WeatherInfo, or an exception to raise."""
+
+    def __init__(self, answers):
+        super().__init__()
+        self.answers = list(answers)
+        self.fetched = []
+
+    def _fetch_weather(self, city):
+        self.fetched.append(city.id)
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+RAIN = WeatherInfo(description="light rain", temperature=12.0, condition="rain")
+SNOW = WeatherInfo(description="snow", temperature=-2.0, condition="snow")
+
+def refresh(provider, snapshot):
+    """Run one background refresh with the weather due."""
+    provider.weather_refresh_seconds = 0
+    return provider._refresh((snapshot.city, snapshot.timezone), snapshot)
+
+def test_failed_refresh_keeps_the_previous_weather():
+    provider = ContextProvider(FlakyWeatherTool([RAIN, RuntimeError("HTTP 503"), SNOW]))
+    first = provider.snapshot("Paris")
+    assert first.weather == RAIN
+
+    kept = refresh(provider, first)
+    assert kept.weather == RAIN
+    assert kept.weather_refreshed_at == first.weather_refreshed_at
+
+    assert refresh(provider, kept).weather == SNOW
+    provider.close()
+
+def test_first_failure_serves_fallback_until_a_lookup_succeeds():
+    provider = ContextProvider(FlakyWeatherTool([RuntimeError("timeout"), RAIN]))
+    first = provider.snapshot("Paris")
+    assert first.weather == WeatherTool.fallback_weather()
+    assert first.weather_refreshed_at == 0
+
+    # Retried on the next refresh even though the refresh interval has not passed
+    provider.weather_refresh_seconds = 3600
+    assert provider._refresh((first.city, first.timezone), first).weather == RAIN
+    provider.close()
+
+def test_generator_asks_for_its_city_and_timezone():
+    weather_tool = FlakyWeatherTool([RAIN])
+    provider = ContextProvider(weather_tool)
+    generator = make_generator(context_provider=provider, city="London, Canada", timezone="America/Toronto")
+    context = generator.get_story_context(make_preferences())
+    assert context.weather == RAIN
+    assert weather_tool.fetched == ["london-ca"]
+    (snapshot,) = provider.tracked()
+    assert (snapshot.city, snapshot.timezone) == ("london-ca", "America/Toronto")
+    provider.close()
+
+def test_generator_without_provider_uses_its_city():
+    generator = make_generator(city="Bangalore")
+    generator.weather_tool = FlakyWeatherTool([SNOW])
+    assert generator.get_story_context(make_preferences()).weather == SNOW
+    assert generator.weather_tool.fetched == ["bengaluru-in"]
+
+def test_unknown_timezone_falls_back_to_local_time():
+    assert TimeTool.valid_timezone("Asia/Kolkata") == "Asia/Kolkata"
+    assert TimeTool.valid_timezone("Asia/Kolkatta") is None
+    assert TimeTool.valid_timezone("../etc/passwd") is None
+    assert TimeTool().get_time_info("Asia/Kolkatta").time_of_day
+
+    generator = make_generator(city="Paris", timezone="Europe/Pariss")
+    assert generator.timezone is None
+    generator.weather_tool = FlakyWeatherTool([RAIN])
+    assert generator.get_story_context(make_preferences()).weather == RAIN
+
+    provider = ContextProvider(FlakyWeatherTool([SNOW]))
+    snapshot = provider.snapshot("Paris", "Europe/Pariss")
+    assert snapshot.weather == SNOW and snapshot.timezone is None
+    # Shares the local-time snapshot instead of fetching again
+    assert provider.snapshot("Paris") is snapshot
+    provider.close()
+
+def test_concurrent_first_requests_fetch_the_weather_once():
+    class SlowWeatherTool(FlakyWeatherTool):
+        def _fetch_weather(self, city):
+            time.sleep(0.1)
+            return super()._fetch_weather(city)
+
+    weather_tool = SlowWeatherTool([RAIN] * 8)
+    provider = ContextProvider(weather_tool)
+    start = threading.Barrier(8)
+    snapshots = []
+
+    def worker():
+        start.wait()
+        snapshots.append(provider.snapshot("Paris"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert weather_tool.fetched == ["paris-fr"]
+    assert len(snapshots) == 8 and all(snapshot is snapshots[0] for snapshot in snapshots)
+    provider.close()
@@ -0,0 +1,77 @@
+"""
+Tests for DegenerationDetector: stop sequences, paragraph limits and looping output.
+"""
+
+from src.utils import DegenerationDetector
+
+from .conftest import STORY_TEXT, StubLocalBackend, make_context
+from .test_story_generator import make_generator
+
+LOOP = "The owl said goodnight to the moon again. " * 6
+
+def feed_words(detector, text):
+    """Feed text a word at a time, as a stream would."""
+    words = text.split(' ')
+    return detector.feed_all(word if index == len(words) - 1 else word + ' ' for index, word in enumerate(words))
+
+def test_a_normal_story_is_read_to_the_end():
+    detector = DegenerationDetector(stop_sequences=["\nHuman:"])
+    assert feed_words(detector, STORY_TEXT) == STORY_TEXT
+    assert not detector.stopped and not detector.degenerate
+
+def test_stop_sequence_split_across_chunks_ends_the_output():
+    detector = DegenerationDetector(stop_sequences=["\nHuman:"])
+    assert not detector.feed("Mia fell asleep.\nHu")
+    assert detector.feed("man: tell me another")
+    assert detector.reason == "stop_sequence" and not detector.degenerate
+    assert detector.result() == "Mia fell asleep."
+
+def test_paragraph_limit_stops_before_the_extra_paragraph():
+    detector = DegenerationDetector(max_paragraphs=2)
+    text = "First part.\n\nSecond part.\n\nThird part."
+    assert detector.feed_all([text]) == "First part.\n\nSecond part."
+    assert detector.reason == "paragraph_limit"
+
+def test_repeating_phrase_is_cut_to_its_first_occurrence():
+    detector = DegenerationDetector()
+    result = feed_words(detector, "Mia looked up at the sky. " + LOOP)
+    assert detector.reason == "repetition" and detector.degenerate
+    assert result == "Mia looked up at the sky. The owl said goodnight to the moon again."
+
+def test_word_run_is_degenerate():
+    detector = DegenerationDetector()
+    result = feed_words(detector, "Mia smiled. The stars were very very very very very bright.")
+    assert detector.reason == "word_run"
+    assert result == "Mia smiled."
+
+def test_low_diversity_is_degenerate():
+    detector = DegenerationDetector(diversity_window=20, min_diversity=0.5, ngram_size=20)
+    feed_words(detector, "Mia slept. " + "owl moon star owl moon star sky " * 5)
+    assert detector.reason == "low_diversity" and detector.degenerate
+    # Cut where the low-variety window begins
+    assert "owl moon star" not in detector.result()
+
+def test_feed_all_closes_the_stream_when_it_stops_early():
+    closed = []
+
+    def stream():
+        try:
+            yield "Goodnight.\nHuman: more"
+            yield "never read"
+        finally:
+            closed.append(True)
+
+    detector = DegenerationDetector(stop_sequences=["\nHuman:"])
+    assert detector.feed_all(stream()) == "Goodnight."
+    assert closed == [True]
+
+def test_generator_retries_a_looping_completion_then_falls_back():
+    backend = StubLocalBackend(text=LOOP * 3)
+    generator = make_generator(local_backend=backend)
+    context = make_context()
+    story = generator.generate_story(context.preferences, context=context)
+    assert len(backend.calls) == generator.DEGENERATION_RETRIES + 1
+    assert generator.degeneration_aborts == generator.DEGENERATION_RETRIES + 1
+    # The stream was closed early each time, and the fallback story was told instead
+    assert backend.closed.is_set()
+    assert "goodnight to the moon again" not in story.lower()
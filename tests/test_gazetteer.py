@@ -0,0 +1,104 @@
+"""
+Tests for CityGazetteer and how WeatherTool looks up listed, unlisted and unknown places.
+"""
+
+import pytest
+
+from src.models import WeatherInfo
+from src.services import ContextProvider
+from src.storage import InProcessCache
+from src.tools import CityGazetteer, WeatherTool
+
+OK = {'status': 200, 'body': {'weather': [{'description': 'few clouds', 'main': 'Clouds'}], 'main': {'temp': 17.0}}}
+NOT_FOUND = {'status': 404, 'body': None}
+UNAVAILABLE = {'status': 503, 'body': None}
+
+@pytest.fixture(scope='module')
+def gazetteer():
+    return CityGazetteer.default()
+
+@pytest.mark.parametrize("text", ["Bangalore", "  bengaluru ", "BENGALURU, India", "Bengaluru,IN", "Bengaluruu"])
+def test_spellings_resolve_to_one_city(gazetteer, text):
+    assert gazetteer.resolve(text).id == "bengaluru-in"
+
+def test_country_picks_between_cities_with_one_name(gazetteer):
+    assert gazetteer.resolve("London").id == "london-gb"
+    assert gazetteer.resolve("London, Canada").id == "london-ca"
+    assert gazetteer.resolve("London, Narnia") is None
+
+def test_unlisted_places_pass_through_keyed_by_normalized_name(gazetteer):
+    place = gazetteer.place("Hobbiton,  NZ")
+    assert not place.known and place.query == "Hobbiton,NZ"
+    assert gazetteer.place("hobbiton, New Zealand").id == place.id
+    assert gazetteer.place("  HOBBITON ").query == "HOBBITON"
+    assert gazetteer.place("Bangalore").known
+
+@pytest.mark.parametrize("text", [None, "", "   ", "12345", "?!", "x", "x" * 200,
+                                  "Bengaluru, Narnia", "Hobbiton, Middle Earth"])
+def test_implausible_input_and_unknown_qualifiers_are_rejected(gazetteer, text):
+    assert gazetteer.place(text) is None
+
+class ScriptedWeatherTool(WeatherTool):
+    """WeatherTool whose HTTP answers are scripted; remembers the queries sent."""
+
+    def __init__(self, answers, unlisted_cities=True, **kwargs):
+        super().__init__(unlisted_cities=unlisted_cities, **kwargs)
+        self.answers = list(answers)
+        self.queries = []
+
+    def _http_get(self, query):
+        self.queries.append(query)
+        return self.answers.pop(0)
+
+def test_unlisted_city_is_looked_up_as_typed():
+    tool = ScriptedWeatherTool([OK])
+    assert tool.get_weather("Hobbiton, NZ") == WeatherInfo(description='few clouds', temperature=17.0, condition='clouds')
+    assert tool.queries == ["Hobbiton,NZ"]
+
+def test_unlisted_cities_are_not_looked_up_unless_enabled():
+    tool = ScriptedWeatherTool([OK], unlisted_cities=False)
+    assert tool.get_weather("Hobbiton, NZ") == WeatherTool.fallback_weather()
+    assert tool.get_weather("Bengaluru, Narnia") == WeatherTool.fallback_weather()
+    assert tool.queries == []
+    assert tool.get_weather("Bangalore").condition == 'clouds'
+    assert tool.queries == ["Bengaluru,IN"]
+
+def test_city_the_api_does_not_know_is_not_asked_again():
+    tool = ScriptedWeatherTool([NOT_FOUND])
+    assert tool.get_weather("Atlantis") == WeatherTool.fallback_weather()
+    assert tool.get_weather("atlantis") == WeatherTool.fallback_weather()
+    assert tool.queries == ["Atlantis"]
+
+def test_not_found_is_shared_through_the_cache():
+    cache = InProcessCache()
+    ScriptedWeatherTool([NOT_FOUND], cache=cache).get_weather("Atlantis")
+    other = ScriptedWeatherTool([], cache=cache)
+    assert other.lookup_weather("Atlantis") is None
+    assert other.queries == []
+
+def test_other_failures_are_retried():
+    tool = ScriptedWeatherTool([UNAVAILABLE, OK])
+    assert tool.lookup_weather("Paris") is None
+    assert tool.lookup_weather("Paris").condition == 'clouds'
+
+def test_implausible_input_never_reaches_the_api():
+    tool = ScriptedWeatherTool([])
+    for text in ("1234", "x", "Bengaluru, Narnia"):
+        assert tool.get_weather(text) == WeatherTool.fallback_weather()
+    assert tool.queries == []
+
+def test_context_provider_shares_a_snapshot_between_spellings_of_an_unlisted_place():
+    provider = ContextProvider(ScriptedWeatherTool([OK]))
+    first = provider.snapshot("Hobbiton, NZ")
+    assert provider.snapshot("hobbiton, new zealand") is first
+    assert first.city == CityGazetteer.UNLISTED_PREFIX + "hobbiton-nz"
+    provider.close()
+
+def test_unlisted_place_keeps_its_name_across_refreshes():
+    tool = ScriptedWeatherTool([OK, OK])
+    provider = ContextProvider(tool)
+    first = provider.snapshot("Hobbiton, NZ")
+    provider.weather_refresh_seconds = 0
+    assert provider._refresh((first.city, first.timezone), first).weather.condition == 'clouds'
+    assert tool.queries == ["Hobbiton,NZ", "Hobbiton,NZ"]
+    provider.close()
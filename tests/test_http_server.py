@@ -0,0 +1,194 @@
+"""
+Tests for StoryHTTPServer, using a stand-in generator and raw HTTP over asyncio streams.
+"""
+
+import asyncio
+import json
+import threading
+
+from src.services import StoryHTTPServer
+
+PREFERENCES = {"name": "Mia", "age": 5, "interests": ["Stars"], "favorite_animal": "cat"}
+
+STORY_HTML = ("<p style='margin-bottom: 1rem;'>Mia saw a star.</p>\n"
+              "<p style='margin-bottom: 1rem;'>Then she slept.</p>")
+
+class StubGenerator:
+    """Reports streamed text, then waits for permission to finish."""
+
+    def __init__(self, release: threading.Event, result=STORY_HTML):
+        self.release = release
+        self.result = result
+
+    def generate_story(self, preferences, on_progress=None):
+        if on_progress:
+            on_progress("Writing the story", "Mia saw")
+            on_progress("Writing the story", "Mia saw a star.")
+        self.release.wait(5)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+async def request(port, method, path, body=None):
+    """Send one request; return (status line, headers, reader) with the body unread."""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    data = json.dumps(body).encode() if body is not None else b''
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: test\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = (await reader.readline()).decode().strip()
+    headers = {}
+    while True:
+        line = (await reader.readline()).decode()
+        if line in ('\r\n', ''):
+            break
+        name, _, value = line.partition(':')
+        headers[name.strip().lower()] = value.strip()
+    # A collected StreamWriter closes the socket, so keep it alive with the reader
+    reader.writer = writer
+    return status, headers, reader
+
+async def read_chunk(reader):
+    """Read one chunk of a chunked body (b'' at the end)."""
+    size = int((await reader.readline()).decode().strip(), 16)
+    data = await reader.readexactly(size) if size else b''
+    await reader.readline()
+    return data
+
+def run(coroutine_function, generator_factory, **kwargs):
+    async def main():
+        server = StoryHTTPServer(generator_factory, port=0, **kwargs)
+        await server.start()
+        try:
+            return await coroutine_function(server)
+        finally:
+            await server.close()
+    return asyncio.run(main())
+
+def test_stream_sends_model_text_before_generation_finishes():
+    release = threading.Event()
+
+    async def scenario(server):
+        status, headers, reader = await request(server.port, 'POST', '/stories?stream=1', PREFERENCES)
+        assert status == "HTTP/1.1 200 OK"
+        assert headers['transfer-encoding'] == 'chunked'
+        texts = []
+        while len(texts) < 2:
+            event = json.loads(await read_chunk(reader))
+            if event['event'] == 'text':
+                texts.append(event['text'])
+        # Both text events arrived while generation is still blocked
+        assert texts == ["Mia saw", " a star."]
+        release.set()
+        events = []
+        while True:
+            chunk = await read_chunk(reader)
+            if not chunk:
+                break
+            events.append(json.loads(chunk))
+        return events
+
+    events = run(scenario, lambda: StubGenerator(release))
+    paragraphs = [event['text'] for event in events if event['event'] == 'paragraph']
+    assert paragraphs == ["Mia saw a star.", "Then she slept."]
+    assert events[-1] == {'event': 'done', 'paragraphs': 2}
+
+def test_error_after_headers_ends_the_chunk_stream():
+    release = threading.Event()
+    release.set()
+
+    async def scenario(server):
+        status, _, reader = await request(server.port, 'POST', '/stories?stream=1', PREFERENCES)
+        events = []
+        while True:
+            chunk = await read_chunk(reader)
+            if not chunk:
+                break
+            events.append(json.loads(chunk))
+        assert await reader.read() == b''
+        return status, events
+
+    status, events = run(scenario, lambda: StubGenerator(release, result=RuntimeError("secret path /etc")))
+    assert status == "HTTP/1.1 200 OK"
+    assert events[-1] == {'event': 'error', 'error': "Story generation failed"}
+    assert "secret" not in json.dumps(events)
+
+def test_plain_request_and_errors():
+    release = threading.Event()
+    release.set()
+
+    async def scenario(server):
+        results = {}
+        status, headers, reader = await request(server.port, 'POST', '/stories?format=text', PREFERENCES)
+        results['story'] = (status, json.loads(await reader.readexactly(int(headers['content-length']))))
+        status, _, _ = await request(server.port, 'POST', '/stories', {"age": 5})
+        results['missing'] = status
+        status, _, _ = await request(server.port, 'GET', '/stories')
+        results['method'] = status
+        status, _, _ = await request(server.port, 'GET', '/nowhere')
+        results['route'] = status
+        status, headers, reader = await request(server.port, 'GET', '/healthz')
+        results['health'] = json.loads(await reader.readexactly(int(headers['content-length'])))
+        return results
+
+    results = run(scenario, lambda: StubGenerator(release))
+    status, body = results['story']
+    assert status == "HTTP/1.1 200 OK"
+    assert body['story'] == "A Bedtime Story for Mia\n\nMia saw a star.\n\nThen she slept.\n"
+    assert results['missing'].startswith("HTTP/1.1 400")
+    assert results['method'].startswith("HTTP/1.1 405")
+    assert results['route'].startswith("HTTP/1.1 404")
+    assert results['health']['completed'] == 1
+
+def test_requests_over_capacity_get_429():
+    release = threading.Event()
+
+    async def scenario(server):
+        first = asyncio.ensure_future(request(server.port, 'POST', '/stories', PREFERENCES))
+        while server._admitted < 1:
+            await asyncio.sleep(0.01)
+        status, headers, _ = await request(server.port, 'POST', '/stories', PREFERENCES)
+        release.set()
+        await first
+        return status, headers
+
+    status, headers = run(scenario, lambda: StubGenerator(release), max_workers=1, max_queue=0)
+    assert status.startswith("HTTP/1.1 429")
+    assert headers['retry-after'] == '1'
+
+def test_disconnected_client_keeps_its_slot_until_generation_finishes():
+    release = threading.Event()
+
+    async def scenario(server):
+        status, _, reader = await request(server.port, 'POST', '/stories?stream=1', PREFERENCES)
+        assert status == "HTTP/1.1 200 OK"
+        await read_chunk(reader)
+        # The client goes away while its story is still being written
+        reader.writer.close()
+        await asyncio.sleep(0.1)
+        busy, _, _ = await request(server.port, 'POST', '/stories', PREFERENCES)
+
+        release.set()
+        while server._admitted:
+            await asyncio.sleep(0.01)
+        status, headers, reader = await request(server.port, 'POST', '/stories', PREFERENCES)
+        await reader.readexactly(int(headers['content-length']))
+        return busy, status, server.health()
+
+    busy, status, health = run(scenario, lambda: StubGenerator(release), max_workers=1, max_queue=0)
+    assert busy.startswith("HTTP/1.1 429")
+    assert status == "HTTP/1.1 200 OK"
+    assert health['admitted'] == 0 and health['completed'] == 2
+
+def test_unhandled_errors_hide_details():
+    release = threading.Event()
+
+    async def scenario(server):
+        def broken_health():
+            raise RuntimeError("database password is hunter2")
+        server.health = broken_health
+        status, headers, reader = await request(server.port, 'GET', '/healthz')
+        return status, await reader.readexactly(int(headers['content-length']))
+
+    status, body = run(scenario, lambda: StubGenerator(release))
+    assert status.startswith("HTTP/1.1 500")
+    assert json.loads(body) == {'error': "Internal server error"}
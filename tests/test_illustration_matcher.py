@@ -0,0 +1,47 @@
+"""
+Tests for IllustrationMatcher and StoryFormatter.add_illustrations.
+"""
+
+from src.utils import IllustrationMatcher, StoryFormatter
+
+LIBRARY = {'star': 'S', 'cat': 'C', 'fox': 'F', 'butterfly': 'B', 'ice cream': 'I', 'mouse': 'M'}
+
+def test_whole_words_only():
+    matcher = IllustrationMatcher(LIBRARY)
+    assert matcher.match_counts("An education in scattered catalogues") == {}
+    assert matcher.match_counts("The cat sat by the star.") == {'cat': 1, 'star': 1}
+
+def test_regular_plurals_count_for_their_keyword():
+    matcher = IllustrationMatcher(LIBRARY)
+    counts = matcher.match_counts("Stars, foxes, butterflies and two cats.")
+    assert counts == {'star': 1, 'fox': 1, 'butterfly': 1, 'cat': 1}
+
+def test_bare_suffixes_do_not_match():
+    matcher = IllustrationMatcher(LIBRARY)
+    assert matcher.match_counts("She stares at the cates and the foxs.") == {}
+
+def test_explicit_irregular_plurals():
+    matcher = IllustrationMatcher(LIBRARY, plurals={'mouse': ['mice']})
+    assert matcher.match_counts("Three mice and a mouse.") == {'mouse': 2}
+    assert matcher.match_counts("Mouses") == {}
+
+def test_plurals_can_be_disabled():
+    matcher = IllustrationMatcher(LIBRARY, allow_plurals=False)
+    assert matcher.match_counts("stars and a star") == {'star': 1}
+
+def test_phrases_match_across_whitespace():
+    matcher = IllustrationMatcher(LIBRARY)
+    assert matcher.match_counts("Some ICE\n  cream and ice creams") == {'ice cream': 2}
+
+def test_best_match_prefers_frequency_then_library_order():
+    matcher = IllustrationMatcher(LIBRARY)
+    assert matcher.best_match("A cat and two stars and a star.") == 'S'
+    assert matcher.best_match("A cat and a star.") == 'S'
+    assert matcher.best_match("Nothing to see here.") is None
+
+def test_add_illustrations_prefixes_paragraphs():
+    story = StoryFormatter.format_story("The dragon flew over the castle.", "Mia")
+    illustrated = StoryFormatter.add_illustrations(story)
+    assert "\U0001F409 The dragon" in illustrated
+    plain = StoryFormatter.format_story("She stares at the ceiling.", "Mia")
+    assert StoryFormatter.add_illustrations(plain) == plain
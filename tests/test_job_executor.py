@@ -0,0 +1,85 @@
+"""
+Tests for GenerationJobExecutor and streamed progress from StoryGenerator.
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.services import GenerationJob, GenerationJobExecutor, JobCancelledError
+from src.story_generator import StoryGenerator
+
+from .conftest import StubLocalBackend, make_context
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+def test_job_runs_in_background_and_reports_result():
+    executor = GenerationJobExecutor(max_workers=1)
+    release = threading.Event()
+
+    def work(value, on_progress):
+        on_progress("Thinking", partial="half")
+        release.wait(5)
+        return value * 2
+
+    job_id = executor.submit(work, 21)
+    wait_for(lambda: executor.get(job_id).partial == "half")
+    assert executor.get(job_id).stage == "Thinking"
+    assert executor.pending_count() == 1
+    release.set()
+    wait_for(lambda: executor.get(job_id).finished)
+    job = executor.pop(job_id)
+    assert (job.status, job.result) == ("done", 42)
+    assert executor.get(job_id) is None
+    executor.shutdown()
+
+def test_failed_job_keeps_the_error():
+    executor = GenerationJobExecutor(max_workers=1)
+
+    def work(on_progress):
+        raise ValueError("no storyteller")
+
+    job_id = executor.submit(work)
+    wait_for(lambda: executor.get(job_id).finished)
+    assert executor.get(job_id).status == "failed"
+    assert executor.get(job_id).error == "no storyteller"
+    executor.shutdown()
+
+def test_partial_story_is_streamed_while_generating(context):
+    backend = StubLocalBackend(chunk_seconds=0.01)
+    generator = StoryGenerator("test-token", local_backend=backend)
+    partials = []
+
+    def on_progress(stage, partial=None):
+        if stage == StoryGenerator.WRITING_STAGE and partial:
+            partials.append(partial)
+
+    story = generator.generate_story(context.preferences, on_progress=on_progress, context=context)
+    assert len(partials) > 10
+    assert all(len(a) <= len(b) for a, b in zip(partials, partials[1:]))
+    assert partials[0].startswith("Once")
+    assert "blue owl" in story
+
+def test_cancelling_a_running_job_stops_the_stream(context):
+    backend = StubLocalBackend(chunk_seconds=0.05)
+    generator = StoryGenerator("test-token", local_backend=backend)
+    executor = GenerationJobExecutor(max_workers=1)
+    job_id = executor.submit(generator.generate_story, context.preferences, context=context)
+    wait_for(lambda: executor.get(job_id).partial)
+    assert executor.cancel(job_id) is False
+    wait_for(lambda: executor.get(job_id).finished)
+    assert executor.get(job_id).status == "cancelled"
+    assert backend.closed.is_set()
+    executor.shutdown()
+
+def test_report_raises_once_cancelled():
+    job = GenerationJob(job_id="j")
+    job.cancel_requested = True
+    with pytest.raises(JobCancelledError):
+        job.report_progress("Writing")
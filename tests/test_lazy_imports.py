@@ -0,0 +1,34 @@
+"""
+Tests that importing the package does not load the heavy optional dependencies.
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ('langchain', 'langchain_community', 'streamlit', 'requests', 'huggingface_hub')
+
+def loaded_heavy_modules(code: str):
+    """Run code in a fresh interpreter and return the heavy modules it loaded."""
+    check = (f"{code}\nimport sys\n"
+             f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    result = subprocess.run([sys.executable, '-c', check], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return [name for name in result.stdout.strip().split(',') if name]
+
+@pytest.mark.parametrize("code", [
+    "import src",
+    "from src.story_generator import StoryGenerator; StoryGenerator('token')",
+    "import src.services, src.storage, src.tools, src.prompts, src.utils",
+])
+def test_package_imports_stay_light(code):
+    assert loaded_heavy_modules(code) == []
+
+def test_lazy_attributes_resolve():
+    result = subprocess.run([sys.executable, '-c', "import src; print(src.StoryGenerator.__name__)"],
+                            cwd=ROOT, capture_output=True, text=True)
+    assert result.stdout.strip() == "StoryGenerator"
@@ -0,0 +1,53 @@
+"""
+Tests for the concurrent-session load-test harness (benchmarks/load_test.py).
+"""
+
+import importlib.util
+import json
+import os
+import re
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(scope='module')
+def load_test():
+    spec = importlib.util.spec_from_file_location('load_test', os.path.join(ROOT, 'benchmarks', 'load_test.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_stub_backend_writes_a_story_for_the_child(load_test):
+    backend = load_test.StubLLMBackend(latency_ms=0, error_rate=0, seed=1)
+    story = backend.generate_from_prefix(None, "Child: Ravi, age 5", max_new_tokens=60)
+    assert story.startswith("Once upon a time Ravi") and story.endswith("sweetest dreams.")
+    assert len(story.split()) >= 60 * 0.7
+
+    failing = load_test.StubLLMBackend(latency_ms=0, error_rate=1, seed=1)
+    with pytest.raises(RuntimeError):
+        failing.generate_from_prefix(None, "Child: Ravi, age 5")
+
+def test_level_result_percentiles_and_report(load_test):
+    result = load_test.LevelResult(users=2, stories=4, fallbacks=1, elapsed_seconds=2.0,
+                                   latencies=[0.1, 0.2, 0.3, 0.4])
+    assert result.stories_per_second == 2.0
+    assert result.fallback_rate == 0.25
+    assert result.percentile(0.5) == 0.3
+    assert result.percentile(0.99) == 0.4
+    report = result.to_dict()
+    assert 'latencies' not in report
+    assert report['p50_ms'] == 300.0 and report['fallback_rate'] == 0.25
+
+def test_small_run_reports_every_level(load_test, tmp_path, capsys):
+    results_path = tmp_path / "results.json"
+    status = load_test.main(['--users', '1,3', '--stories-per-user', '2', '--llm-latency-ms', '1',
+                             '--llm-error-rate', '0', '--weather-latency-ms', '0', '--weather-error-rate', '0',
+                             '--poll-ms', '1', '--json', str(results_path)])
+    assert status == 0
+    rows = [line.split() for line in capsys.readouterr().out.splitlines() if re.match(r'\s*\d+\s', line)]
+    assert [row[:3] for row in rows] == [['1', '2', '0'], ['3', '6', '0']]
+
+    levels = json.loads(results_path.read_text())['levels']
+    assert [(level['users'], level['stories'], level['failed']) for level in levels] == [(1, 2, 0), (3, 6, 0)]
+    assert all(level['history_bytes'] > 0 for level in levels)
@@ -0,0 +1,101 @@
+"""
+Tests for MemoryMonitor: snapshots, growth alerts and per-session sizes.
+"""
+
+import gc
+import json
+
+import pytest
+
+from src.services import MemoryMonitor
+from src.storage import StoryHistory
+
+class Session:
+    """Stands in for a session's generator: holds some data of its own and a shared cache."""
+
+    def __init__(self, size, shared):
+        self.data = [bytes(1024) for _ in range(size)]
+        self.shared = shared
+
+@pytest.fixture
+def monitor(tmp_path):
+    monitor = MemoryMonitor(interval_seconds=3600, alert_growth_bytes=512 * 1024,
+                            alert_path=str(tmp_path / "alerts.jsonl"))
+    yield monitor
+    monitor.stop()
+
+def test_snapshot_needs_the_monitor_started():
+    with pytest.raises(RuntimeError):
+        MemoryMonitor(alert_path=None).take_snapshot()
+
+def test_growth_over_the_threshold_is_alerted(monitor):
+    monitor.start()
+    first = monitor.take_snapshot()
+    assert first.growth_bytes == 0 and first.traced_bytes > 0
+
+    retained = [bytes(1024) for _ in range(2048)]
+    second = monitor.take_snapshot()
+    assert second.growth_bytes > 1024 * 1024
+    assert any(item['bytes'] > 1024 * 1024 for item in second.top_growth)
+    assert monitor.alerts == 1
+
+    (alert,) = [json.loads(line) for line in open(monitor.alert_path)]
+    assert alert['alert'] == 'memory_growth' and alert['growth_bytes'] == second.growth_bytes
+
+    report = monitor.report()
+    assert report['snapshots'] == 2 and report['alerts'] == 1
+    assert report['growth_kb'] > 1024 and report['top_growth']
+    del retained
+
+def test_small_growth_is_not_alerted(monitor):
+    monitor.start()
+    monitor.take_snapshot()
+    monitor.take_snapshot()
+    assert monitor.alerts == 0
+
+def test_session_sizes_exclude_shared_objects_and_forget_freed_sessions():
+    monitor = MemoryMonitor(alert_path=None)
+    shared = [bytes(1024) for _ in range(500)]
+    small, large = Session(10, shared), Session(200, shared)
+    monitor.register('small', small)
+    monitor.register('large', large)
+    monitor.mark_shared(shared)
+
+    sizes = monitor.session_bytes()
+    assert 10 * 1024 < sizes['small'] < 100 * 1024
+    assert sizes['large'] > 200 * 1024 > sizes['small'] + 100 * 1024
+
+    del large
+    gc.collect()
+    assert set(monitor.session_bytes()) == {'small'}
+
+def test_live_objects_counts_watched_classes():
+    before = MemoryMonitor.live_objects()['StoryHistory']
+    histories = [StoryHistory() for _ in range(3)]
+    assert MemoryMonitor.live_objects()['StoryHistory'] == before + 3
+    del histories
+
+def test_generator_agents_and_tools_are_counted():
+    from src.tools import CityGazetteer
+
+    from .conftest import make_context
+    from .test_story_generator import make_generator
+
+    monitor = MemoryMonitor(alert_path=None)
+    generator = make_generator()
+    context = make_context()
+    generator.generate_story(context.preferences, context=context)
+    monitor.register('session', generator)
+
+    unshared = monitor.session_bytes()['session']
+    monitor.mark_shared(CityGazetteer.default())
+    before = monitor.session_bytes()['session']
+    # The process-wide gazetteer the weather tool uses is not the session's
+    assert before < unshared
+    tools = [generator.weather_tool, generator.time_tool, generator.search_tool, generator.prompt_builder]
+    assert before > MemoryMonitor.reachable_bytes(tools, {id(CityGazetteer.default())})
+
+    # This thread's agent (kept in a thread-local) is part of the session
+    (agent,) = generator._local_agents.agents.values()
+    agent.prompts.append(bytes(256 * 1024))
+    assert monitor.session_bytes()['session'] >= before + 256 * 1024
@@ -0,0 +1,80 @@
+"""
+Tests for MicroBatchScheduler: batching, option grouping and cancellation.
+"""
+
+import threading
+from concurrent.futures import CancelledError, TimeoutError
+
+import pytest
+
+from src.services import MicroBatchScheduler
+
+class BatchBackend:
+    """Upper-cases prompts in one call per batch; can be held to keep prompts queued."""
+
+    def __init__(self):
+        self.batches = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def generate_batch(self, prompts, max_new_tokens=None, stop=None):
+        self.release.wait(5)
+        self.batches.append((list(prompts), max_new_tokens))
+        return [prompt.upper() for prompt in prompts]
+
+def test_concurrent_prompts_share_batches_by_options():
+    backend = BatchBackend()
+    scheduler = MicroBatchScheduler.for_batch_backend(backend, max_batch_size=8, max_wait_ms=200)
+    try:
+        futures = [scheduler.submit(f"story {index}", max_new_tokens=100) for index in range(3)]
+        futures.append(scheduler.submit("long story", max_new_tokens=300))
+        assert [future.result(timeout=5) for future in futures] == ["STORY 0", "STORY 1", "STORY 2", "LONG STORY"]
+    finally:
+        scheduler.close()
+    assert sorted(backend.batches, key=lambda batch: batch[1]) == [
+        (["story 0", "story 1", "story 2"], 100), (["long story"], 300)
+    ]
+    assert scheduler.metrics()['batch_size']['count'] == 2
+
+def test_cancelled_prompts_are_not_sent():
+    backend = BatchBackend()
+    backend.release.clear()
+    scheduler = MicroBatchScheduler.for_batch_backend(backend, max_batch_size=1, max_wait_ms=0)
+    try:
+        # The first prompt occupies the only batch slot; the second waits in the runner's queue
+        blocking = scheduler.submit("first")
+        waiting = scheduler.submit("second")
+        assert waiting.cancel()
+        backend.release.set()
+        assert blocking.result(timeout=5) == "FIRST"
+        with pytest.raises(CancelledError):
+            waiting.result(timeout=0)
+    finally:
+        scheduler.close()
+    assert [prompts for prompts, _ in backend.batches] == [["first"]]
+
+def test_generate_withdraws_a_prompt_that_timed_out():
+    backend = BatchBackend()
+    backend.release.clear()
+    scheduler = MicroBatchScheduler.for_batch_backend(backend, max_batch_size=1, max_wait_ms=0)
+    try:
+        scheduler.submit("first")
+        with pytest.raises(TimeoutError):
+            scheduler.generate("second", timeout=0.05)
+        backend.release.set()
+    finally:
+        scheduler.close()
+    assert [prompts for prompts, _ in backend.batches] == [["first"]]
+
+def test_backend_errors_reach_every_caller():
+    def failing_batch(prompts, **options):
+        raise RuntimeError("out of memory")
+
+    scheduler = MicroBatchScheduler(failing_batch, max_batch_size=4, max_wait_ms=50)
+    try:
+        futures = [scheduler.submit(f"story {index}") for index in range(2)]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="out of memory"):
+                future.result(timeout=5)
+    finally:
+        scheduler.close()
@@ -0,0 +1,53 @@
+"""
+Tests for the frozen model variants and ModelCodec.
+"""
+
+import dataclasses
+import pickle
+
+import pytest
+
+from src import FrozenChildPreferences, FrozenStoryContext, FrozenWeatherInfo, ModelCodec
+
+from .conftest import make_context, make_preferences
+
+def test_frozen_preferences_are_normalized_and_hashable():
+    first = FrozenChildPreferences.from_mutable(make_preferences(mood=" Happy ", interests=["Space", "animals", "space"]))
+    second = FrozenChildPreferences.from_mutable(make_preferences(mood="happy", interests=["animals", "space"]))
+    assert first == second
+    assert hash(first) == hash(second)
+    assert first.interests == ("animals", "space")
+    assert first.stable_hash() == second.stable_hash()
+    assert first.stable_hash() != FrozenChildPreferences.from_mutable(make_preferences(age=7)).stable_hash()
+
+def test_frozen_models_cannot_be_changed():
+    frozen = FrozenChildPreferences.from_mutable(make_preferences())
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        frozen.name = "Leo"
+    assert not hasattr(frozen, '__dict__')
+
+def test_context_round_trip():
+    frozen = FrozenStoryContext.from_mutable(make_context())
+    data = frozen.to_bytes()
+    assert FrozenStoryContext.from_bytes(data) == frozen
+    assert pickle.loads(pickle.dumps(frozen)) == frozen
+    assert frozen.to_mutable().preferences.name == "Mia"
+
+def test_encode_many_round_trip():
+    weathers = [FrozenWeatherInfo(description="rain", temperature=t, condition="rain") for t in (1.04, -3.0, 22.25)]
+    blob = ModelCodec.encode_many(weathers)
+    assert ModelCodec.decode_many(blob) == weathers
+    assert weathers[0].temperature == 1.0
+
+def test_invalid_data_is_rejected():
+    data = FrozenWeatherInfo(description="rain", temperature=5, condition="rain").to_bytes()
+    with pytest.raises(ValueError):
+        ModelCodec.decode(b"XX" + data[2:])
+    with pytest.raises(ValueError):
+        ModelCodec.decode(data[:-3])
+    with pytest.raises(ValueError):
+        ModelCodec.decode(data + b"\x00")
+    with pytest.raises(TypeError):
+        FrozenChildPreferences.from_bytes(data)
+    with pytest.raises(TypeError):
+        ModelCodec.encode(make_preferences())
@@ -0,0 +1,76 @@
+"""
+Tests for PrefixCache.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.prompts import PrefixCache
+
+class SlowBackend:
+    """Local backend stand-in whose prefix encoding takes a while."""
+
+    def __init__(self, encode_seconds=0.0):
+        self.encode_seconds = encode_seconds
+        self.encoded = []
+        self.started = threading.Event()
+
+    def encode_prefix(self, prefix):
+        self.started.set()
+        time.sleep(self.encode_seconds)
+        self.encoded.append(prefix)
+        return f"state:{prefix}"
+
+    def generate_from_prefix(self, state, suffix, **kwargs):
+        return f"{state}|{suffix}|{kwargs.get('max_new_tokens')}"
+
+def test_prefix_is_encoded_once():
+    backend = SlowBackend()
+    cache = PrefixCache(backend)
+    assert cache.generate("P", "a", max_new_tokens=5) == "state:P|a|5"
+    assert cache.generate("P", "b") == "state:P|b|None"
+    assert backend.encoded == ["P"]
+    assert cache.stats() == {'entries': 1, 'hits': 1, 'misses': 1, 'evictions': 0}
+
+def test_concurrent_first_requests_share_one_encode():
+    backend = SlowBackend(encode_seconds=0.2)
+    cache = PrefixCache(backend)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        states = list(pool.map(lambda _: cache.get_state("P"), range(8)))
+    assert states == ["state:P"] * 8
+    assert backend.encoded == ["P"]
+
+def test_slow_encode_does_not_block_other_prefixes():
+    backend = SlowBackend(encode_seconds=0.5)
+    cache = PrefixCache(backend)
+    cache._states[PrefixCache._key("ready")] = "state:ready"
+    slow = threading.Thread(target=cache.get_state, args=("slow",))
+    slow.start()
+    backend.started.wait()
+    started = time.perf_counter()
+    assert cache.get_state("ready") == "state:ready"
+    assert time.perf_counter() - started < 0.1
+    slow.join()
+
+def test_failed_encode_is_retried():
+    class FlakyBackend(SlowBackend):
+        def encode_prefix(self, prefix):
+            if not self.encoded:
+                self.encoded.append(None)
+                raise RuntimeError("out of memory")
+            return super().encode_prefix(prefix)
+
+    cache = PrefixCache(FlakyBackend())
+    with pytest.raises(RuntimeError):
+        cache.get_state("P")
+    assert cache.get_state("P") == "state:P"
+
+def test_least_recently_used_prefix_is_evicted():
+    cache = PrefixCache(SlowBackend(), max_entries=2)
+    for prefix in ("a", "b", "a", "c"):
+        cache.get_state(prefix)
+    assert cache.stats()['evictions'] == 1
+    assert PrefixCache._key("b") not in cache._states
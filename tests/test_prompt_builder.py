@@ -0,0 +1,44 @@
+"""
+Tests for PromptBuilder.
+"""
+
+from src.prompts import PromptBuilder
+
+from .conftest import make_context, make_preferences
+
+def build(builder, **overrides):
+    context = make_context(make_preferences(**overrides))
+    return builder.build(context.preferences, context.weather, context.time_info, context.educational_fact)
+
+def test_prompt_is_prefix_plus_suffix():
+    prompt = build(PromptBuilder(input_token_budget=1000))
+    assert prompt.text == prompt.prefix + prompt.suffix
+    assert prompt.prefix == PromptBuilder.INSTRUCTION_PREFIX
+    assert "Child: Mia, age 6" in prompt.suffix
+    assert prompt.dropped_sections == []
+    assert prompt.input_tokens == PromptBuilder.estimate_tokens(prompt.text)
+
+def test_optional_sections_are_dropped_to_fit_the_budget():
+    full = build(PromptBuilder(input_token_budget=1000))
+    fact_tokens = PromptBuilder.estimate_tokens("Fact: the moon has no light of its own")
+    prompt = build(PromptBuilder(input_token_budget=full.input_tokens - fact_tokens))
+    assert prompt.dropped_sections == ["fact"]
+    assert "Fact:" not in prompt.text and "Setting:" in prompt.text
+
+    tiny = build(PromptBuilder(input_token_budget=10))
+    assert tiny.dropped_sections == ["fact", "setting"]
+    assert "Mood:" in tiny.text
+
+def test_output_limits_follow_story_length():
+    builder = PromptBuilder()
+    assert build(builder, story_length="short").max_output_tokens == PromptBuilder.OUTPUT_TOKEN_LIMITS["short"]
+    assert build(builder, story_length="long").max_output_tokens == PromptBuilder.OUTPUT_TOKEN_LIMITS["long"]
+    assert build(builder, story_length="epic").max_output_tokens == PromptBuilder.OUTPUT_TOKEN_LIMITS["medium"]
+
+def test_custom_token_counter():
+    builder = PromptBuilder(input_token_budget=1000, token_counter=len)
+    prompt = build(builder)
+    assert prompt.input_tokens == len(prompt.text)
+
+def test_compact_strips_indentation_and_blank_lines():
+    assert PromptBuilder.compact("  a   b \n\n   c\n") == "a b\nc"
@@ -0,0 +1,104 @@
+"""
+Tests for RequestDispatcher: priorities under saturation, tenant fairness and cancellation.
+"""
+
+import threading
+import time
+
+from src.services import RequestDispatcher
+
+def make_dispatcher(max_concurrency=1):
+    # A fast bucket, so only the concurrency slots limit dispatching
+    return RequestDispatcher(rate_per_second=1000, burst=1000, max_concurrency=max_concurrency)
+
+def blocker(dispatcher, release):
+    """Occupy the dispatcher's only slot until release is set; returns once it is running."""
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        release.wait(5)
+
+    ticket = dispatcher.submit(hold, tenant='busy')
+    assert started.wait(5)
+    return ticket
+
+def test_interactive_requests_overtake_batch_while_saturated():
+    dispatcher = make_dispatcher()
+    release = threading.Event()
+    order = []
+    try:
+        blocker(dispatcher, release)
+        batch = [dispatcher.submit(lambda i=i: order.append(f"batch-{i}"), tenant='batch',
+                                   priority=RequestDispatcher.BATCH) for i in range(3)]
+        time.sleep(0.05)
+        interactive = dispatcher.submit(lambda: order.append("interactive"), tenant='mia')
+        time.sleep(0.05)
+
+        # Nothing is taken off the queues while the slot is busy
+        assert dispatcher.queue_depths() == {'interactive': 1, 'batch': 3, 'pregeneration': 0}
+        assert dispatcher.estimate(interactive)[0] == 0
+        release.set()
+        for ticket in [interactive, *batch]:
+            ticket.future.result(timeout=5)
+    finally:
+        dispatcher.close()
+    assert order == ["interactive", "batch-0", "batch-1", "batch-2"]
+
+def test_tenants_are_served_round_robin():
+    dispatcher = make_dispatcher()
+    release = threading.Event()
+    order = []
+    try:
+        blocker(dispatcher, release)
+        tickets = [dispatcher.submit(lambda name=name: order.append(name), tenant=name[0])
+                   for name in ("a1", "a2", "a3", "b1")]
+        release.set()
+        for ticket in tickets:
+            ticket.future.result(timeout=5)
+    finally:
+        dispatcher.close()
+    assert order == ["a1", "b1", "a2", "a3"]
+
+def test_concurrency_limit_holds():
+    dispatcher = make_dispatcher(max_concurrency=2)
+    lock = threading.Lock()
+    running = {'now': 0, 'max': 0}
+
+    def work():
+        with lock:
+            running['now'] += 1
+            running['max'] = max(running['max'], running['now'])
+        threading.Event().wait(0.02)
+        with lock:
+            running['now'] -= 1
+
+    try:
+        tickets = [dispatcher.submit(work, tenant=str(i % 3)) for i in range(8)]
+        for ticket in tickets:
+            ticket.future.result(timeout=5)
+    finally:
+        dispatcher.close()
+    assert running['max'] == 2
+    assert dispatcher.running() == 0
+
+def test_cancelled_and_promoted_requests():
+    dispatcher = make_dispatcher()
+    release = threading.Event()
+    order = []
+    try:
+        blocker(dispatcher, release)
+        dropped = dispatcher.submit(lambda: order.append("dropped"), tenant='leo')
+        early = dispatcher.submit(lambda: order.append("pregenerated"), tenant='mia',
+                                  priority=RequestDispatcher.PREGENERATION)
+        batch = dispatcher.submit(lambda: order.append("batch"), tenant='job', priority=RequestDispatcher.BATCH)
+        assert dispatcher.cancel(dropped)
+        assert not dispatcher.cancel(dropped)
+        assert dispatcher.promote('mia', RequestDispatcher.PREGENERATION, RequestDispatcher.INTERACTIVE) == 1
+        release.set()
+        early.future.result(timeout=5)
+        batch.future.result(timeout=5)
+    finally:
+        dispatcher.close()
+    assert dropped.future.cancelled()
+    assert order == ["pregenerated", "batch"]
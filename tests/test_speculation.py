@@ -0,0 +1,88 @@
+"""
+Tests for SpeculativeGeneration: side effects wait until a speculative story is claimed.
+"""
+
+import src.services
+import src.utils
+from src.services import GenerationJobExecutor, SpeculativeGeneration
+from src.storage import InProcessCache, StoryArchive, StoryTemplateCache
+from src.utils import DeferredActions
+
+from .conftest import make_context, make_preferences
+from .test_job_executor import wait_for
+from .test_story_generator import make_generator
+
+def speculative_generator(tmp_path, template_cache=None):
+    """A stub generator with an archive and story cache, whose context needs no network access."""
+    generator = make_generator(archive=StoryArchive(str(tmp_path / "stories.db")),
+                               template_cache=template_cache or StoryTemplateCache(),
+                               cache=InProcessCache())
+    generator.get_story_context = lambda preferences: make_context(preferences)
+    return generator
+
+def run_speculative(tmp_path, preferences=None, **kwargs):
+    executor = GenerationJobExecutor(max_workers=1)
+    speculation = SpeculativeGeneration(executor)
+    generator = speculative_generator(tmp_path, **kwargs)
+    preferences = preferences or make_preferences()
+    speculative = speculation.start(generator, preferences)
+    wait_for(lambda: executor.get(speculative.job_id).finished)
+    return speculation, executor, generator, preferences, speculative
+
+def test_abandoned_story_is_not_archived_or_cached(tmp_path):
+    speculation, executor, generator, _, speculative = run_speculative(tmp_path)
+    assert executor.get(speculative.job_id).status == "done"
+    assert generator.archive.count() == 0
+    assert generator.template_cache.lookup(make_context(make_preferences(name="Leo"))) is None
+
+    speculation.abandon(speculative)
+    assert speculative.commits.state == "discarded"
+    assert generator.archive.count() == 0
+    assert generator.template_cache.stats()["templates"] == 0
+    # Other workers sharing the story cache are not served the unused story
+    assert generator.cache.stats()["sets"] == 0
+    context = make_context(make_preferences())
+    assert generator._cached_story(generator._story_cache_key(context.preferences, context)) is None
+
+def test_claimed_story_is_archived_and_cached(tmp_path):
+    speculation, executor, generator, preferences, speculative = run_speculative(tmp_path)
+    assert speculation.claim(speculative, preferences) == speculative.job_id
+    assert generator.archive.count() == 1
+    assert generator.archive.recent(owner=generator.tenant)[0].child_name == "Mia"
+    assert generator.template_cache.lookup(make_context(make_preferences(name="Leo"))) is not None
+    assert generator.cache.stats()["sets"] == 1
+
+def test_abandoned_story_does_not_use_up_template_reuses(tmp_path):
+    cache = StoryTemplateCache(max_reuses=1)
+    seed = make_generator(template_cache=cache)
+    seed_context = make_context()
+    seed.generate_story(seed_context.preferences, context=seed_context)
+    assert cache.stats()["templates"] == 1
+
+    speculation, executor, generator, _, speculative = run_speculative(
+        tmp_path, preferences=make_preferences(name="Leo"), template_cache=cache)
+    assert "leo met a blue owl" in executor.get(speculative.job_id).result.lower()
+    speculation.abandon(speculative)
+    # The only reuse is still available to a real request
+    assert "Ada" in cache.lookup(make_context(make_preferences(name="Ada")))
+    assert cache.stats()["templates"] == 0
+
+def test_deferred_actions_commit_and_discard():
+    ran = []
+    committed = DeferredActions()
+    committed.add(lambda: ran.append(1))
+    assert ran == []
+    committed.commit()
+    committed.add(lambda: ran.append(2))
+    committed.commit()
+    assert ran == [1, 2]
+
+    discarded = DeferredActions()
+    discarded.add(lambda: ran.append(3))
+    discarded.discard()
+    discarded.add(lambda: ran.append(4))
+    discarded.commit()
+    assert ran == [1, 2] and discarded.state == "discarded"
+
+def test_job_cancelled_error_lives_in_utils():
+    assert src.services.JobCancelledError is src.utils.JobCancelledError
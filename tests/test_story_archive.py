@@ -0,0 +1,81 @@
+"""
+Tests for StoryArchive: owner-scoped search, de-duplication and upgrading older archives.
+"""
+
+import sqlite3
+
+from src.storage import StoryArchive
+
+from .conftest import make_context, make_preferences
+
+DRAGON_STORY = "<p>Mia met a friendly dragon who loved the stars.</p>"
+OCEAN_STORY = "<p>Leo sailed across the ocean with a happy whale.</p>"
+
+def test_search_only_finds_the_owners_stories(tmp_path):
+    archive = StoryArchive(str(tmp_path / "stories.db"))
+    archive.add(DRAGON_STORY, make_context(), owner="session-a")
+    archive.add(OCEAN_STORY, make_context(make_preferences(name="Leo")), owner="session-b")
+
+    assert [story.child_name for story in archive.search("dragon", owner="session-a")] == ["Mia"]
+    assert archive.search("dragon", owner="session-b") == []
+    assert archive.search("", owner="session-b")[0].child_name == "Leo"
+    assert [story.child_name for story in archive.recent(owner="session-a")] == ["Mia"]
+    # No owner is for administrative tools: everything matches
+    assert len(archive.search("", owner=None)) == 2
+
+def test_duplicates_are_stored_once_per_owner(tmp_path):
+    archive = StoryArchive(str(tmp_path / "stories.db"))
+    first = archive.add(DRAGON_STORY, make_context(), owner="session-a")
+    assert archive.add(DRAGON_STORY, make_context(), owner="session-a") == first
+    assert archive.add(DRAGON_STORY, make_context(), owner="session-b") != first
+    with archive.batch_writer(batch_size=10) as writer:
+        writer.add(OCEAN_STORY, make_context(), owner="batch")
+        writer.add(OCEAN_STORY, make_context(), owner="batch")
+    assert writer.inserted == 1
+    assert archive.count() == 3
+    assert [story.story for story in archive.search("whale", owner="batch")] == [OCEAN_STORY]
+
+def test_older_archives_gain_an_owner_column(tmp_path):
+    path = str(tmp_path / "stories.db")
+    connection = sqlite3.connect(path)
+    connection.execute("""
+        CREATE TABLE stories (id INTEGER PRIMARY KEY, content_hash TEXT NOT NULL UNIQUE, child_name TEXT NOT NULL,
+            title TEXT NOT NULL, story TEXT NOT NULL, body TEXT NOT NULL, interests TEXT NOT NULL,
+            context BLOB, created_at REAL NOT NULL)
+    """)
+    connection.execute("INSERT INTO stories VALUES (1, 'old', 'Ada', 'Old story', '<p>Old</p>', 'Old', '', NULL, 1.0)")
+    connection.commit()
+    connection.close()
+
+    archive = StoryArchive(path)
+    assert archive.recent(owner="session-a") == []
+    assert [story.title for story in archive.recent(owner="")] == ["Old story"]
+    archive.add(DRAGON_STORY, make_context(), owner="session-a")
+    assert [story.child_name for story in archive.recent(owner="session-a")] == ["Mia"]
+
+def test_generator_archives_stories_for_its_tenant(tmp_path):
+    from .test_story_generator import make_generator
+
+    archive = StoryArchive(str(tmp_path / "stories.db"))
+    generator = make_generator(archive=archive, tenant="session-a")
+    context = make_context()
+    generator.generate_story(context.preferences, context=context)
+    assert len(archive.search("owl", owner="session-a")) == 1
+    assert archive.search("owl", owner="session-b") == []
+
+def test_stories_are_found_again_from_a_new_session(tmp_path):
+    from .test_story_generator import make_generator
+
+    archive = StoryArchive(str(tmp_path / "stories.db"))
+    owner = StoryArchive.owner_for_token("hf_secret")
+    assert owner == StoryArchive.owner_for_token(" hf_secret ") != StoryArchive.owner_for_token("hf_other")
+    assert "hf_secret" not in owner
+
+    # Two browser sessions of one user: different dispatcher tenants, one archive owner
+    first = make_generator(archive=archive, tenant="session-a", owner=owner)
+    context = make_context()
+    first.generate_story(context.preferences, context=context)
+    later = make_generator(archive=archive, tenant="session-b", owner=owner)
+    assert later.tenant == "session-b"
+    assert len(archive.search("owl", owner=later.owner)) == 1
+    assert archive.search("owl", owner="session-a") == []
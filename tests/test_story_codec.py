@@ -0,0 +1,80 @@
+"""
+Tests for StoryCodec and the compressed story archive.
+"""
+
+import pytest
+
+from src.storage import StoryArchive, StoryCodec
+
+from .conftest import make_context, make_preferences
+
+STORIES = StoryCodec.sample_corpus(count=60)
+
+@pytest.fixture
+def default_codec():
+    """Restore the process-wide codec's configuration after the test."""
+    yield
+    StoryCodec.configure_default()
+
+def test_round_trip_and_smaller_than_the_story():
+    codec = StoryCodec.train(STORIES[:40], backend='zlib')
+    for story in STORIES[40:] + ["⭐ Goodnight, Zoë 🌙"]:
+        data = codec.compress(story)
+        assert codec.decompress(data) == story
+        assert StoryCodec.read_header(data) == ('zlib', codec.dictionary_id)
+    assert len(codec.compress(STORIES[-1])) < len(STORIES[-1].encode('utf-8')) / 3
+
+def test_other_dictionary_is_rejected():
+    codec = StoryCodec.train(STORIES[:30], backend='zlib')
+    other = StoryCodec(b"a different dictionary entirely", backend='zlib')
+    with pytest.raises(ValueError):
+        other.decompress(codec.compress(STORIES[0]))
+    with pytest.raises(ValueError):
+        StoryCodec.read_header(b"plain text")
+
+def fill_archive(path, count):
+    archive = StoryArchive(path)
+    archive.add_many((story, make_context(make_preferences(name=f"Child{index}"))) for index, story in enumerate(STORIES[:count]))
+    return archive
+
+def test_default_is_trained_on_the_archive_and_shared_through_the_file(tmp_path, monkeypatch, default_codec):
+    monkeypatch.setattr(StoryCodec, 'MIN_ARCHIVE_STORIES', 20)
+    archive_path = str(tmp_path / "stories.db")
+    dictionary_path = tmp_path / "story.dict"
+
+    # Too few stories yet: the sample corpus, not saved
+    StoryCodec.configure_default(str(dictionary_path), archive_path)
+    fill_archive(archive_path, 10).close()
+    assert StoryCodec.default().dictionary == StoryCodec.train(StoryCodec.sample_corpus()).dictionary
+    assert not dictionary_path.exists()
+
+    fill_archive(archive_path, 50).close()
+    StoryCodec.configure_default(str(dictionary_path), archive_path)
+    trained = StoryCodec.default()
+    assert dictionary_path.read_bytes() == trained.dictionary
+    assert trained.dictionary != StoryCodec.train(StoryCodec.sample_corpus()).dictionary
+
+    # Another process loads the same dictionary instead of training its own
+    StoryCodec.configure_default(str(dictionary_path), None)
+    assert StoryCodec.default().dictionary_id == trained.dictionary_id
+
+def test_archive_reads_stories_after_the_default_dictionary_changes(tmp_path, default_codec):
+    StoryCodec.configure_default(None)
+    archive = StoryArchive(str(tmp_path / "stories.db"))
+    first = archive.add(STORIES[0], make_context())
+    stored = archive._connection().execute("SELECT story FROM stories WHERE id = ?", (first,)).fetchone()[0]
+    assert isinstance(stored, bytes) and len(stored) < len(STORIES[0])
+
+    # A new process with another dictionary (e.g. trained on the archive meanwhile)
+    StoryCodec._default_instance = StoryCodec.train(STORIES[20:], backend='zlib')
+    reopened = StoryArchive(archive.path)
+    second = reopened.add(STORIES[1], make_context(make_preferences(name="Leo")))
+    assert reopened.get(first).story == STORIES[0]
+    assert reopened.get(second).story == STORIES[1]
+    assert {entry.story for entry in reopened.recent()} == {STORIES[0], STORIES[1]}
+
+def test_archive_reads_uncompressed_stories_from_older_archives(tmp_path):
+    archive = StoryArchive(str(tmp_path / "stories.db"))
+    story_id = archive.add(STORIES[0], make_context())
+    archive._connection().execute("UPDATE stories SET story = ? WHERE id = ?", (STORIES[0], story_id))
+    assert archive.get(story_id).story == STORIES[0]
@@ -0,0 +1,72 @@
+"""
+Tests for StoryGenerator with stub backends (no LangChain or network access).
+"""
+
+import threading
+
+from src.prompts import PromptBuilder
+from src.story_generator import StoryGenerator
+
+from .conftest import STORY_TEXT, StubLocalBackend, make_context, make_preferences
+
+class RecordingAgent:
+    """Stands in for a LangChain agent, remembering its output limit."""
+
+    def __init__(self, max_new_tokens):
+        self.max_new_tokens = max_new_tokens
+        self.prompts = []
+
+    def run(self, prompt):
+        self.prompts.append(prompt)
+        return STORY_TEXT
+
+def make_generator(**kwargs) -> StoryGenerator:
+    """A generator whose LLM and agent are stubs."""
+    generator = StoryGenerator("test-token", **kwargs)
+    generator._create_llm = lambda max_new_tokens=None: max_new_tokens
+    generator._create_agent = RecordingAgent
+    return generator
+
+def test_agent_path_passes_max_new_tokens_per_call():
+    generator = make_generator()
+    context = make_context()
+    story = generator.generate_story(context.preferences, context=context)
+    assert "blue owl" in story
+
+    long_context = make_context(make_preferences(story_length="medium"))
+    generator.generate_story(long_context.preferences, context=long_context)
+    agents = generator._local_agents.agents
+    assert set(agents) == {PromptBuilder.OUTPUT_TOKEN_LIMITS["short"], PromptBuilder.OUTPUT_TOKEN_LIMITS["medium"]}
+    assert all(agent.max_new_tokens == limit for limit, agent in agents.items())
+    assert generator.model_kwargs == {"temperature": 0.8}
+
+def test_threads_get_their_own_agents():
+    generator = make_generator()
+    agents = []
+    threads = [threading.Thread(target=lambda: agents.append(generator._agent_for(100))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(agent) for agent in agents}) == 3
+    assert generator._agent_for(100) is generator._agent_for(100)
+
+def test_long_story_is_one_completion_on_the_agent_path():
+    generator = make_generator()
+    context = make_context(make_preferences(story_length="long"))
+    generator.generate_story(context.preferences, context=context)
+    prompts = [prompt for agent in generator._local_agents.agents.values() for prompt in agent.prompts]
+    assert len(prompts) == 1
+
+def test_long_story_sections_stream_progress_with_a_local_backend():
+    backend = StubLocalBackend()
+    generator = make_generator(local_backend=backend)
+    context = make_context(make_preferences(story_length="long"))
+    progress = []
+    generator.generate_story(context.preferences, context=context,
+                             on_progress=lambda stage, partial=None: progress.append((stage, partial)))
+    count = PromptBuilder.SECTION_COUNTS["long"]
+    # The outline, then one call per section
+    assert len(backend.calls) == count + 1
+    section_updates = [partial for stage, partial in progress if stage.startswith("Writing the story (") and partial]
+    assert section_updates and "blue owl" in section_updates[-1]
@@ -0,0 +1,55 @@
+"""
+Tests for StoryHistory.
+"""
+
+import pytest
+
+from src.storage import StoryCodec, StoryHistory
+
+@pytest.fixture(scope="module")
+def codec():
+    return StoryCodec.train(StoryCodec.sample_corpus(count=60), backend='zlib')
+
+def story(index: int, words: int = 50) -> str:
+    return f"<p>Story {index}: " + ' '.join(f"word{index}-{n}" for n in range(words)) + "</p>"
+
+def test_older_entries_are_compressed_and_reopened(codec):
+    history = StoryHistory(codec=codec)
+    first = history.add(story(1), "One")
+    history.add(story(2), "Two")
+    entries = {entry.entry_id: entry for entry in history.entries()}
+    assert entries[first].story is None and entries[first].compressed is not None
+    assert history.open(first) == story(1)
+    assert [entry.title for entry in history.entries()] == ["One", "Two"]
+
+def test_entry_cap_evicts_least_recently_used(codec):
+    history = StoryHistory(max_entries=2, codec=codec)
+    first = history.add(story(1), "One")
+    second = history.add(story(2), "Two")
+    history.open(first)
+    history.add(story(3), "Three")
+    assert history.open(second) is None
+    assert history.open(first) == story(1)
+    assert history.evictions == 1
+
+def test_byte_budget_bounds_long_stories(codec):
+    history = StoryHistory(max_entries=100, codec=codec, max_bytes=20_000)
+    for index in range(50):
+        history.add(story(index, words=2_000), f"Story {index}")
+    assert history.stored_bytes() <= 20_000 or len(history) == 1
+    assert len(history) < 50
+    assert history.open(history.entries()[0].entry_id) == story(49, words=2_000)
+
+def test_newest_story_is_kept_even_over_budget(codec):
+    history = StoryHistory(codec=codec, max_bytes=10)
+    history.add(story(1), "One")
+    entry_id = history.add(story(2), "Two")
+    assert len(history) == 1
+    assert history.open(entry_id) == story(2)
+
+def test_memory_report_counts_all_sessions(codec):
+    history = StoryHistory(codec=codec)
+    history.add(story(1), "One")
+    report = StoryHistory.memory_report()
+    assert report['sessions'] >= 1
+    assert report['raw_bytes'] >= history.raw_bytes()
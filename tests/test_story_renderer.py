@@ -0,0 +1,43 @@
+"""
+Tests for StoryRenderer.
+"""
+
+import pytest
+
+from src.models import StoryDocument
+from src.utils import StoryFormatter, StoryRenderer
+
+def make_story_html():
+    text = "The dragon slept.\n\nMia &amp; Leo said goodnight."
+    paragraphs = [StoryFormatter.format_story(part, "Mia") for part in text.split('\n\n')]
+    return StoryFormatter.add_illustrations('\n'.join(paragraphs))
+
+def test_from_html_parses_paragraphs_and_illustrations():
+    renderer = StoryRenderer.from_html(make_story_html(), {'title': 'Goodnight'})
+    assert renderer.document.paragraphs == ["The dragon slept.", "Mia & Leo said goodnight."]
+    assert renderer.document.illustrations == ['\U0001F409', None]
+    assert renderer.is_rendered('html')
+
+def test_formats_are_rendered_once():
+    renderer = StoryRenderer(StoryDocument(paragraphs=["A *bright* star."], illustrations=['⭐'],
+                                           metadata={'title': 'Stars'}))
+    assert not renderer.is_rendered('markdown')
+    markdown = renderer.render('markdown')
+    assert markdown == "# Stars\n\n⭐ A \\*bright\\* star.\n"
+    assert renderer.render('markdown') is markdown
+
+def test_text_and_ssml():
+    renderer = StoryRenderer(StoryDocument(paragraphs=["One & two.", "Three."], illustrations=[None, None]))
+    assert renderer.render('text') == "One & two.\n\nThree.\n"
+    ssml = renderer.render('ssml')
+    assert ssml.startswith('<speak>') and ssml.endswith('</speak>')
+    assert '<p>One &amp; two.</p>' in ssml
+
+def test_html_escapes_paragraphs():
+    renderer = StoryRenderer(StoryDocument(paragraphs=["1 < 2"], illustrations=[None]))
+    assert '1 &lt; 2' in renderer.render('html')
+
+def test_unknown_format():
+    renderer = StoryRenderer(StoryDocument(paragraphs=[], illustrations=[]))
+    with pytest.raises(ValueError):
+        renderer.render('pdf')
@@ -0,0 +1,85 @@
+"""
+Tests for StoryTemplateCache: abstracting and re-personalizing stories, and reuse limits.
+"""
+
+import dataclasses
+
+from src.storage import StoryTemplateCache
+
+from .conftest import make_context, make_preferences
+
+FACT = "Owls can turn their heads almost all the way around."
+
+STORY = ("<p>Mia and her blue owl looked at the clear sky. MIA laughed at the owls nearby.</p>"
+         "<p>Mia's owl said: did you know that owls can turn their heads almost all the way around? "
+         "Blue feathers shone.</p>")
+
+def owl_context(**overrides):
+    return make_context(make_preferences(**overrides), fact=FACT, weather="clear sky")
+
+def test_names_and_details_are_swapped_in_any_case():
+    cache = StoryTemplateCache()
+    cache.store(STORY, owl_context())
+    leo = owl_context(name="Leo", favorite_animal="Fox", favorite_color="red")
+    story = cache.lookup(leo)
+    assert story == ("<p>Leo and her red fox looked at the clear sky. LEO laughed at the foxes nearby.</p>"
+                     "<p>Leo's fox said: did you know that owls can turn their heads almost all the way around? "
+                     "Red feathers shone.</p>")
+
+def test_quoted_fact_and_weather_follow_the_new_request():
+    cache = StoryTemplateCache()
+    cache.store(STORY, owl_context())
+    context = make_context(make_preferences(name="Ada"), fact="Bees can recognize human faces.", weather="light rain")
+    story = cache.lookup(context)
+    assert "did you know that bees can recognize human faces?" in story
+    assert "the light rain" in story
+    assert "owls can turn" not in story and "clear sky" not in story
+
+def test_unquoted_fact_is_only_reused_for_the_same_fact():
+    cache = StoryTemplateCache()
+    # The story paraphrases the fact, so it cannot be swapped out
+    cache.store("<p>Mia's owl could look right behind itself.</p>", owl_context())
+    other_fact = make_context(make_preferences(name="Ada"), fact="Bees can recognize human faces.",
+                              weather="clear sky")
+    assert cache.lookup(other_fact) is None
+    assert cache.lookup(owl_context(name="Ada")) == "<p>Ada's owl could look right behind itself.</p>"
+
+def test_reuse_limits():
+    cache = StoryTemplateCache(max_reuses=2)
+    cache.store(STORY, owl_context())
+    # Never served back to the child it was written for
+    assert cache.lookup(owl_context()) is None
+    assert cache.lookup(owl_context(name="Leo")) is not None
+    assert cache.lookup(owl_context(name="Leo")) is None
+    assert cache.lookup(owl_context(name="Ada")) is not None
+    assert cache.stats() == {'hits': 2, 'misses': 2, 'retired': 1, 'templates': 0}
+
+    # Different season: a different key
+    cache.store(STORY, owl_context())
+    winter = owl_context(name="Leo")
+    winter = dataclasses.replace(winter, time_info=dataclasses.replace(winter.time_info, season="winter"))
+    assert cache.lookup(winter) is None
+
+def test_zero_reuses_never_stores():
+    cache = StoryTemplateCache(max_reuses=0)
+    cache.store(STORY, owl_context())
+    assert len(cache) == 0
+    assert cache.lookup(owl_context(name="Leo")) is None
+
+def test_names_that_are_also_words_leave_the_words_alone():
+    cache = StoryTemplateCache()
+    for name, story in [
+        ("Will", "<p>Will knew the owl will sing. WILL smiled.</p>"),
+        ("May", "<p>You may rest now, May. Sleep well, may.</p>"),
+        ("Rose", "<p>Rose found a rose by the owl. Rose's rose was blue.</p>"),
+    ]:
+        cache.store(story, owl_context(name=name))
+        leo = owl_context(name="Leo")
+        assert cache.lookup(leo) == story.replace(name, "Leo").replace(name.upper(), "LEO")
+        cache.clear()
+
+def test_one_letter_names_are_not_cached():
+    cache = StoryTemplateCache()
+    cache.store("<p>I love you, said the owl to I.</p>", owl_context(name="I"))
+    assert len(cache) == 0
+    assert cache.lookup(owl_context(name="Leo")) is None